@@ -16,7 +16,10 @@ from django.urls import path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
-IMDB_SQLITE_PATH = "C:/Users/bendr/OneDrive/Documents/Polytech/S7/BDA/data/imdb.db"
+# Same file as the import / benchmark scripts (script/phase1_sqlite), so the
+# schema, indexes and FTS tables they create are the ones the app reads.
+# Override with the IMDB_SQLITE_PATH environment variable.
+IMDB_SQLITE_PATH = os.environ.get("IMDB_SQLITE_PATH", str(BASE_DIR / "data" / "imdb.db"))
 
 MONGO_URI = "mongodb://127.0.0.1:27017"
 MONGO_DB_NAME = "cineexplorer_flat"
@@ -86,6 +89,15 @@ DATABASES = {
     }
 }
 
+# Cache (stats, genres, list_movies totals)
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'projet-bda',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
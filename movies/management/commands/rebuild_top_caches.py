@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Recalcule les tables top_movies_cache / recent_movies_cache de la base IMDB.
+
+Usage :
+    python manage.py rebuild_top_caches [--size 500]
+
+A lancer après chaque import (ou en cron, ex. toutes les nuits) :
+la page d'accueil lit ensuite ces tables au lieu de trier movies x ratings.
+"""
+from django.core.management.base import BaseCommand
+
+from movies.services.sqlite_service import TOP_CACHE_SIZE, rebuild_top_caches
+
+
+class Command(BaseCommand):
+    help = "Recalcule les tables top_movies_cache et recent_movies_cache (SQLite)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=TOP_CACHE_SIZE,
+                            help="Nombre de films gardés par table")
+
+    def handle(self, *args, **options):
+        for table, n in rebuild_top_caches(options["size"]).items():
+            self.stdout.write(self.style.SUCCESS(f"{table} : {n} lignes"))
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Met à jour les statistiques du planificateur SQLite (ANALYZE -> sqlite_stat1).
+
+Usage :
+    python manage.py sqlite_analyze
+
+A lancer après chaque import : sans statistiques, SQLite choisit ses index par
+heuristique (ex. liste des films filtrée par genre + tri), et la page stats
+retombe sur des COUNT(*) exacts au lieu des estimations de sqlite_stat1.
+"""
+from django.core.management.base import BaseCommand
+
+from movies.services.sqlite_service import analyze
+
+
+class Command(BaseCommand):
+    help = "Lance ANALYZE sur la base IMDB (statistiques du planificateur SQLite)."
+
+    def handle(self, *args, **options):
+        n = analyze()
+        self.stdout.write(self.style.SUCCESS(f"sqlite_stat1 : {n} lignes"))
@@ -18,11 +18,22 @@ If your DB differs, adapt the SQL below.
 """
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
+import queue
+import re
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from django.conf import settings
+from django.core.cache import cache
 
 
 # ---------- connection helpers ----------
@@ -43,30 +54,205 @@ def _get_db_path() -> str:
     return str(base_dir / "db.sqlite3")
 
 
-def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(_get_db_path())
-    conn.row_factory = sqlite3.Row
+# Connections are pooled: a thread leases one on its first query and keeps it
+# until the thread ends, then the connection goes back to the pool. runserver
+# (and threaded WSGI servers) start a thread per request, so the next request
+# reuses a connection whose page cache / mmap are already warm instead of
+# opening a cold one.
+_POOL_SIZE = 8
+_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=_POOL_SIZE)
+_tls = threading.local()
+_connect_lock = threading.Lock()
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    f"PRAGMA mmap_size={1 << 30}",
+    "PRAGMA cache_size=-200000",
+    # the web app only reads; writers (rebuild_top_caches) lift it explicitly
+    "PRAGMA query_only=1",
+)
+
+
+def _open_connection() -> sqlite3.Connection:
+    # A larger statement cache keeps the compiled VDBE programs of every query in
+    # this module (and the list_movies filter variants) across requests.
+    conn = sqlite3.connect(_get_db_path(), check_same_thread=False, cached_statements=256)
+    for pragma in _PRAGMAS:
+        try:
+            conn.execute(pragma)
+        except sqlite3.OperationalError:
+            # e.g. journal_mode=WAL on a read-only file: keep the defaults
+            pass
     return conn
 
 
+def _acquire() -> sqlite3.Connection:
+    # LIFO: the most recently used (warmest) connection is handed out first
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        with _connect_lock:
+            return _open_connection()
+
+
+def _release(conn: sqlite3.Connection) -> None:
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+class _Lease:
+    """Connection held by one thread; returned to the pool when the thread-local dies."""
+
+    __slots__ = ("conn",)
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __del__(self) -> None:
+        try:
+            _release(self.conn)
+        except Exception:
+            # interpreter shutdown / connection already closed
+            pass
+
+
+def _connect() -> sqlite3.Connection:
+    lease = getattr(_tls, "lease", None)
+    if lease is None:
+        lease = _tls.lease = _Lease(_acquire())
+    return lease.conn
+
+
+def _execute_tuples(sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+    # Connections keep the default tuple rows (no sqlite3.Row): dicts are only
+    # built where templates need them, straight from the tuples.
+    return _connect().execute(sql, params)
+
+
 def _fetchone(sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
-    with _connect() as conn:
-        cur = conn.execute(sql, params)
-        row = cur.fetchone()
-        return dict(row) if row else None
+    cur = _execute_tuples(sql, params)
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip([c[0] for c in cur.description], row))
 
 
 def _fetchall(sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
-    with _connect() as conn:
-        cur = conn.execute(sql, params)
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+    cur = _execute_tuples(sql, params)
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
 def _fetchcol(sql: str, params: Sequence[Any] = ()) -> List[Any]:
-    with _connect() as conn:
-        cur = conn.execute(sql, params)
-        return [r[0] for r in cur.fetchall()]
+    return [r[0] for r in _execute_tuples(sql, params).fetchall()]
+
+
+# ---------- small TTL cache for near-static aggregates ----------
+
+_CACHE_TTL_SECONDS = 600
+_cache: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+_cache_lock = threading.Lock()
+# returned by the decorators' .cached() when the value is not (or no longer) cached
+_MISSING = object()
+
+
+def _ttl_cache(ttl: float = _CACHE_TTL_SECONDS) -> Callable:
+    """
+    Memoizes a function for `ttl` seconds, keyed by its arguments.
+    Used for aggregates (genres, stats, table counts) that only change on reimport.
+    """
+    def decorator(func: Callable) -> Callable:
+        def cached(*args: Any, **kwargs: Any) -> Any:
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            with _cache_lock:
+                hit = _cache.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                return hit[1]
+            return _MISSING
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            value = cached(*args, **kwargs)
+            if value is not _MISSING:
+                return value
+            value = func(*args, **kwargs)
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            with _cache_lock:
+                _cache[key] = (time.monotonic() + ttl, value)
+            return value
+        wrapper.cached = cached
+        return wrapper
+    return decorator
+
+
+_SHARED_CACHE_TTL_SECONDS = 60 * 60
+_SHARED_CACHE_VERSION = "v1"  # bump when a cached value changes shape
+# Generation counter kept in Django's cache itself, so clear_caches() run by
+# another process (manage.py commands, import) invalidates every worker's keys
+_SHARED_GENERATION_KEY = f"sqlite_service:generation:{_SHARED_CACHE_VERSION}"
+
+
+def _shared_generation() -> int:
+    generation = cache.get(_SHARED_GENERATION_KEY)
+    if generation is None:
+        # seeded from the clock: if the counter is evicted, the new one cannot
+        # fall back onto a generation whose entries are still cached
+        cache.add(_SHARED_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(_SHARED_GENERATION_KEY, 0)
+    return generation
+
+
+def _shared_cache_key(name: str, args: Any) -> str:
+    """Django cache key; embeds the shared generation so clear_caches() invalidates it."""
+    digest = hashlib.md5(repr(args).encode("utf-8")).hexdigest()
+    return f"{name}:{_SHARED_CACHE_VERSION}:{_shared_generation()}:{digest}"
+
+
+def _shared_cache(ttl: float = _SHARED_CACHE_TTL_SECONDS) -> Callable:
+    """
+    Like _ttl_cache but stored in Django's cache (settings.CACHES), so the value
+    is shared by every worker when a shared backend (Memcached, Redis) is configured.
+    """
+    def decorator(func: Callable) -> Callable:
+        def cached(*args: Any, **kwargs: Any) -> Any:
+            key = _shared_cache_key(func.__name__, (args, sorted(kwargs.items())))
+            value = cache.get(key)
+            return _MISSING if value is None else value
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = _shared_cache_key(func.__name__, (args, sorted(kwargs.items())))
+            value = cache.get(key)
+            if value is None:
+                value = func(*args, **kwargs)
+                cache.set(key, value, ttl)
+            return value
+        wrapper.cached = cached
+        return wrapper
+    return decorator
+
+
+def clear_caches() -> None:
+    """
+    To call after a data reload (import_data.py) so the next request recomputes.
+    The process-local TTL cache is cleared here; entries in Django's cache are
+    dropped for every process sharing that backend (Memcached, Redis, database)
+    by bumping the generation stored there. With the default LocMemCache each
+    process has its own cache and only this one is affected.
+    """
+    with _cache_lock:
+        _cache.clear()
+    # keys stored in Django's cache embed the generation -> old entries are ignored
+    try:
+        cache.incr(_SHARED_GENERATION_KEY)
+    except ValueError:  # key missing or evicted
+        cache.set(_SHARED_GENERATION_KEY, time.time_ns(), None)
 
 
 def _normalize_region(region: Optional[str]) -> str:
@@ -80,14 +266,33 @@ def _normalize_region(region: Optional[str]) -> str:
     return r
 
 
-# ---------- public API used by views/templates ----------
-
-def list_top_movies(limit: int = 12) -> List[Dict[str, Any]]:
+def _attach_genres(rows: List[Dict[str, Any]]) -> None:
     """
-    Returns list of movies sorted by rating then votes.
-    Each movie is a dict and contains at least: id, movie_id, primary_title, start_year, rating, votes, genres
+    Sets row["genres"] ("Drama, Romance") on each movie row with one IN (...)
+    lookup on genres, instead of a GROUP BY over the movies x genres join.
     """
-    sql = """
+    ids = [r["movie_id"] for r in rows if r.get("movie_id")]
+    by_movie: Dict[str, List[str]] = {}
+    if ids:
+        placeholders = ",".join("?" * len(ids))
+        cur = _connect().execute(
+            f"SELECT movie_id, genre FROM genres WHERE movie_id IN ({placeholders})", ids
+        )
+        for movie_id, genre in cur.fetchall():
+            genre = str(genre or "").strip()
+            if genre:
+                by_movie.setdefault(movie_id, []).append(genre)
+    for row in rows:
+        row["genres"] = ", ".join(by_movie.get(row.get("movie_id"), []))
+
+
+# ---------- public API used by views/templates ----------
+
+# Rated movies first, read in order from idx_ratings_avg_votes (ratings columns are
+# NOT NULL, so the old "IS NULL" sort flags only ever ranked unrated movies last);
+# the unrated branch is only scanned if there are fewer than ?1 rated movies.
+_TOP_MOVIES_SQL = """
+    SELECT * FROM (
         SELECT
             m.movie_id,
             m.primary_title AS title,
@@ -96,153 +301,294 @@ def list_top_movies(limit: int = 12) -> List[Dict[str, Any]]:
             r.average_rating AS rating,
             r.average_rating AS average_rating,
             r.num_votes AS votes,
-            r.num_votes AS num_votes,
-            GROUP_CONCAT(DISTINCT g.genre) AS genres_csv
+            r.num_votes AS num_votes
+        FROM ratings r
+        JOIN movies m ON m.movie_id = r.movie_id
+        WHERE m.title_type = 'movie'
+        ORDER BY r.average_rating DESC, r.num_votes DESC
+        LIMIT ?1
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT
+            m.movie_id,
+            m.primary_title AS title,
+            m.primary_title,
+            m.start_year,
+            NULL AS rating,
+            NULL AS average_rating,
+            NULL AS votes,
+            NULL AS num_votes
         FROM movies m
-        LEFT JOIN ratings r ON r.movie_id = m.movie_id
-        LEFT JOIN genres g ON g.movie_id = m.movie_id
         WHERE m.title_type = 'movie'
-        GROUP BY m.movie_id
-        ORDER BY
-            (r.average_rating IS NULL) ASC,
-            r.average_rating DESC,
-            (r.num_votes IS NULL) ASC,
-            r.num_votes DESC
-        LIMIT ?
+          AND NOT EXISTS (SELECT 1 FROM ratings r WHERE r.movie_id = m.movie_id)
+        LIMIT ?1
+    )
+    LIMIT ?1
+"""
+
+_RECENT_MOVIES_SQL = """
+    SELECT
+        m.movie_id,
+        m.primary_title AS title,
+        m.primary_title,
+        m.start_year,
+        r.average_rating AS rating,
+        r.average_rating AS average_rating,
+        r.num_votes AS votes,
+        r.num_votes AS num_votes
+    FROM movies m
+    LEFT JOIN ratings r ON r.movie_id = m.movie_id
+    WHERE m.title_type = 'movie' AND m.start_year IS NOT NULL
+    ORDER BY m.start_year DESC, (r.num_votes IS NULL) ASC, r.num_votes DESC
+    LIMIT ?
+"""
+
+# Precomputed top-N tables (python manage.py rebuild_top_caches):
+# cache table -> live query it materializes
+_TOP_CACHES = {
+    "top_movies_cache": _TOP_MOVIES_SQL,
+    "recent_movies_cache": _RECENT_MOVIES_SQL,
+}
+TOP_CACHE_SIZE = 500
+
+
+@_ttl_cache()
+def _table_names() -> frozenset:
+    """Names of all tables in the DB, to detect optional ones (FTS, top caches)."""
+    rows = _connect().execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+    return frozenset(r[0] for r in rows)
+
+
+@_ttl_cache()
+def _index_names() -> frozenset:
+    """Names of all indexes in the DB, so INDEXED BY is only used when the index exists."""
+    rows = _connect().execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()
+    return frozenset(r[0] for r in rows)
+
+
+@contextmanager
+def _writable() -> Iterator[sqlite3.Connection]:
+    """This thread's connection with query_only lifted for the duration of the block."""
+    conn = _connect()
+    conn.execute("PRAGMA query_only=0")
+    try:
+        yield conn
+    finally:
+        conn.execute("PRAGMA query_only=1")
+
+
+def analyze() -> int:
     """
-    rows = _fetchall(sql, (limit,))
+    Refreshes the planner statistics (ANALYZE -> sqlite_stat1), used both for
+    index choice and by all_table_counts_estimated(). To run after each import.
+    Returns the number of sqlite_stat1 rows.
+    """
+    with _writable() as conn:
+        conn.execute("ANALYZE")
+        conn.commit()
+        n = conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+    clear_caches()
+    return n
+
+
+def rebuild_top_caches(size: int = TOP_CACHE_SIZE) -> Dict[str, int]:
+    """
+    (Re)creates top_movies_cache / recent_movies_cache with the first `size` rows
+    of each list, ordered by `rank`. To run after each import (or nightly).
+    Returns {table: rows}.
+    """
+    out: Dict[str, int] = {}
+    with _writable() as conn:
+        with conn:
+            for table, select_sql in _TOP_CACHES.items():
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"""
+                    CREATE TABLE {table} (
+                        rank INTEGER PRIMARY KEY,
+                        movie_id TEXT NOT NULL,
+                        title TEXT,
+                        primary_title TEXT,
+                        start_year INTEGER,
+                        rating REAL,
+                        average_rating REAL,
+                        votes INTEGER,
+                        num_votes INTEGER
+                    )
+                """)
+                # rank = rowid, assigned in the ORDER BY order of the select
+                conn.execute(
+                    f"INSERT INTO {table} (movie_id, title, primary_title, start_year, rating,"
+                    f" average_rating, votes, num_votes) {select_sql}",
+                    (size,),
+                )
+                out[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    clear_caches()
+    return out
+
+
+def _ranked_rows(cache_table: str, limit: int) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    if cache_table in _table_names():
+        rows = _fetchall(f"""
+            SELECT movie_id, title, primary_title, start_year, rating, average_rating, votes, num_votes
+            FROM {cache_table}
+            WHERE rank <= ?
+            ORDER BY rank
+        """, (limit,))
+    if len(rows) < limit:
+        # no cache, or cache built with a smaller --size: live query
+        rows = _fetchall(_TOP_CACHES[cache_table], (limit,))
     for row in rows:
         row["id"] = row.get("movie_id")  # convenience for templates
-        genres_csv = row.pop("genres_csv", None)
-        if genres_csv:
-            genres = [g.strip() for g in str(genres_csv).split(",") if g.strip()]
-            row["genres"] = ", ".join(genres)
-        else:
-            row["genres"] = ""
     return rows
 
 
+def _list_ranked(cache_table: str, limit: int) -> List[Dict[str, Any]]:
+    rows = _ranked_rows(cache_table, limit)
+    _attach_genres(rows)
+    return rows
+
+
+def list_top_movies(limit: int = 12) -> List[Dict[str, Any]]:
+    """
+    Returns list of movies sorted by rating then votes.
+    Each movie is a dict and contains at least: id, movie_id, primary_title, start_year, rating, votes, genres
+    Read from top_movies_cache when it exists, live query otherwise.
+    """
+    return _list_ranked("top_movies_cache", limit)
+
+
 def list_recent_movies(limit: int = 12) -> List[Dict[str, Any]]:
     """
     Returns recent movies by start_year DESC.
+    Read from recent_movies_cache when it exists, live query otherwise.
     """
-    sql = """
-        SELECT
-            m.movie_id,
-            m.primary_title AS title,
-            m.primary_title,
-            m.start_year,
-            r.average_rating AS rating,
-            r.average_rating AS average_rating,
-            r.num_votes AS votes,
-            r.num_votes AS num_votes,
-            GROUP_CONCAT(DISTINCT g.genre) AS genres_csv
-        FROM movies m
-        LEFT JOIN ratings r ON r.movie_id = m.movie_id
-        LEFT JOIN genres g ON g.movie_id = m.movie_id
-        WHERE m.title_type = 'movie' AND m.start_year IS NOT NULL
-        GROUP BY m.movie_id
-        ORDER BY m.start_year DESC, (r.num_votes IS NULL) ASC, r.num_votes DESC
-        LIMIT ?
-    """
-    rows = _fetchall(sql, (limit,))
-    for row in rows:
-        row["id"] = row.get("movie_id")
-        genres_csv = row.pop("genres_csv", None)
-        if genres_csv:
-            genres = [g.strip() for g in str(genres_csv).split(",") if g.strip()]
-            row["genres"] = ", ".join(genres)
-        else:
-            row["genres"] = ""
-    return rows
+    return _list_ranked("recent_movies_cache", limit)
 
 
-def get_movie_by_id(movie_id: str) -> Optional[Dict[str, Any]]:
+@_shared_cache(ttl=300)
+def home_lists(limit: int = 12) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    Returns a full movie dict for the detail page.
+    (top_movies, recent_movies) for the home page: both lists read back-to-back
+    on the same connection, genres attached with a single IN (...) lookup, and
+    the pair cached for 5 minutes.
     """
-    base_sql = """
-        SELECT
-            m.movie_id,
-            m.title_type,
-            m.primary_title,
-            m.original_title,
-            m.is_adult,
-            m.start_year,
-            m.end_year,
-            m.runtime_minutes,
-            r.average_rating AS rating,
-            r.average_rating AS average_rating,
-            r.num_votes AS votes,
-            r.num_votes AS num_votes,
-            GROUP_CONCAT(DISTINCT g.genre) AS genres_csv
+    top = _ranked_rows("top_movies_cache", limit)
+    recent = _ranked_rows("recent_movies_cache", limit)
+    _attach_genres(top + recent)
+    return top, recent
+
+
+# Whole detail page in one statement: each child list is aggregated into a JSON
+# array by its own scalar subquery, so SQLite prepares/executes a single program
+# instead of six.
+_MOVIE_DETAIL_SQL = """
+    WITH
+    base AS (
+        SELECT json_object(
+            'movie_id', m.movie_id,
+            'title_type', m.title_type,
+            'primary_title', m.primary_title,
+            'original_title', m.original_title,
+            'is_adult', m.is_adult,
+            'start_year', m.start_year,
+            'end_year', m.end_year,
+            'runtime_minutes', m.runtime_minutes,
+            'rating', r.average_rating,
+            'average_rating', r.average_rating,
+            'votes', r.num_votes,
+            'num_votes', r.num_votes
+        ) AS doc
         FROM movies m
         LEFT JOIN ratings r ON r.movie_id = m.movie_id
-        LEFT JOIN genres g ON g.movie_id = m.movie_id
-        WHERE m.movie_id = ?
-        GROUP BY m.movie_id
+        WHERE m.movie_id = :movie_id
         LIMIT 1
+    ),
+    g AS (
+        SELECT json_group_array(genre) AS doc
+        FROM (SELECT DISTINCT genre FROM genres WHERE movie_id = :movie_id)
+    ),
+    d AS (
+        SELECT json_group_array(name) AS doc
+        FROM (
+            SELECT p.name
+            FROM directors d
+            JOIN persons p ON p.person_id = d.person_id
+            WHERE d.movie_id = :movie_id
+            ORDER BY p.name
+        )
+    ),
+    w AS (
+        SELECT json_group_array(name) AS doc
+        FROM (
+            SELECT p.name
+            FROM writers w
+            JOIN persons p ON p.person_id = w.person_id
+            WHERE w.movie_id = :movie_id
+            ORDER BY p.name
+        )
+    ),
+    c AS (
+        SELECT json_group_array(json_array(name, category)) AS doc
+        FROM (
+            SELECT p.name, pr.category
+            FROM principals pr
+            JOIN persons p ON p.person_id = pr.person_id
+            WHERE pr.movie_id = :movie_id AND pr.category IN ('actor', 'actress')
+            ORDER BY pr.ordering ASC
+            LIMIT 20
+        )
+    ),
+    t AS (
+        SELECT json_group_array(json_array(title, region)) AS doc
+        FROM (
+            SELECT t.title, t.region
+            FROM titles t
+            WHERE t.movie_id = :movie_id
+            ORDER BY t.region IS NULL, t.region, t.title
+            LIMIT 25
+        )
+    )
+    SELECT json_object(
+        'base', json((SELECT doc FROM base)),
+        'genres', json((SELECT doc FROM g)),
+        'directors', json((SELECT doc FROM d)),
+        'writers', json((SELECT doc FROM w)),
+        'cast', json((SELECT doc FROM c)),
+        'alt_titles', json((SELECT doc FROM t))
+    ) AS payload
+"""
+
+
+def get_movie_by_id(movie_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns a full movie dict for the detail page.
     """
-    movie = _fetchone(base_sql, (movie_id,))
+    row = _connect().execute(_MOVIE_DETAIL_SQL, {"movie_id": movie_id}).fetchone()
+    payload = json.loads(row[0]) if row else {}
+    movie = payload.get("base")
     if not movie:
         return None
 
     movie["id"] = movie.get("movie_id")  # template convenience
 
-    genres_csv = movie.pop("genres_csv", None)
-    if genres_csv:
-        genres = [g.strip() for g in str(genres_csv).split(",") if g.strip()]
-        movie["genres"] = ", ".join(genres)
-    else:
-        movie["genres"] = ""
-
-    # Directors
-    dir_sql = """
-        SELECT p.name
-        FROM directors d
-        JOIN persons p ON p.person_id = d.person_id
-        WHERE d.movie_id = ?
-        ORDER BY p.name
-    """
-    movie["directors"] = _fetchcol(dir_sql, (movie_id,))
+    genres = [str(g).strip() for g in payload.get("genres") or [] if g and str(g).strip()]
+    movie["genres"] = ", ".join(genres)
 
-    # Writers
-    wri_sql = """
-        SELECT p.name
-        FROM writers w
-        JOIN persons p ON p.person_id = w.person_id
-        WHERE w.movie_id = ?
-        ORDER BY p.name
-    """
-    movie["writers"] = _fetchcol(wri_sql, (movie_id,))
+    movie["directors"] = payload.get("directors") or []
+    movie["writers"] = payload.get("writers") or []
 
     # Cast (actors/actresses)
-    cast_sql = """
-        SELECT p.name, pr.category
-        FROM principals pr
-        JOIN persons p ON p.person_id = pr.person_id
-        WHERE pr.movie_id = ? AND pr.category IN ('actor', 'actress')
-        ORDER BY pr.ordering ASC
-        LIMIT 20
-    """
-    cast_rows = _fetchall(cast_sql, (movie_id,))
-    movie["cast"] = [f"{r['name']} ({r['category']})" for r in cast_rows if r.get("name")]
+    movie["cast"] = [f"{name} ({category})" for name, category in payload.get("cast") or [] if name]
 
     # Alternate titles
-    alt_sql = """
-        SELECT t.title, t.region
-        FROM titles t
-        WHERE t.movie_id = ?
-        ORDER BY t.region IS NULL, t.region, t.title
-        LIMIT 25
-    """
-    alt_rows = _fetchall(alt_sql, (movie_id,))
     alts: List[str] = []
-    for r in alt_rows:
-        title = (r.get("title") or "").strip()
+    for title, region in payload.get("alt_titles") or []:
+        title = (title or "").strip()
         if not title:
             continue
-        region = _normalize_region(r.get("region"))
+        region = _normalize_region(region)
         alts.append(f"{title} [{region}]" if region else title)
     movie["alt_titles"] = alts
 
@@ -252,32 +598,103 @@ def get_movie_by_id(movie_id: str) -> Optional[Dict[str, Any]]:
     return movie
 
 
+def _fts_match(q: str) -> str:
+    """
+    'tom han' -> '"tom han"' : with the trigram tokenizer a quoted string matches
+    as a case-insensitive substring, i.e. the same rows as LIKE '%tom han%'.
+    Quoting also keeps FTS5 operators (AND, NEAR, -, ...) typed by the user literal.
+    Returns "" when q is shorter than a trigram (caller falls back to LIKE).
+    """
+    if len(q) < 3:
+        return ""
+    return '"' + q.replace('"', '""') + '"'
+
+
+# Search SQL is fixed text (only the bound values change), so each variant is
+# prepared once per connection and then served from the statement cache.
+_SEARCH_MOVIES_SQL = """
+    SELECT
+        m.movie_id,
+        m.primary_title,
+        m.start_year,
+        r.average_rating AS rating,
+        r.average_rating AS average_rating,
+        r.num_votes AS votes,
+        r.num_votes AS num_votes
+    FROM {source}
+    LEFT JOIN ratings r ON r.movie_id = m.movie_id
+    WHERE m.title_type = 'movie'
+      AND {predicate}
+    ORDER BY
+        (r.average_rating IS NULL) ASC,
+        r.average_rating DESC,
+        (r.num_votes IS NULL) ASC,
+        r.num_votes DESC
+    LIMIT ?
+"""
+# Posting-list lookup in the FTS5 index instead of a LIKE '%q%' table scan
+_SEARCH_MOVIES_FTS_SQL = _SEARCH_MOVIES_SQL.format(
+    source="movies_fts f JOIN movies m ON m.rowid = f.rowid",
+    predicate="movies_fts MATCH ?",
+)
+_SEARCH_MOVIES_LIKE_SQL = _SEARCH_MOVIES_SQL.format(
+    source="movies m",
+    predicate="(m.primary_title LIKE ? ESCAPE '\\' OR m.original_title LIKE ? ESCAPE '\\')",
+)
+# 'q%' (no leading wildcard): range scan of idx_movies_title_nocase
+_SEARCH_MOVIES_PREFIX_SQL = _SEARCH_MOVIES_SQL.format(
+    source="movies m",
+    predicate="m.primary_title LIKE ? ESCAPE '\\'",
+)
+
+_SEARCH_PEOPLE_FTS_SQL = """
+    SELECT p.person_id, p.name, p.birth_year, p.death_year
+    FROM persons_fts f
+    JOIN persons p ON p.rowid = f.rowid
+    WHERE persons_fts MATCH ?
+    ORDER BY p.name
+    LIMIT ?
+"""
+_SEARCH_PEOPLE_LIKE_SQL = """
+    SELECT person_id, name, birth_year, death_year
+    FROM persons
+    WHERE name LIKE ? ESCAPE '\\'
+    ORDER BY name
+    LIMIT ?
+"""
+
+
+def _like_escape(q: str) -> str:
+    """User text as a literal LIKE operand (ESCAPE '\\'): % and _ lose their wildcard meaning."""
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_search(
+    prefix_sql: str, substring_sql: str, q: str, limit: int, key: str, like_args: int = 1
+) -> List[Dict[str, Any]]:
+    """
+    LIKE fallback when FTS cannot serve the query: 'q%' first (index range scan
+    on the NOCASE title/name index), then '%q%' only to fill the remaining slots;
+    skipped for 1-2 character queries, where a substring scan matches nearly everything.
+    """
+    pattern = _like_escape(q)
+    rows = _fetchall(prefix_sql, (pattern + "%", limit))
+    if len(rows) < limit and len(q) >= 3:
+        seen = {row[key] for row in rows}
+        more = _fetchall(substring_sql, (f"%{pattern}%",) * like_args + (limit,))
+        rows += [row for row in more if row[key] not in seen][: limit - len(rows)]
+    return rows
+
+
 def search_movies(query: str, limit: int = 30) -> List[Dict[str, Any]]:
     q = (query or "").strip()
     if not q:
         return []
-    like = f"%{q}%"
-    sql = """
-        SELECT
-            m.movie_id,
-            m.primary_title,
-            m.start_year,
-            r.average_rating AS rating,
-            r.average_rating AS average_rating,
-            r.num_votes AS votes,
-            r.num_votes AS num_votes
-        FROM movies m
-        LEFT JOIN ratings r ON r.movie_id = m.movie_id
-        WHERE m.title_type = 'movie'
-          AND (m.primary_title LIKE ? OR m.original_title LIKE ?)
-        ORDER BY
-            (r.average_rating IS NULL) ASC,
-            r.average_rating DESC,
-            (r.num_votes IS NULL) ASC,
-            r.num_votes DESC
-        LIMIT ?
-    """
-    rows = _fetchall(sql, (like, like, limit))
+    match = _fts_match(q)
+    if match and "movies_fts" in _table_names():
+        rows = _fetchall(_SEARCH_MOVIES_FTS_SQL, (match, limit))
+    else:
+        rows = _like_search(_SEARCH_MOVIES_PREFIX_SQL, _SEARCH_MOVIES_LIKE_SQL, q, limit, "movie_id", 2)
     for row in rows:
         row["id"] = row.get("movie_id")
     return rows
@@ -287,28 +704,80 @@ def search_people(query: str, limit: int = 30) -> List[Dict[str, Any]]:
     q = (query or "").strip()
     if not q:
         return []
-    like = f"%{q}%"
-    sql = """
-        SELECT person_id, name, birth_year, death_year
-        FROM persons
-        WHERE name LIKE ?
-        ORDER BY name
-        LIMIT ?
-    """
-    return _fetchall(sql, (like, limit))
+    match = _fts_match(q)
+    if match and "persons_fts" in _table_names():
+        return _fetchall(_SEARCH_PEOPLE_FTS_SQL, (match, limit))
+    return _like_search(_SEARCH_PEOPLE_LIKE_SQL, _SEARCH_PEOPLE_LIKE_SQL, q, limit, "person_id")
+
+
+# Both FTS lookups in one statement (one prepare, one execution); each branch
+# keeps its own ORDER BY / LIMIT, rows are told apart by `kind`.
+_SEARCH_ALL_FTS_SQL = """
+    SELECT * FROM (
+        SELECT 'm' AS kind, m.movie_id, m.primary_title, m.start_year,
+               r.average_rating, r.num_votes
+        FROM movies_fts f
+        JOIN movies m ON m.rowid = f.rowid
+        LEFT JOIN ratings r ON r.movie_id = m.movie_id
+        WHERE m.title_type = 'movie'
+          AND movies_fts MATCH ?1
+        ORDER BY
+            (r.average_rating IS NULL) ASC,
+            r.average_rating DESC,
+            (r.num_votes IS NULL) ASC,
+            r.num_votes DESC
+        LIMIT ?2
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'p', p.person_id, p.name, p.birth_year, p.death_year, NULL
+        FROM persons_fts f
+        JOIN persons p ON p.rowid = f.rowid
+        WHERE persons_fts MATCH ?1
+        ORDER BY p.name
+        LIMIT ?3
+    )
+"""
 
 
 def search_all(query: str, limit_movies: int = 20, limit_people: int = 20) -> Dict[str, Any]:
-    return {
-        "movies": search_movies(query, limit_movies),
-        "persons": search_people(query, limit_people),
-    }
+    q = (query or "").strip()
+    match = _fts_match(q)
+    if not (match and {"movies_fts", "persons_fts"} <= _table_names()):
+        return {
+            "movies": search_movies(query, limit_movies),
+            "persons": search_people(query, limit_people),
+        }
+    movies: List[Dict[str, Any]] = []
+    persons: List[Dict[str, Any]] = []
+    for kind, key, label, year, a, b in _execute_tuples(
+        _SEARCH_ALL_FTS_SQL, (match, limit_movies, limit_people)
+    ).fetchall():
+        if kind == "m":
+            movies.append({
+                "movie_id": key, "id": key, "primary_title": label, "start_year": year,
+                "rating": a, "average_rating": a, "votes": b, "num_votes": b,
+            })
+        else:
+            persons.append({"person_id": key, "name": label, "birth_year": year, "death_year": a})
+    return {"movies": movies, "persons": persons}
 
 
+@_shared_cache()
 def list_genres(limit: int = 25) -> List[Tuple[str, int]]:
     """
     Used by stats.html: expects (genre, count) pairs.
+    Read from genre_counts (kept up to date by triggers) when it exists.
     """
+    if "genre_counts" in _table_names():
+        sql = """
+            SELECT genre, n
+            FROM genre_counts
+            WHERE n > 0 AND TRIM(genre) <> ''
+            ORDER BY n DESC, genre ASC
+            LIMIT ?
+        """
+        return [(str(genre), int(n)) for genre, n in _execute_tuples(sql, (limit,)).fetchall()]
     sql = """
         SELECT genre, COUNT(*) AS cnt
         FROM genres
@@ -317,77 +786,208 @@ def list_genres(limit: int = 25) -> List[Tuple[str, int]]:
         ORDER BY cnt DESC, genre ASC
         LIMIT ?
     """
-    with _connect() as conn:
-        cur = conn.execute(sql, (limit,))
-        rows = cur.fetchall()
-        return [(str(r["genre"]), int(r["cnt"])) for r in rows]
+    rows = _execute_tuples(sql, (limit,)).fetchall()
+    return [(str(genre), int(cnt)) for genre, cnt in rows]
+
+
+# Safety for table names interpolated in SQL: allow only [a-zA-Z0-9_]
+_is_identifier = re.compile(r"\A[A-Za-z0-9_]+\Z").match
+
+
+def _list_tables(conn: sqlite3.Connection) -> List[str]:
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+    # Skip FTS5 virtual tables and their shadow tables (movies_fts, movies_fts_data, ...)
+    virtual = [r[0] for r in rows if str(r[1] or "").upper().startswith("CREATE VIRTUAL")]
+    tables = [r[0] for r in rows if r[0] not in virtual and not any(r[0].startswith(v + "_") for v in virtual)]
+    return [name for name in tables if _is_identifier(name)]
+
+
+def _exact_counts(conn: sqlite3.Connection, tables: Sequence[str]) -> List[Tuple[str, int]]:
+    if not tables:
+        return []
+    # One UNION ALL statement instead of one COUNT(*) round trip per table
+    sql = " UNION ALL ".join(f"SELECT '{name}' AS name, COUNT(*) AS cnt FROM \"{name}\"" for name in tables)
+    return [(str(name), int(cnt)) for name, cnt in conn.execute(sql).fetchall()]
+
+
+@_ttl_cache()
+def list_decades() -> List[Tuple[int, int]]:
+    """
+    Used by stats.html: (decade, count) pairs, e.g. (1990, 1234).
+    The decade expression is spelled exactly like idx_movies_type_decade so the
+    GROUP BY walks that index in order (no per-row sort, no temp B-tree).
+    Read from decade_counts (kept up to date by triggers) when it exists.
+    """
+    if "decade_counts" in _table_names():
+        sql = "SELECT decade, n FROM decade_counts WHERE n > 0 ORDER BY decade"
+        return [(int(decade), int(n)) for decade, n in _execute_tuples(sql).fetchall()]
+    sql = """
+        SELECT (start_year / 10) * 10 AS decade, COUNT(*) AS cnt
+        FROM movies
+        WHERE title_type = 'movie' AND (start_year / 10) * 10 IS NOT NULL
+        GROUP BY (start_year / 10) * 10
+        ORDER BY decade
+    """
+    return [(int(decade), int(cnt)) for decade, cnt in _execute_tuples(sql).fetchall()]
+
+
+@_ttl_cache()
+def ratings_histogram() -> List[Tuple[float, int]]:
+    """
+    Used by stats.html: (bin, count) pairs by half-point of average_rating,
+    e.g. (7.5, 1234) counts ratings in [7.5, 8.0).
+    Same idea as list_decades: the bin expression matches idx_ratings_half_bin,
+    so the GROUP BY is an ordered scan of that (narrow) index.
+    """
+    sql = """
+        SELECT CAST(average_rating * 2 AS INTEGER) AS half_bin, COUNT(*) AS cnt
+        FROM ratings
+        GROUP BY CAST(average_rating * 2 AS INTEGER)
+        ORDER BY half_bin
+    """
+    return [(half_bin / 2, int(cnt)) for half_bin, cnt in _execute_tuples(sql).fetchall()]
 
 
+@_ttl_cache()
 def all_table_counts() -> List[Tuple[str, int]]:
     """
     Returns (table_name, count) for all user tables.
     """
-    with _connect() as conn:
-        tables = [r[0] for r in conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
-        ).fetchall()]
-        out: List[Tuple[str, int]] = []
-        for name in tables:
-            # Safety: allow only [a-zA-Z0-9_]
-            if not all(c.isalnum() or c == "_" for c in name):
-                continue
-            cnt = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
-            out.append((name, int(cnt)))
-        return out
+    conn = _connect()
+    return _exact_counts(conn, _list_tables(conn))
 
 
-def list_movies(
-    page: int = 1,
-    page_size: int = 24,
-    order: str = "rating",
-    year_min: Optional[int] = None,
-    year_max: Optional[int] = None,
-    rating_min: Optional[float] = None
-) -> Tuple[List[Dict[str, Any]], int]:
+@_ttl_cache()
+def all_table_counts_estimated() -> List[Tuple[str, int]]:
     """
-    Returns a paginated list of movies with total count and optional filters.
-    order can be: 'rating', 'votes', 'year', 'title'
-    Returns: (movies_list, total_count)
+    Same shape as all_table_counts(), but reads row estimates from sqlite_stat1
+    (filled by ANALYZE) instead of scanning each table.
+    Tables missing from sqlite_stat1 fall back to an exact COUNT(*).
     """
-    # Map order by to SQL
-    order_by = {
-        "rating": "(r.average_rating IS NULL) ASC, r.average_rating DESC, (r.num_votes IS NULL) ASC, r.num_votes DESC",
-        "votes": "(r.num_votes IS NULL) ASC, r.num_votes DESC",
-        "year": "m.start_year DESC",
-        "title": "m.primary_title ASC",
-    }.get(order, "(r.average_rating IS NULL) ASC, r.average_rating DESC")
+    conn = _connect()
+    tables = _list_tables(conn)
+    estimates: Dict[str, int] = {}
+    try:
+        rows = conn.execute("SELECT tbl, stat FROM sqlite_stat1").fetchall()
+    except sqlite3.OperationalError:
+        rows = []  # ANALYZE never ran
+    for tbl, stat in rows:
+        # stat = "<nb rows> <avg rows per key> ..." -> first integer is the row count
+        first = str(stat or "").split(" ", 1)[0]
+        if first.isdigit():
+            estimates[tbl] = max(estimates.get(tbl, 0), int(first))
+
+    exact = dict(_exact_counts(conn, [t for t in tables if t not in estimates]))
+    return [(name, estimates.get(name, exact.get(name, 0))) for name in tables]
+
+
+# Sort keys of list_movies, one tuple of SQL expressions per `order`.
+# Every expression sorts ASC (DESC columns are negated, NULLs pushed last by the
+# "IS NULL" flag) and m.movie_id makes the key unique, so a page can resume with a
+# single row-value comparison "(k0, k1, ...) > (?, ?, ...)" instead of OFFSET.
+# idx_movies_type_title_id / idx_movies_type_year_id (create_schema.py) index the
+# title and year keys as spelled here, so those pages are read in index order.
+_SORT_KEYS: Dict[str, Tuple[str, ...]] = {
+    "rating": (
+        "(r.average_rating IS NULL)", "-COALESCE(r.average_rating, 0)",
+        "(r.num_votes IS NULL)", "-COALESCE(r.num_votes, 0)", "m.movie_id",
+    ),
+    "votes": ("(r.num_votes IS NULL)", "-COALESCE(r.num_votes, 0)", "m.movie_id"),
+    "year": ("(m.start_year IS NULL)", "-COALESCE(m.start_year, 0)", "m.movie_id"),
+    "title": ("m.primary_title", "m.movie_id"),
+}
+
+# Indexes whose order matches _SORT_KEYS (script/phase1_sqlite/create_schema.py):
+# pinned with INDEXED BY so the planner walks them instead of sorting in a temp B-tree
+_SORT_INDEXES: Dict[str, str] = {
+    "year": "idx_movies_type_year_id",
+    "title": "idx_movies_type_title_id",
+}
+_RATINGS_JOIN_INDEX = "idx_ratings_movie_avg_votes"
 
-    # Build WHERE clause with filters
-    where_conditions = ["m.title_type = 'movie'"]
-    params: List[Any] = []
 
-    if year_min is not None:
+def _encode_cursor(order: str, key: Sequence[Any]) -> str:
+    raw = json.dumps([order, list(key)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: Optional[str], order: str) -> Optional[List[Any]]:
+    """Returns the sort key stored in `cursor`, or None if absent/invalid/for another order."""
+    if not cursor:
+        return None
+    try:
+        cursor_order, key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    # The cursor comes from the query string: only accept the shape we encode,
+    # with scalar values sqlite3 can bind
+    if not isinstance(cursor_order, str) or not isinstance(key, list):
+        return None
+    if cursor_order != order or len(key) != len(_SORT_KEYS[order]):
+        return None
+    if not all(v is None or isinstance(v, (str, int, float)) for v in key):
+        return None
+    return key
+
+
+@lru_cache(maxsize=64)
+def _list_movies_sql(
+    order: str,
+    has_genre: bool,
+    has_year_min: bool,
+    has_year_max: bool,
+    has_rating_min: bool,
+    keyset: bool,
+    indexes: frozenset,
+) -> Tuple[str, str]:
+    """
+    (count_sql, page_sql) for one predicate shape of list_movies. Predicates are
+    always emitted in the same order (genre, year_min, year_max, rating_min, keyset),
+    so a given shape always yields byte-identical SQL: built once here, then
+    prepared once per connection and served from the sqlite3 statement cache.
+    Parameters follow that order, then LIMIT, OFFSET.
+    """
+    sort_keys = _SORT_KEYS[order]
+
+    # Without a genre filter, walk movies in the index matching the sort (the
+    # COUNT keeps plain movies: the planner picks its own index there)
+    list_from_clause = "movies m"
+    if not has_genre and _SORT_INDEXES.get(order) in indexes:
+        list_from_clause = f"movies m INDEXED BY {_SORT_INDEXES[order]}"
+
+    # Covering index: rating/votes come from the index, the ratings row is never read
+    ratings_table = "ratings r"
+    if _RATINGS_JOIN_INDEX in indexes:
+        ratings_table += f" INDEXED BY {_RATINGS_JOIN_INDEX}"
+
+    where_conditions = ["m.title_type = 'movie'"]
+    # Genre filter as a semi-join: no row multiplication (so no DISTINCT), and the
+    # planner either seeks idx_genres_genre_movie(genre, movie_id) to drive the
+    # scan or probes it per movie, whichever its stats favour.
+    if has_genre:
+        where_conditions.append("m.movie_id IN (SELECT g.movie_id FROM genres g WHERE g.genre = ?)")
+    if has_year_min:
         where_conditions.append("m.start_year >= ?")
-        params.append(year_min)
-    if year_max is not None:
+    if has_year_max:
         where_conditions.append("m.start_year <= ?")
-        params.append(year_max)
-    if rating_min is not None:
+    if has_rating_min:
         where_conditions.append("r.average_rating >= ?")
-        params.append(rating_min)
-
     where_clause = " AND ".join(where_conditions)
 
-    # Get total count
-    count_sql = f"SELECT COUNT(*) FROM movies m LEFT JOIN ratings r ON r.movie_id = m.movie_id WHERE {where_clause}"
-    with _connect() as conn:
-        total = conn.execute(count_sql, params).fetchone()[0]
+    count_sql = (
+        f"SELECT COUNT(*) FROM movies m LEFT JOIN {ratings_table} ON r.movie_id = m.movie_id"
+        f" WHERE {where_clause}"
+    )
 
-    # Calculate offset
-    offset = (page - 1) * page_size
+    # Keyset: resume right after the last row of the previous page
+    if keyset:
+        where_clause += f" AND ({', '.join(sort_keys)}) > ({', '.join('?' * len(sort_keys))})"
 
-    # Fetch paginated results
-    sql = f"""
+    order_by = ", ".join(f"{k} ASC" for k in sort_keys)
+    key_columns = "".join(f",\n            {k} AS sort_k{i}" for i, k in enumerate(sort_keys))
+    page_sql = f"""
         SELECT
             m.movie_id,
             m.primary_title AS title,
@@ -396,33 +996,97 @@ def list_movies(
             r.average_rating AS rating,
             r.average_rating AS average_rating,
             r.num_votes AS votes,
-            r.num_votes AS num_votes,
-            GROUP_CONCAT(DISTINCT g.genre) AS genres_csv
-        FROM movies m
-        LEFT JOIN ratings r ON r.movie_id = m.movie_id
-        LEFT JOIN genres g ON g.movie_id = m.movie_id
+            r.num_votes AS num_votes{key_columns}
+        FROM {list_from_clause}
+        LEFT JOIN {ratings_table} ON r.movie_id = m.movie_id
         WHERE {where_clause}
-        GROUP BY m.movie_id
         ORDER BY {order_by}
         LIMIT ? OFFSET ?
     """
-    # Append pagination params
+    return count_sql, page_sql
+
+
+@_shared_cache()
+def _count_movies(
+    genre: Optional[str], year_min: Optional[int], year_max: Optional[int], rating_min: Optional[float]
+) -> int:
+    """
+    Total behind list_movies' page count, computed once per filter combination
+    and kept server-side in Django's cache, so page flips (cursor or page=N)
+    skip the COUNT(*). genre is already normalised (None = all genres).
+    """
+    count_sql, _ = _list_movies_sql(
+        "rating", genre is not None, year_min is not None, year_max is not None,
+        rating_min is not None, False, _index_names(),
+    )
+    params = [v for v in (genre, year_min, year_max, rating_min) if v is not None]
+    return _connect().execute(count_sql, params).fetchone()[0]
+
+
+def list_movies(
+    page: int = 1,
+    page_size: int = 24,
+    order: str = "rating",
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    rating_min: Optional[float] = None,
+    genre: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Returns a paginated list of movies with total count and optional filters.
+    order can be: 'rating', 'votes', 'year', 'title'
+    genre: exact genre name ("Drama"), None/"all" = no genre filter
+    cursor: row["cursor"] of the last movie of the previous page (keyset
+        pagination); when missing or invalid, `page` is used with OFFSET.
+    Returns: (movies_list, total_count)
+    """
+    if order not in _SORT_KEYS:
+        order = "rating"
+    sort_keys = _SORT_KEYS[order]
+    if not genre or genre == "all":
+        genre = None
+    last_key = _decode_cursor(cursor, order)
+    _, sql = _list_movies_sql(
+        order, genre is not None, year_min is not None, year_max is not None,
+        rating_min is not None, last_key is not None, _index_names(),
+    )
+
+    # Parameters in the builder's canonical order
+    params: List[Any] = [v for v in (genre, year_min, year_max, rating_min) if v is not None]
+
+    total = _count_movies(genre, year_min, year_max, rating_min)
+
+    # Keyset: resume right after the last row of the previous page
+    if last_key is not None:
+        params.extend(last_key)
+        offset = 0
+    else:
+        offset = (page - 1) * page_size
     params.append(page_size)
     params.append(offset)
-    
+
     rows = _fetchall(sql, params)
     for row in rows:
         row["id"] = row.get("movie_id")
-        genres_csv = row.pop("genres_csv", None)
-        if genres_csv:
-            genres = [g.strip() for g in str(genres_csv).split(",") if g.strip()]
-            row["genres"] = ", ".join(genres)
-        else:
-            row["genres"] = ""
+        row["cursor"] = _encode_cursor(order, [row.pop(f"sort_k{i}") for i in range(len(sort_keys))])
+    _attach_genres(rows)
 
     return rows, total
 
 
+# One statement (and one round-trip) for the four dashboard aggregates
+_STATS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM movies) AS total_movies,
+        (SELECT COUNT(*) FROM persons) AS total_persons,
+        AVG(average_rating) AS avg_rating,
+        AVG(num_votes) AS avg_votes
+    FROM ratings
+"""
+
+
+@_shared_cache()
 def stats_data() -> Dict[str, Any]:
     """
     Récupère statistiques agrégées pour tableau de bord.
@@ -434,14 +1098,36 @@ def stats_data() -> Dict[str, Any]:
     Retour:
         Dict avec clés: total_movies, total_persons, avg_rating, avg_votes
     
-    Note: Pas de cache - données actualisées à chaque requête
+    Note: résultat mis en cache 1 h dans le cache Django (_shared_cache), voir clear_caches()
+    """
+    return _fetchone(_STATS_SQL)
+
+
+def stats_page() -> Dict[str, Any]:
     """
-    return {
-        "total_movies": _fetchone("SELECT COUNT(*) AS cnt FROM movies")["cnt"],
-        "total_persons": _fetchone("SELECT COUNT(*) AS cnt FROM persons")["cnt"],
-        "avg_rating": _fetchone("SELECT AVG(average_rating) AS avg FROM ratings")["avg"],
-        "avg_votes": _fetchone("SELECT AVG(num_votes) AS avg FROM ratings")["avg"],
+    Everything stats.html needs: stats, tables, genres, decades, ratings_hist.
+    Cached parts are read inline; the cold aggregates run at the same time, each
+    thread on its own pooled connection (WAL allows concurrent readers and sqlite3
+    releases the GIL while a statement runs), so latency is the slowest query,
+    not the sum. A warm page starts no thread at all.
+    """
+    parts: Dict[str, Callable[[], Any]] = {
+        "stats": stats_data,
+        "tables": all_table_counts_estimated,
+        "genres": list_genres,
+        "decades": list_decades,
+        "ratings_hist": ratings_histogram,
     }
+    out = {key: func.cached() for key, func in parts.items()}
+    cold = [key for key, value in out.items() if value is _MISSING]
+    if len(cold) == 1:
+        out[cold[0]] = parts[cold[0]]()
+    elif cold:
+        with ThreadPoolExecutor(max_workers=len(cold)) as pool:
+            futures = {key: pool.submit(parts[key]) for key in cold}
+            out.update((key, future.result()) for key, future in futures.items())
+    return out
+
 
 
 # Backward-compatible aliases (in case views import these names)
@@ -1,3 +1,535 @@
-from django.test import TestCase
+import base64
+import importlib.util
+import json
+import shutil
+import sqlite3
+import tempfile
+from contextlib import nullcontext
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .services import sqlite_service
+from .services.sqlite_service import (
+    _SHARED_GENERATION_KEY,
+    _encode_cursor,
+    _fts_match,
+    _shared_cache,
+    _ttl_cache,
+    clear_caches,
+    get_movie_by_id,
+    home_lists,
+    list_genres,
+    list_movies,
+    rebuild_top_caches,
+    stats_page,
+    search_all,
+    search_movies,
+    search_people,
+)
+
+
+def _load_create_schema():
+    # Real schema (tables, indexes, FTS5, counters) from the phase 1 script
+    path = Path(settings.BASE_DIR) / "script" / "phase1_sqlite" / "create_schema.py"
+    spec = importlib.util.spec_from_file_location("create_schema", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+create_schema = _load_create_schema()
+
+# Small IMDb-shaped database: only the tables and indexes list_movies reads.
+_FIXTURE_SCHEMA = """
+CREATE TABLE movies (
+    movie_id TEXT PRIMARY KEY,
+    title_type TEXT,
+    primary_title TEXT,
+    start_year INTEGER
+);
+CREATE TABLE ratings (
+    movie_id TEXT PRIMARY KEY,
+    average_rating REAL NOT NULL,
+    num_votes INTEGER NOT NULL
+);
+CREATE TABLE genres (
+    movie_id TEXT,
+    genre TEXT
+);
+CREATE INDEX idx_ratings_movie_avg_votes ON ratings(movie_id, average_rating, num_votes);
+CREATE INDEX idx_movies_type_title_id ON movies(title_type, primary_title, movie_id);
+CREATE INDEX idx_movies_type_year_id
+    ON movies(title_type, (start_year IS NULL), -COALESCE(start_year, 0), movie_id);
+"""
+
+
+def _fixture_rows():
+    # Ties on rating / votes / year / title and missing years or ratings, so
+    # every sort key column (and the movie_id tie-breaker) matters.
+    movies, ratings, genres = [], [], []
+    for i in range(23):
+        movie_id = f"tt{i:07d}"
+        year = None if i % 7 == 0 else 1980 + i % 5
+        movies.append((movie_id, "movie", f"Title {i % 6}", year))
+        if i % 5 != 0:
+            ratings.append((movie_id, 5.0 + i % 3, 100 * (i % 4)))
+        genres.append((movie_id, "Drama" if i % 2 else "Comedy"))
+    # Not a movie: never listed
+    movies.append(("tt9999999", "tvSeries", "Title 0", 1990))
+    ratings.append(("tt9999999", 9.9, 1000))
+    return movies, ratings, genres
+
+
+def _reset_connections():
+    # Pooled connections point at the previous IMDB_SQLITE_PATH: drop this
+    # thread's lease, then close everything left in the pool.
+    sqlite_service._tls.__dict__.pop("lease", None)
+    while True:
+        try:
+            sqlite_service._pool.get_nowait().close()
+        except sqlite_service.queue.Empty:
+            break
+
+
+class SqliteFixtureTestCase(TestCase):
+    """Points IMDB_SQLITE_PATH at a temporary database filled by populate()."""
+
+    @classmethod
+    def populate(cls, conn):
+        raise NotImplementedError
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.mkdtemp()
+        db_path = Path(cls.tmpdir) / "imdb.db"
+        conn = sqlite3.connect(db_path)
+        cls.populate(conn)
+        conn.commit()
+        conn.close()
+        cls.settings_override = override_settings(IMDB_SQLITE_PATH=str(db_path))
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        _reset_connections()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.tmpdir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        _reset_connections()
+        clear_caches()
+
+
+class ImdbFixtureTestCase(SqliteFixtureTestCase):
+    """Fixture loaded like import_data.py: tables, rows, then create_derived()."""
+
+    # {table: [row tuples]}, inserted in this order
+    rows = {}
+
+    @classmethod
+    def populate(cls, conn):
+        conn.executescript(create_schema.DDL_SCRIPT)
+        for table, rows in cls.rows.items():
+            if rows:
+                placeholders = ", ".join("?" * len(rows[0]))
+                conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+        create_schema.create_derived(conn)
+
+
+class ListMoviesTests(SqliteFixtureTestCase):
+    @classmethod
+    def populate(cls, conn):
+        movies, ratings, genres = _fixture_rows()
+        conn.executescript(_FIXTURE_SCHEMA)
+        conn.executemany("INSERT INTO movies VALUES (?, ?, ?, ?)", movies)
+        conn.executemany("INSERT INTO ratings VALUES (?, ?, ?)", ratings)
+        conn.executemany("INSERT INTO genres VALUES (?, ?)", genres)
+
+    def _walk_with_cursor(self, page_size, **filters):
+        pages, cursor = [], None
+        while True:
+            rows, _ = list_movies(page_size=page_size, cursor=cursor, **filters)
+            if not rows:
+                return pages
+            pages.append([r["movie_id"] for r in rows])
+            cursor = rows[-1]["cursor"]
+
+    def _walk_with_offset(self, page_size, **filters):
+        pages, page = [], 1
+        while True:
+            rows, _ = list_movies(page=page, page_size=page_size, **filters)
+            if not rows:
+                return pages
+            pages.append([r["movie_id"] for r in rows])
+            page += 1
+
+    def test_cursor_pages_match_offset_pages(self):
+        for order in ("rating", "votes", "year", "title"):
+            for filters in ({}, {"genre": "Drama"}, {"year_min": 1981, "rating_min": 6.0}):
+                with self.subTest(order=order, **filters):
+                    by_cursor = self._walk_with_cursor(4, order=order, **filters)
+                    by_offset = self._walk_with_offset(4, order=order, **filters)
+                    self.assertEqual(by_cursor, by_offset)
+                    ids = [movie_id for page in by_cursor for movie_id in page]
+                    self.assertEqual(len(ids), len(set(ids)))
+
+    def test_lists_every_movie_once(self):
+        _, total = list_movies(order="title")
+        ids = [movie_id for page in self._walk_with_cursor(5, order="title") for movie_id in page]
+        self.assertEqual(total, 23)
+        self.assertEqual(len(ids), 23)
+        self.assertNotIn("tt9999999", ids)
+
+    def test_rating_order_puts_unrated_last(self):
+        ids = [movie_id for page in self._walk_with_cursor(6, order="rating") for movie_id in page]
+        rated = {f"tt{i:07d}" for i in range(23) if i % 5 != 0}
+        self.assertEqual(set(ids[:len(rated)]), rated)
+
+    def test_rows_carry_id_and_genres(self):
+        rows, _ = list_movies(page_size=3, order="title")
+        for row in rows:
+            self.assertEqual(row["id"], row["movie_id"])
+            self.assertIn(row["genres"], ("Drama", "Comedy"))
+            self.assertNotIn("sort_k0", row)
+
+    def test_malformed_cursor_falls_back_to_page(self):
+        first_page, _ = list_movies(page=1, page_size=4, order="year")
+        second_page, _ = list_movies(page=2, page_size=4, order="year")
+        good_key = json.loads(base64.urlsafe_b64decode(first_page[-1]["cursor"]))[1]
+
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+        malformed = {
+            "not base64": "%%%",
+            "not json": base64.urlsafe_b64encode(b"{oops").decode("ascii"),
+            "not unicode": "été",
+            "not a pair": encode({"order": "year"}),
+            "three items": encode(["year", good_key, 1]),
+            "other order": _encode_cursor("title", ["Title 0", "tt0000000"]),
+            "key not a list": encode(["year", "tt0000000"]),
+            "key too short": encode(["year", good_key[:-1]]),
+            "key too long": encode(["year", good_key + [1]]),
+            "nested value": encode(["year", [0, [1], "tt0000000"]]),
+            "dict value": encode(["year", [0, {"a": 1}, "tt0000000"]]),
+        }
+        for label, cursor in malformed.items():
+            with self.subTest(label):
+                rows, _ = list_movies(page=2, page_size=4, order="year", cursor=cursor)
+                self.assertEqual([r["movie_id"] for r in rows], [r["movie_id"] for r in second_page])
+
+    def test_all_genres_shares_the_count_of_no_genre(self):
+        _, total = list_movies(genre="all")
+        self.assertEqual(total, 23)
+        self.assertEqual(sqlite_service._count_movies.cached(None, None, None, None), 23)
+        self.assertEqual(list_movies(genre=None)[1], 23)
+        self.assertEqual(list_movies(genre="Drama")[1], 11)
+
+    def test_view_ignores_total_from_query_string(self):
+        response = self.client.get("/movies/", {"page": 2, "order": "title", "total": 999999})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total"], 23)
+        self.assertNotContains(response, "999999")
+
+    def test_unknown_order_uses_rating(self):
+        rows, _ = list_movies(page_size=5, order="popularity")
+        expected, _ = list_movies(page_size=5, order="rating")
+        self.assertEqual([r["movie_id"] for r in rows], [r["movie_id"] for r in expected])
+
+
+class SearchTests(ImdbFixtureTestCase):
+    # (movie_id, title_type, primary_title, original_title, is_adult, start_year, end_year, runtime)
+    rows = {
+        "movies": [
+            ("tt0000001", "movie", "Toy Story", "Toy Story", 0, 1995, None, 81),
+            ("tt0000002", "movie", "Story of a Toy", None, 0, 2001, None, 90),
+            ("tt0000003", "movie", "100% Love", None, 0, 2011, None, 95),
+            ("tt0000004", "movie", "Snake_Eyes", "Snake Eyes", 0, 1998, None, 98),
+            ("tt0000005", "movie", 'Say "Hello"', None, 0, 2005, None, 100),
+            ("tt0000006", "movie", "It's Story Time", None, 0, 1987, None, 70),
+            ("tt0000007", "movie", "Le Voyage", "The Journey", 0, 1960, None, 110),
+            ("tt0000008", "tvSeries", "Story Land", None, 0, 2010, 2012, 30),
+            ("tt0000009", "movie", "To Be", None, 0, 1942, None, 99),
+            ("tt0000010", "movie", "Tom and Jerry", None, 0, 2021, None, 101),
+            ("tt0000011", "movie", "Snakes", None, 0, 2003, None, 85),
+        ],
+        "ratings": [
+            ("tt0000001", 8.3, 1000),
+            ("tt0000002", 6.1, 50),
+            ("tt0000003", 5.5, 20),
+            ("tt0000004", 6.0, 300),
+            ("tt0000005", 7.0, 40),
+            ("tt0000006", 7.0, 80),
+            ("tt0000007", 7.9, 600),
+            ("tt0000008", 9.0, 5000),
+            ("tt0000009", 8.0, 900),
+            ("tt0000011", 4.2, 10),
+        ],
+        "persons": [
+            ("nm0000001", "Tom Hanks", 1956, None),
+            ("nm0000002", "Tommy Lee Jones", 1946, None),
+            ("nm0000003", "Ann O'Neil", 1970, None),
+            ("nm0000004", "Tom_Cat", 1940, None),
+            ("nm0000005", "Ta% Tang", 1980, None),
+            ("nm0000006", "Bo", 1990, 2020),
+        ],
+    }
+
+    def _ids(self, rows, key="movie_id"):
+        return sorted(row[key] for row in rows)
+
+    def _without_fts(self):
+        # Same database as seen before the FTS5 tables existed
+        return mock.patch.object(sqlite_service, "_table_names", return_value=frozenset())
+
+    def test_fts_match_quotes_the_query(self):
+        self.assertEqual(_fts_match("tom han"), '"tom han"')
+        self.assertEqual(_fts_match('say "hi"'), '"say ""hi"""')
+        self.assertEqual(_fts_match("a OR b"), '"a OR b"')
+        self.assertEqual(_fts_match("to"), "")
+        self.assertEqual(_fts_match(""), "")
+
+    def test_short_query_uses_prefix_like(self):
+        # 2 characters: no trigram, prefix LIKE only ("Story of a Toy" contains "to")
+        self.assertEqual(self._ids(search_movies("to")), ["tt0000001", "tt0000009", "tt0000010"])
+        self.assertEqual(self._ids(search_people("TO"), "person_id"), ["nm0000001", "nm0000002", "nm0000004"])
+        self.assertEqual(self._ids(search_people("Bo"), "person_id"), ["nm0000006"])
+
+    def test_quotes_and_like_wildcards_are_literal(self):
+        for use_fts in (True, False):
+            with self.subTest(fts=use_fts):
+                with nullcontext() if use_fts else self._without_fts():
+                    self.assertEqual(self._ids(search_movies('"Hello"')), ["tt0000005"])
+                    self.assertEqual(self._ids(search_movies("it's")), ["tt0000006"])
+                    self.assertEqual(self._ids(search_movies("100%")), ["tt0000003"])
+                    self.assertEqual(self._ids(search_movies("e_E")), ["tt0000004"])
+                    self.assertEqual(search_movies("%"), [])
+                    self.assertEqual(search_movies("_"), [])
+                    self.assertEqual(self._ids(search_people("Tom_"), "person_id"), ["nm0000004"])
+                    self.assertEqual(self._ids(search_people("a% T"), "person_id"), ["nm0000005"])
+                    self.assertEqual(self._ids(search_people("o'n"), "person_id"), ["nm0000003"])
+
+    def test_fts_matches_like(self):
+        for query in ("story", "TOY", "the journey", "snake", "tom", "ake", "y s", "nothing"):
+            with self.subTest(query):
+                fts_movies, fts_people = search_movies(query, 50), search_people(query, 50)
+                with self._without_fts():
+                    like_movies, like_people = search_movies(query, 50), search_people(query, 50)
+                self.assertEqual(self._ids(fts_movies), self._ids(like_movies))
+                self.assertEqual(self._ids(fts_people, "person_id"), self._ids(like_people, "person_id"))
+
+    def test_fixture_has_fts_tables(self):
+        self.assertLessEqual({"movies_fts", "persons_fts"}, sqlite_service._table_names())
+
+    def test_fts_orders_by_rating(self):
+        rows = search_movies("story")
+        self.assertEqual([r["movie_id"] for r in rows], ["tt0000001", "tt0000006", "tt0000002"])
+        self.assertEqual(rows[0]["id"], "tt0000001")
+        self.assertEqual(rows[0]["rating"], 8.3)
+        self.assertEqual(search_movies("story", limit=1)[0]["movie_id"], "tt0000001")
+
+    def test_search_all_matches_separate_searches(self):
+        for query in ("tom", "story", "to", "100%", "  ", "nothing"):
+            with self.subTest(query):
+                self.assertEqual(search_all(query, 3, 2), {
+                    "movies": search_movies(query, 3),
+                    "persons": search_people(query, 2),
+                })
+
+
+class MovieDetailTests(ImdbFixtureTestCase):
+    rows = {
+        "movies": [
+            ("tt0000001", "movie", "Full Movie", "Film Complet", 0, 1999, None, 120),
+            ("tt0000002", "movie", "Bare Movie", None, 1, None, None, None),
+        ],
+        "ratings": [("tt0000001", 7.5, 1234)],
+        "persons": [
+            ("nm0000001", "Zoe Actor", 1970, None),
+            ("nm0000002", "Adam Actor", 1980, None),
+            ("nm0000003", "Dora Director", 1950, 2010),
+            ("nm0000004", "Carl Director", 1955, None),
+            ("nm0000005", "Wendy Writer", 1960, None),
+            ("nm0000006", "Pete Producer", 1965, None),
+        ],
+        "genres": [("tt0000001", "Drama"), ("tt0000001", "Crime")],
+        "directors": [("tt0000001", "nm0000003"), ("tt0000001", "nm0000004")],
+        "writers": [("tt0000001", "nm0000005")],
+        # (movie_id, person_id, ordering, category, job)
+        "principals": [
+            ("tt0000001", "nm0000001", 1, "actress", None),
+            ("tt0000001", "nm0000002", 2, "actor", None),
+            ("tt0000001", "nm0000006", 3, "producer", "producer"),
+            ("tt0000002", "nm0000006", 1, "producer", "producer"),
+        ],
+        "titles": [
+            ("tt0000001", "FR", "Film Complet"),
+            ("tt0000001", "\\N", "Full Movie"),
+            ("tt0000001", "DE", "  "),
+        ],
+    }
+
+    def test_full_movie(self):
+        movie = get_movie_by_id("tt0000001")
+        self.assertEqual(movie, {
+            "movie_id": "tt0000001",
+            "id": "tt0000001",
+            "pk": "tt0000001",
+            "title_type": "movie",
+            "primary_title": "Full Movie",
+            "original_title": "Film Complet",
+            "is_adult": 0,
+            "start_year": 1999,
+            "end_year": None,
+            "runtime_minutes": 120,
+            "rating": 7.5,
+            "average_rating": 7.5,
+            "votes": 1234,
+            "num_votes": 1234,
+            "genres": "Crime, Drama",
+            "directors": ["Carl Director", "Dora Director"],
+            "writers": ["Wendy Writer"],
+            "cast": ["Zoe Actor (actress)", "Adam Actor (actor)"],
+            # ordered by region: "FR" < "\\N" (shown without a region), blank title dropped
+            "alt_titles": ["Film Complet [FR]", "Full Movie"],
+        })
+
+    def test_movie_without_rating_or_people(self):
+        movie = get_movie_by_id("tt0000002")
+        self.assertEqual(movie["primary_title"], "Bare Movie")
+        self.assertIsNone(movie["original_title"])
+        self.assertIsNone(movie["start_year"])
+        for key in ("rating", "average_rating", "votes", "num_votes"):
+            self.assertIsNone(movie[key])
+        self.assertEqual(movie["genres"], "")
+        self.assertEqual(movie["directors"], [])
+        self.assertEqual(movie["writers"], [])
+        self.assertEqual(movie["cast"], [])
+        self.assertEqual(movie["alt_titles"], [])
+
+    def test_unknown_movie(self):
+        self.assertIsNone(get_movie_by_id("tt9999999"))
+        self.assertIsNone(get_movie_by_id(""))
+
+
+class CacheDecoratorTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.calls = []
+
+    def _counted(self, decorator):
+        @decorator
+        def compute(x, scale=1):
+            self.calls.append(x)
+            return [x * scale]
+        return compute
+
+    def test_ttl_cache_memoizes_per_arguments(self):
+        compute = self._counted(_ttl_cache(ttl=60))
+        self.assertEqual(compute(2), [2])
+        self.assertEqual(compute(2), [2])
+        self.assertEqual(compute(2, scale=3), [6])
+        self.assertEqual(self.calls, [2, 2])
+
+    def test_ttl_cache_expires(self):
+        compute = self._counted(_ttl_cache(ttl=60))
+        with mock.patch.object(sqlite_service.time, "monotonic", return_value=1000.0):
+            compute(1)
+            compute(1)
+        with mock.patch.object(sqlite_service.time, "monotonic", return_value=1061.0):
+            compute(1)
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_clear_caches_empties_ttl_cache(self):
+        compute = self._counted(_ttl_cache(ttl=60))
+        compute(1)
+        clear_caches()
+        compute(1)
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_shared_cache_memoizes_in_django_cache(self):
+        compute = self._counted(_shared_cache(ttl=60))
+        self.assertEqual(compute(2), [2])
+        self.assertEqual(compute(2), [2])
+        self.assertEqual(compute(3), [3])
+        self.assertEqual(self.calls, [2, 3])
+
+    def test_generation_bump_invalidates_shared_entries(self):
+        compute = self._counted(_shared_cache(ttl=60))
+        compute(1)
+        generation = cache.get(_SHARED_GENERATION_KEY)
+        clear_caches()
+        self.assertNotEqual(cache.get(_SHARED_GENERATION_KEY), generation)
+        compute(1)
+        compute(1)
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_evicted_generation_does_not_revive_old_entries(self):
+        compute = self._counted(_shared_cache(ttl=60))
+        compute(1)
+        cache.delete(_SHARED_GENERATION_KEY)
+        compute(1)
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_generation_missing_on_clear(self):
+        cache.delete(_SHARED_GENERATION_KEY)
+        clear_caches()
+        self.assertIsNotNone(cache.get(_SHARED_GENERATION_KEY))
+
+
+class CachedQueriesTests(ImdbFixtureTestCase):
+    rows = {
+        "movies": [
+            ("tt0000001", "movie", "Alpha", None, 0, 2001, None, 90),
+            ("tt0000002", "movie", "Beta", None, 0, 2002, None, 90),
+            ("tt0000003", "movie", "Gamma", None, 0, 2003, None, 90),
+        ],
+        "ratings": [("tt0000001", 8.0, 100), ("tt0000002", 7.0, 100)],
+        "genres": [("tt0000001", "Drama"), ("tt0000002", "Drama"), ("tt0000003", "Comedy")],
+    }
+
+    def _write(self, sql, params=()):
+        # Another process (import, manage.py) changing the data behind the caches
+        conn = sqlite3.connect(settings.IMDB_SQLITE_PATH)
+        with conn:
+            conn.execute(sql, params)
+        conn.close()
+
+    def test_clear_caches_refreshes_list_genres(self):
+        self.assertEqual(list_genres(), [("Drama", 2), ("Comedy", 1)])
+        self._write("INSERT INTO genres VALUES ('tt0000003', 'Horror')")
+        self._write("INSERT INTO genres VALUES ('tt0000001', 'Horror')")
+        self._write("INSERT INTO genres VALUES ('tt0000002', 'Horror')")
+        self.assertEqual(list_genres(), [("Drama", 2), ("Comedy", 1)])
+        clear_caches()
+        self.assertEqual(list_genres(), [("Horror", 3), ("Drama", 2), ("Comedy", 1)])
+
+    def test_rebuild_top_caches_refreshes_home_lists(self):
+        self.assertEqual(rebuild_top_caches(size=2), {"top_movies_cache": 2, "recent_movies_cache": 2})
+        top, recent = home_lists(2)
+        self.assertEqual([m["movie_id"] for m in top], ["tt0000001", "tt0000002"])
+        self.assertEqual([m["movie_id"] for m in recent], ["tt0000003", "tt0000002"])
+
+        self._write("INSERT INTO ratings VALUES ('tt0000003', 9.5, 100)")
+        # Cached pair, and top_movies_cache still holds the old ranking
+        self.assertEqual([m["movie_id"] for m in home_lists(2)[0]], ["tt0000001", "tt0000002"])
+        clear_caches()
+        self.assertEqual([m["movie_id"] for m in home_lists(2)[0]], ["tt0000001", "tt0000002"])
+
+        rebuild_top_caches(size=2)
+        top, _ = home_lists(2)
+        self.assertEqual([m["movie_id"] for m in top], ["tt0000003", "tt0000001"])
+
+    def test_warm_stats_page_starts_no_thread(self):
+        cold = stats_page()
+        self.assertEqual(set(cold), {"stats", "tables", "genres", "decades", "ratings_hist"})
+        self.assertEqual(cold["stats"]["total_movies"], 3)
+        with mock.patch.object(sqlite_service, "ThreadPoolExecutor") as executor:
+            self.assertEqual(stats_page(), cold)
+        executor.assert_not_called()
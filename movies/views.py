@@ -11,53 +11,70 @@ Fonctionnalités:
 """
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+
 from django.http import Http404
 from django.shortcuts import render
 
 from .services.sqlite_service import (
-    all_table_counts,
     get_movie_by_id,
+    home_lists,
     list_genres,
     list_movies,
-    list_top_movies,
-    list_recent_movies,
     search_all,
-    stats_data,
+    stats_page,
 )
 from .services.mongo_service import get_movie_complete
 
+# Appels MongoDB lancés en parallèle des requêtes SQLite (voir movie_detail)
+_background = ThreadPoolExecutor(max_workers=4, thread_name_prefix="views-bg")
+
 
 def home(request):
-    # Home = best rated movies (page 1)
-    movies, total = list_movies(page=1, page_size=24, order="rating")
+    # Home = best rated + most recent movies (home.html only renders these two lists)
+    top_movies, recent_movies = home_lists(12)
     return render(request, "movies/home.html", {
-        "movies": movies,
-        "total": total,
-        "top_movies": list_top_movies(12),
-        "recent_movies": list_recent_movies(12)
+        "top_movies": top_movies,
+        "recent_movies": recent_movies,
     })
 
 
+def _to_int(value: str | None) -> int | None:
+    # Empty values and "None" strings (from the pagination links) mean "no filter"
+    try:
+        return int(value) if value and value != "None" else None
+    except ValueError:
+        return None
+
+
+def _to_float(value: str | None) -> float | None:
+    try:
+        return float(value) if value and value != "None" else None
+    except ValueError:
+        return None
+
+
 def movies_list(request):
-    page = int(request.GET.get("page", "1") or 1)
+    page = max(_to_int(request.GET.get("page")) or 1, 1)
     order = request.GET.get("order", "rating") or "rating"
-    year_min = request.GET.get("year_min")
-    year_max = request.GET.get("year_max")
-    rating_min = request.GET.get("rating_min")
-    
-    # Convert to proper types, filtering out "None" strings and empty values
-    year_min = int(year_min) if year_min and year_min != "None" else None
-    year_max = int(year_max) if year_max and year_max != "None" else None
-    rating_min = float(rating_min) if rating_min and rating_min != "None" else None
-    
+    year_min = _to_int(request.GET.get("year_min"))
+    year_max = _to_int(request.GET.get("year_max"))
+    rating_min = _to_float(request.GET.get("rating_min"))
+    genre = request.GET.get("genre") or None
+    cursor = request.GET.get("cursor") or None
+
     movies, total = list_movies(
         page=page,
         page_size=24,
         order=order,
         year_min=year_min,
         year_max=year_max,
-        rating_min=rating_min
+        rating_min=rating_min,
+        genre=genre,
+        cursor=cursor,
     )
+    # Keyset cursor of the last row: the "next" link resumes after it (no OFFSET)
+    next_cursor = movies[-1]["cursor"] if len(movies) == 24 else None
     return render(
         request,
         "movies/movies_list.html",
@@ -68,7 +85,10 @@ def movies_list(request):
             "order": order,
             "year_min": year_min,
             "year_max": year_max,
-            "rating_min": rating_min
+            "rating_min": rating_min,
+            "genre": genre,
+            "genres": list_genres(),
+            "next_cursor": next_cursor,
         },
     )
 
@@ -92,6 +112,10 @@ def movie_detail(request, movie_id: str):
     Lève:
         Http404: Si le film n'existe dans aucune base de données
     """
+    # La lecture MongoDB part en arrière-plan pendant la requête SQLite :
+    # latence de la page = max(SQLite, MongoDB) au lieu de la somme
+    mongo_future = _background.submit(get_movie_complete, movie_id)
+
     # Récupération des données structurées depuis SQLite
     # (réalisateurs, scénaristes, cast, genres, ratings)
     movie = get_movie_by_id(movie_id)
@@ -100,7 +124,7 @@ def movie_detail(request, movie_id: str):
     
     # Tentative d'enrichissement avec données MongoDB (collection pré-agrégée)
     try:
-        mongo_movie = get_movie_complete(movie_id)
+        mongo_movie = mongo_future.result()
         if mongo_movie:
             # Fusion des données - MongoDB complète SQLite sans l'écraser
             movie["mongo_data"] = mongo_movie
@@ -122,14 +146,5 @@ def search_view(request):
 
 
 def stats_view(request):
-    data = stats_data()
-    # If your template wants these:
-    return render(
-        request,
-        "movies/stats.html",
-        {
-            "stats": data,
-            "tables": all_table_counts(),
-            "genres": list_genres(),
-        },
-    )
+    # stats, tables, genres, decades: computed concurrently on a cold cache
+    return render(request, "movies/stats.html", stats_page())
@@ -3,11 +3,16 @@
 from __future__ import annotations
 
 import os
+import statistics
+import sys
 import time
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, Dict, List, Tuple, Any
 
+from create_schema import QUERY_INDEXES, create_derived, drop_derived
+import queries as q
 from queries import (
     query_actor_filmography,
     query_top_n_movies,
@@ -21,7 +26,7 @@ from queries import (
 )
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
-DB_PATH = ROOT_DIR / "data" / "imdb.db"
+DB_PATH = Path(os.environ.get("IMDB_SQLITE_PATH", ROOT_DIR / "data" / "imdb.db"))
 
 # --------------------------------------------------------------------
 # Indexes qu’on va tester pour T1.4
@@ -31,9 +36,23 @@ INDEXES = [
     ("idx_principals_person", "CREATE INDEX IF NOT EXISTS idx_principals_person ON principals(person_id);"),
     ("idx_principals_movie", "CREATE INDEX IF NOT EXISTS idx_principals_movie ON principals(movie_id);"),
     ("idx_genres_genre", "CREATE INDEX IF NOT EXISTS idx_genres_genre ON genres(genre);"),
-    ("idx_movies_start_year", "CREATE INDEX IF NOT EXISTS idx_movies_start_year ON movies(start_year);"),
+    # Index partiel : seulement les lignes acteur/actrice (prédicat écrit comme dans
+    # queries.py pour que le planificateur le reconnaisse) ; category en dernière
+    # colonne pour qu'il soit couvrant (SQLite relit sinon la ligne pour le filtre)
+    ("idx_principals_actor",
+     "CREATE INDEX IF NOT EXISTS idx_principals_actor ON principals(person_id, movie_id, category) "
+     "WHERE category IN ('actor', 'actress');"),
+    # Index composites créés par create_schema.py (idx_movies_start_year inclus) :
+    # supprimés eux aussi pour la mesure « sans index »
+    *QUERY_INDEXES,
 ]
 
+# Structures dérivées de create_schema.py dont les requêtes se servent (FTS5 pour
+# le filtre sur le nom, instantané genre × note pour Q2/Q5/Q7) : supprimées avec
+# les index secondaires et triggers (drop_derived) pour une vraie mesure
+# « sans index », recréées ensuite par create_derived
+DERIVED_TABLES = ["movies_fts", "persons_fts", "genre_movie_ratings", "genre_movie_ratings_state"]
+
 
 # --------------------------------------------------------------------
 # Requêtes à benchmarker (T1.3)
@@ -76,19 +95,47 @@ def make_queries() -> Dict[str, Callable[[sqlite3.Connection], List[Tuple[Any, .
 # --------------------------------------------------------------------
 def time_query(conn: sqlite3.Connection, func: Callable[[sqlite3.Connection], Any], repeats: int = 3) -> float:
     """
-    Retourne le temps moyen en millisecondes pour exécuter la requête `repeats` fois.
+    Retourne le temps médian en millisecondes sur `repeats` exécutions de la requête
+    (la médiane est moins sensible qu'une moyenne à une exécution perturbée).
     """
     # 1 exécution de chauffe
     _ = func(conn)
 
-    t0 = time.perf_counter()
+    samples = []
     for _ in range(repeats):
+        t0 = time.perf_counter_ns()
         rows = func(conn)
         # on force la matérialisation
         _ = len(rows)
-    t1 = time.perf_counter()
+        samples.append(time.perf_counter_ns() - t0)
+
+    return statistics.median(samples) / 1e6  # ms
+
 
-    return (t1 - t0) * 1000.0 / repeats  # ms
+def _time_isolated(func: Callable[[sqlite3.Connection], Any], repeats: int) -> float:
+    # Une connexion par requête, en lecture seule : plusieurs lecteurs en parallèle
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        conn.execute("PRAGMA query_only = 1;")
+        return time_query(conn, func, repeats)
+    finally:
+        conn.close()
+
+
+def time_all(
+    queries: Dict[str, Callable[[sqlite3.Connection], Any]],
+    repeats: int = 3,
+    workers: int = 1,
+) -> Dict[str, float]:
+    """
+    Chronomètre toutes les requêtes, `workers` à la fois (chaque requête sur sa
+    propre connexion). Par défaut une à la fois : avec workers > 1 la durée
+    totale baisse mais les requêtes se disputent CPU et cache, ce qui fausse
+    chaque mesure.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {label: pool.submit(_time_isolated, func, repeats) for label, func in queries.items()}
+        return {label: future.result() for label, future in futures.items()}
 
 
 def print_table(results: List[Tuple[str, float, float]]):
@@ -130,53 +177,23 @@ def print_table(results: List[Tuple[str, float, float]]):
 # --------------------------------------------------------------------
 def explain_example(conn: sqlite3.Connection):
     """
-    Exemple d'utilisation d'EXPLAIN QUERY PLAN pour Q1 et Q2.
+    EXPLAIN QUERY PLAN de Q1 et Q2 avec le SQL réellement exécuté par queries.py
+    (filtre FTS5 ou LIKE, genre_movie_ratings ou jointure selon ce qui existe).
     Tu peux copier/coller la sortie dans le rapport.
     """
 
     cursor = conn.cursor()
 
     # Q1 : filmographie
-    sql_q1 = """
-    SELECT
-        m.primary_title,
-        m.start_year,
-        c.name AS character,
-        r.average_rating
-    FROM movies      AS m
-    JOIN principals  AS p  ON p.movie_id  = m.movie_id
-    JOIN persons     AS pe ON pe.person_id = p.person_id
-    LEFT JOIN characters AS c
-           ON c.movie_id  = m.movie_id
-          AND c.person_id = p.person_id
-    LEFT JOIN ratings AS r
-           ON r.movie_id = m.movie_id
-    WHERE pe.name LIKE ?
-      AND p.category IN ('actor', 'actress')
-    ORDER BY m.start_year DESC, m.primary_title ASC;
-    """
+    name_filter, param = q._name_filter(conn, "Tom Hanks")
+    sql_q1 = q._SQL_ACTOR_FILMOGRAPHY.format(name_filter=name_filter)
 
     print("\n=== EXPLAIN QUERY PLAN Q1 (filmographie) ===")
-    for row in cursor.execute("EXPLAIN QUERY PLAN " + sql_q1, ("%Tom Hanks%",)):
+    for row in cursor.execute("EXPLAIN QUERY PLAN " + sql_q1, (param, -1)):
         print(row)
 
     # Q2 : top N drama
-    sql_q2 = """
-    SELECT
-        m.primary_title,
-        m.start_year,
-        r.average_rating,
-        r.num_votes
-    FROM movies  AS m
-    JOIN genres  AS g ON g.movie_id = m.movie_id
-    JOIN ratings AS r ON r.movie_id = m.movie_id
-    WHERE g.genre = ?
-      AND m.start_year BETWEEN ? AND ?
-    ORDER BY r.average_rating DESC,
-             r.num_votes DESC,
-             m.primary_title ASC
-    LIMIT ?;
-    """
+    sql_q2 = q._SQL_TOP_N_MOVIES.format(genre_ratings=q._genre_ratings(conn))
 
     print("\n=== EXPLAIN QUERY PLAN Q2 (Top N Drama) ===")
     for row in cursor.execute("EXPLAIN QUERY PLAN " + sql_q2, ("Drama", 1990, 2020, 50)):
@@ -187,43 +204,57 @@ def explain_example(conn: sqlite3.Connection):
 # Main T1.4
 # --------------------------------------------------------------------
 def main():
+    # --workers N : nombre de requêtes chronométrées en même temps (défaut 1 = en série)
+    workers = 1
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+
     conn = sqlite3.connect(DB_PATH)
     conn.execute("PRAGMA foreign_keys = ON;")
 
     # Taille avant index
     size_before = os.path.getsize(DB_PATH)
 
-    # On supprime d'abord les index qu'on contrôle, pour avoir le cas “sans index”
+    # On supprime d'abord les index qu'on contrôle, pour avoir le cas “sans index” :
+    # index du benchmark, index secondaires / triggers de create_schema.py, FTS5
+    # et genre_movie_ratings (les requêtes reviennent à LIKE et aux jointures)
     cur = conn.cursor()
     for name, _ in INDEXES:
         cur.execute(f"DROP INDEX IF EXISTS {name};")
+    drop_derived(conn)
+    for name in DERIVED_TABLES:
+        cur.execute(f"DROP TABLE IF EXISTS {name};")
+    # Statistiques à jour dans les deux cas : sans ANALYZE le planificateur choisit
+    # ses index à l'aveugle et la comparaison mesurerait surtout ses heuristiques
+    cur.execute("ANALYZE;")
     conn.commit()
 
+    print("\n--- Plans SANS index ---")
+    explain_example(conn)
+
     queries = make_queries()
 
     # ---- temps sans index ----
-    times_no_idx = {}
-    print("Mesure des temps SANS index supplémentaires...")
-    for label, func in queries.items():
-        t = time_query(conn, func, repeats=3)
-        times_no_idx[label] = t
+    print(f"Mesure des temps SANS index supplémentaires ({workers} requête(s) en parallèle)...")
+    times_no_idx = time_all(queries, repeats=3, workers=workers)
+    for label, t in times_no_idx.items():
         print(f"{label}: {t:.2f} ms (sans index)")
 
     # ---- création des index ----
     print("\nCréation des index...")
+    create_derived(conn)
     for _, ddl in INDEXES:
         cur.execute(ddl)
+    cur.execute("ANALYZE;")
     conn.commit()
 
     # Taille après index
     size_after = os.path.getsize(DB_PATH)
 
     # ---- temps avec index ----
-    times_with_idx = {}
     print("\nMesure des temps AVEC index...")
-    for label, func in queries.items():
-        t = time_query(conn, func, repeats=3)
-        times_with_idx[label] = t
+    times_with_idx = time_all(queries, repeats=3, workers=workers)
+    for label, t in times_with_idx.items():
         print(f"{label}: {t:.2f} ms (avec index)")
 
     conn.close()
@@ -241,7 +272,9 @@ def main():
     print(f"- Avant index : {size_before / (1024*1024):.2f} Mo")
     print(f"- Après index : {size_after / (1024*1024):.2f} Mo")
 
-    # Exemple d'EXPLAIN pour le rapport
+    # Exemple d'EXPLAIN pour le rapport (Q2 : plusieurs prédicats + ORDER BY note
+    # LIMIT 50, la requête la plus sensible aux statistiques)
+    print("\n--- Plans AVEC index ---")
     conn2 = sqlite3.connect(DB_PATH)
     explain_example(conn2)
     conn2.close()
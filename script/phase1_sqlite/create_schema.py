@@ -1,16 +1,24 @@
 # scripts/phase1_sqlite/create_schema.py
 
+import os
+import re
 import sqlite3
 from pathlib import Path
 
-# Emplacement de la base SQLite : cineexplorer/data/imdb.db
-DB_PATH = Path(__file__).resolve().parents[2] / "data" / "imdb.db"
+# Emplacement de la base SQLite : cineexplorer/data/imdb.db, ou la variable
+# d'environnement IMDB_SQLITE_PATH (même règle que config/settings.py)
+DB_PATH = Path(os.environ.get("IMDB_SQLITE_PATH", Path(__file__).resolve().parents[2] / "data" / "imdb.db"))
 
 
 DDL_SCRIPT = """
 PRAGMA foreign_keys = OFF;
+-- Pages de 8 Ko (moins de niveaux de B-tree pour les index composites) ;
+-- n'a d'effet que sur une base neuve, avant la création de la première table
+PRAGMA page_size = 8192;
 
 -- On supprime les tables si elles existent déjà (ordre enfants -> parents)
+DROP TABLE IF EXISTS movies_fts;
+DROP TABLE IF EXISTS persons_fts;
 DROP TABLE IF EXISTS titles;
 DROP TABLE IF EXISTS professions;
 DROP TABLE IF EXISTS writers;
@@ -50,6 +58,8 @@ CREATE TABLE persons (
 -----------------------------------------------------------
 -- RELATIONS AUTOUR DES FILMS ET PERSONNES
 -----------------------------------------------------------
+-- Tables de liaison en WITHOUT ROWID : la ligne est stockée directement dans
+-- le B-tree de la clé primaire composite (pas de rowid + index de PK en double)
 
 -- Personnages joués par les acteurs
 CREATE TABLE characters (
@@ -61,7 +71,7 @@ CREATE TABLE characters (
         ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (person_id) REFERENCES persons(person_id)
         ON DELETE CASCADE ON UPDATE CASCADE
-);
+) WITHOUT ROWID;
 
 -- Films pour lesquels une personne est principalement connue
 CREATE TABLE knownformovies (
@@ -72,7 +82,7 @@ CREATE TABLE knownformovies (
         ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (person_id) REFERENCES persons(person_id)
         ON DELETE CASCADE ON UPDATE CASCADE
-);
+) WITHOUT ROWID;
 
 -- Genres associés aux films
 CREATE TABLE genres (
@@ -81,7 +91,7 @@ CREATE TABLE genres (
     PRIMARY KEY (movie_id, genre),
     FOREIGN KEY (movie_id) REFERENCES movies(movie_id)
         ON DELETE CASCADE ON UPDATE CASCADE
-);
+) WITHOUT ROWID;
 
 -- Notes et nombre de votes
 CREATE TABLE ratings (
@@ -115,7 +125,7 @@ CREATE TABLE directors (
         ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (person_id) REFERENCES persons(person_id)
         ON DELETE CASCADE ON UPDATE CASCADE
-);
+) WITHOUT ROWID;
 
 -- Scénaristes
 CREATE TABLE writers (
@@ -126,7 +136,7 @@ CREATE TABLE writers (
         ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (person_id) REFERENCES persons(person_id)
         ON DELETE CASCADE ON UPDATE CASCADE
-);
+) WITHOUT ROWID;
 
 -- Professions d'une personne (une personne peut avoir plusieurs jobs)
 CREATE TABLE professions (
@@ -135,7 +145,7 @@ CREATE TABLE professions (
     PRIMARY KEY (person_id, job_name),
     FOREIGN KEY (person_id) REFERENCES persons(person_id)
         ON DELETE CASCADE ON UPDATE CASCADE
-);
+) WITHOUT ROWID;
 
 -- Titres alternatifs par région
 CREATE TABLE titles (
@@ -145,10 +155,335 @@ CREATE TABLE titles (
     PRIMARY KEY (movie_id, region),
     FOREIGN KEY (movie_id) REFERENCES movies(movie_id)
         ON DELETE CASCADE ON UPDATE CASCADE
+) WITHOUT ROWID;
+"""
+
+
+# Index secondaires : séparés des tables pour que import_data.py puisse les
+# supprimer avant le chargement et les reconstruire en une passe à la fin
+# (un tri par index au lieu d'une mise à jour du B-tree à chaque ligne).
+# Les clés primaires restent : INSERT OR IGNORE et les clés étrangères en dépendent.
+INDEX_SCRIPT = """
+-----------------------------------------------------------
+-- INDEX UTILISÉS PAR L'APPLICATION DJANGO
+-----------------------------------------------------------
+
+-- Filtre genre de la liste des films : JOIN genres ... AND g.genre = ?
+CREATE INDEX IF NOT EXISTS idx_genres_genre_movie ON genres(genre, movie_id);
+
+-- Recherche sans FTS (requête < 3 caractères) : LIKE 'q%' en parcours d'intervalle,
+-- LIKE étant insensible à la casse il faut des index COLLATE NOCASE
+CREATE INDEX IF NOT EXISTS idx_movies_title_nocase ON movies(primary_title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_persons_name_nocase ON persons(name COLLATE NOCASE);
+
+-- Page stats : films par décennie (GROUP BY sur l'expression indexée)
+CREATE INDEX IF NOT EXISTS idx_movies_type_decade ON movies(title_type, (start_year / 10) * 10);
+
+-- Page stats : histogramme des notes par demi-point (même expression que la requête)
+CREATE INDEX IF NOT EXISTS idx_ratings_half_bin ON ratings(CAST(average_rating * 2 AS INTEGER));
+
+-- Top films (accueil) : ratings lus dans l'ordre note puis votes, sans tri
+CREATE INDEX IF NOT EXISTS idx_ratings_avg_votes ON ratings(average_rating, num_votes);
+
+-- Liste des films : LEFT JOIN ratings sur movie_id couvert par l'index (note et
+-- votes lus dans l'index, sans accès à la ligne de ratings)
+CREATE INDEX IF NOT EXISTS idx_ratings_movie_avg_votes ON ratings(movie_id, average_rating, num_votes);
+
+-- Liste des films, tri titre / année : mêmes clés que la pagination par curseur
+-- (_SORT_KEYS dans movies/services/sqlite_service.py)
+CREATE INDEX IF NOT EXISTS idx_movies_type_title_id ON movies(title_type, primary_title, movie_id);
+CREATE INDEX IF NOT EXISTS idx_movies_type_year_id
+    ON movies(title_type, (start_year IS NULL), -COALESCE(start_year, 0), movie_id);
+"""
+
+
+# Index des requêtes d'analyse (queries.py). Les jointures sur movie_id de
+# characters / directors / genres / ratings sont déjà couvertes par leur clé
+# primaire (ou idx_ratings_movie_avg_votes) ; il manque l'accès à principals par
+# personne et le filtre catégorie par film, plus l'intervalle d'années de Q2.
+# Aussi utilisés par benchmark_sqlite.py (comparaison avec / sans index).
+QUERY_INDEXES = [
+    # Q1 / Q4 / Q6 / Q9 : films d'une personne filtrés sur la catégorie (couvrant)
+    ("idx_principals_person_cat_movie",
+     "CREATE INDEX IF NOT EXISTS idx_principals_person_cat_movie "
+     "ON principals(person_id, category, movie_id);"),
+    # Acteurs d'un film (catégorie + personne lues dans l'index)
+    ("idx_principals_movie_cat",
+     "CREATE INDEX IF NOT EXISTS idx_principals_movie_cat "
+     "ON principals(movie_id, category, person_id);"),
+    # Q2 : m.start_year BETWEEN ? AND ?
+    ("idx_movies_start_year",
+     "CREATE INDEX IF NOT EXISTS idx_movies_start_year ON movies(start_year);"),
+]
+INDEX_SCRIPT += "\n".join(ddl for _, ddl in QUERY_INDEXES) + "\n"
+
+
+# Index plein texte (FTS5) pour la recherche du site : remplace LIKE '%q%'
+# (scan complet) par une recherche dans l'index inversé. Tokenizer trigram :
+# une chaîne de 3+ caractères entre guillemets se comporte comme LIKE '%q%'
+# (sous-chaîne, insensible à la casse). Tables "external content" : le texte
+# reste dans movies/persons, les triggers tiennent l'index à jour, 'rebuild'
+# (re)indexe les lignes déjà présentes.
+FTS_SCRIPT = """
+DROP TRIGGER IF EXISTS movies_fts_ai;
+DROP TRIGGER IF EXISTS movies_fts_ad;
+DROP TRIGGER IF EXISTS movies_fts_au;
+DROP TRIGGER IF EXISTS persons_fts_ai;
+DROP TRIGGER IF EXISTS persons_fts_ad;
+DROP TRIGGER IF EXISTS persons_fts_au;
+DROP TABLE IF EXISTS movies_fts;
+DROP TABLE IF EXISTS persons_fts;
+
+CREATE VIRTUAL TABLE movies_fts USING fts5(
+    primary_title, original_title,
+    content='movies', content_rowid='rowid', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE persons_fts USING fts5(
+    name,
+    content='persons', content_rowid='rowid', tokenize='trigram'
+);
+
+CREATE TRIGGER movies_fts_ai AFTER INSERT ON movies BEGIN
+    INSERT INTO movies_fts(rowid, primary_title, original_title)
+    VALUES (new.rowid, new.primary_title, new.original_title);
+END;
+CREATE TRIGGER movies_fts_ad AFTER DELETE ON movies BEGIN
+    INSERT INTO movies_fts(movies_fts, rowid, primary_title, original_title)
+    VALUES ('delete', old.rowid, old.primary_title, old.original_title);
+END;
+CREATE TRIGGER movies_fts_au AFTER UPDATE ON movies BEGIN
+    INSERT INTO movies_fts(movies_fts, rowid, primary_title, original_title)
+    VALUES ('delete', old.rowid, old.primary_title, old.original_title);
+    INSERT INTO movies_fts(rowid, primary_title, original_title)
+    VALUES (new.rowid, new.primary_title, new.original_title);
+END;
+
+CREATE TRIGGER persons_fts_ai AFTER INSERT ON persons BEGIN
+    INSERT INTO persons_fts(rowid, name) VALUES (new.rowid, new.name);
+END;
+CREATE TRIGGER persons_fts_ad AFTER DELETE ON persons BEGIN
+    INSERT INTO persons_fts(persons_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+END;
+CREATE TRIGGER persons_fts_au AFTER UPDATE ON persons BEGIN
+    INSERT INTO persons_fts(persons_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+    INSERT INTO persons_fts(rowid, name) VALUES (new.rowid, new.name);
+END;
+
+INSERT INTO movies_fts(movies_fts) VALUES ('rebuild');
+INSERT INTO persons_fts(persons_fts) VALUES ('rebuild');
+"""
+
+
+# Compteurs pré-agrégés de la page stats : films par genre et par décennie.
+# Les triggers tiennent les compteurs à jour pendant l'import (upsert sur une
+# petite table), la page lit ~30 lignes au lieu d'agréger genres / movies.
+# Les lignes à n = 0 (après suppressions) sont ignorées à la lecture.
+COUNTS_SCRIPT = """
+DROP TRIGGER IF EXISTS genre_counts_ai;
+DROP TRIGGER IF EXISTS genre_counts_ad;
+DROP TRIGGER IF EXISTS genre_counts_au;
+DROP TRIGGER IF EXISTS decade_counts_ai;
+DROP TRIGGER IF EXISTS decade_counts_ad;
+DROP TRIGGER IF EXISTS decade_counts_au;
+DROP TABLE IF EXISTS genre_counts;
+DROP TABLE IF EXISTS decade_counts;
+
+CREATE TABLE genre_counts (
+    genre TEXT PRIMARY KEY,
+    n     INTEGER NOT NULL
+);
+CREATE INDEX idx_genre_counts_n ON genre_counts(n DESC, genre);
+
+CREATE TABLE decade_counts (
+    decade INTEGER PRIMARY KEY,
+    n      INTEGER NOT NULL
 );
+
+CREATE TRIGGER genre_counts_ai AFTER INSERT ON genres BEGIN
+    INSERT INTO genre_counts(genre, n) VALUES (new.genre, 1)
+    ON CONFLICT(genre) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER genre_counts_ad AFTER DELETE ON genres BEGIN
+    UPDATE genre_counts SET n = n - 1 WHERE genre = old.genre;
+END;
+CREATE TRIGGER genre_counts_au AFTER UPDATE OF genre ON genres BEGIN
+    UPDATE genre_counts SET n = n - 1 WHERE genre = old.genre;
+    INSERT INTO genre_counts(genre, n) VALUES (new.genre, 1)
+    ON CONFLICT(genre) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER decade_counts_ai AFTER INSERT ON movies
+WHEN new.title_type = 'movie' AND new.start_year IS NOT NULL BEGIN
+    INSERT INTO decade_counts(decade, n) VALUES ((new.start_year / 10) * 10, 1)
+    ON CONFLICT(decade) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER decade_counts_ad AFTER DELETE ON movies
+WHEN old.title_type = 'movie' AND old.start_year IS NOT NULL BEGIN
+    UPDATE decade_counts SET n = n - 1 WHERE decade = (old.start_year / 10) * 10;
+END;
+CREATE TRIGGER decade_counts_au AFTER UPDATE OF title_type, start_year ON movies BEGIN
+    UPDATE decade_counts SET n = n - 1
+    WHERE old.title_type = 'movie' AND decade = (old.start_year / 10) * 10;
+    INSERT INTO decade_counts(decade, n)
+    SELECT (new.start_year / 10) * 10, 1
+    WHERE new.title_type = 'movie' AND new.start_year IS NOT NULL
+    ON CONFLICT(decade) DO UPDATE SET n = n + 1;
+END;
+
+INSERT INTO genre_counts(genre, n)
+SELECT genre, COUNT(*) FROM genres GROUP BY genre;
+INSERT INTO decade_counts(decade, n)
+SELECT (start_year / 10) * 10, COUNT(*)
+FROM movies
+WHERE title_type = 'movie' AND start_year IS NOT NULL
+GROUP BY (start_year / 10) * 10;
+"""
+
+# Table dénormalisée genre × film × note pour les requêtes d'analyse par genre
+# (queries.py : Q5, Q7) : instantané recalculé après chaque import, l'index
+# (genre, note, votes, titre) donne directement l'ordre du classement par genre.
+# genre_movie_ratings_state.stale passe à 1 dès qu'une table source change
+# hors import_data.py (triggers retirés par drop_derived pendant l'import) :
+# queries.py revient alors à la jointure jusqu'au prochain recalcul.
+GENRE_RATINGS_SCRIPT = """
+DROP TRIGGER IF EXISTS genre_ratings_stale_genres_ai;
+DROP TRIGGER IF EXISTS genre_ratings_stale_genres_ad;
+DROP TRIGGER IF EXISTS genre_ratings_stale_genres_au;
+DROP TRIGGER IF EXISTS genre_ratings_stale_movies_ai;
+DROP TRIGGER IF EXISTS genre_ratings_stale_movies_ad;
+DROP TRIGGER IF EXISTS genre_ratings_stale_movies_au;
+DROP TRIGGER IF EXISTS genre_ratings_stale_ratings_ai;
+DROP TRIGGER IF EXISTS genre_ratings_stale_ratings_ad;
+DROP TRIGGER IF EXISTS genre_ratings_stale_ratings_au;
+DROP TABLE IF EXISTS genre_movie_ratings;
+DROP TABLE IF EXISTS genre_movie_ratings_state;
+
+CREATE TABLE genre_movie_ratings AS
+SELECT
+    g.genre,
+    m.movie_id,
+    m.primary_title,
+    m.start_year,
+    r.average_rating,
+    r.num_votes
+FROM genres  AS g
+JOIN movies  AS m ON m.movie_id = g.movie_id
+JOIN ratings AS r ON r.movie_id = g.movie_id;
+
+CREATE INDEX idx_genre_movie_ratings
+ON genre_movie_ratings(genre, average_rating DESC, num_votes DESC, primary_title,
+                       start_year);
+
+CREATE TABLE genre_movie_ratings_state (stale INTEGER NOT NULL);
+INSERT INTO genre_movie_ratings_state(stale) VALUES (0);
+
+CREATE TRIGGER genre_ratings_stale_genres_ai AFTER INSERT ON genres BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
+
+CREATE TRIGGER genre_ratings_stale_genres_ad AFTER DELETE ON genres BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
+
+CREATE TRIGGER genre_ratings_stale_genres_au AFTER UPDATE OF genre, movie_id ON genres BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
+
+CREATE TRIGGER genre_ratings_stale_movies_ai AFTER INSERT ON movies BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
+
+CREATE TRIGGER genre_ratings_stale_movies_ad AFTER DELETE ON movies BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
+
+CREATE TRIGGER genre_ratings_stale_movies_au AFTER UPDATE OF movie_id, primary_title, start_year ON movies BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
+
+CREATE TRIGGER genre_ratings_stale_ratings_ai AFTER INSERT ON ratings BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
+
+CREATE TRIGGER genre_ratings_stale_ratings_ad AFTER DELETE ON ratings BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
+
+CREATE TRIGGER genre_ratings_stale_ratings_au AFTER UPDATE OF movie_id, average_rating, num_votes ON ratings BEGIN
+    UPDATE genre_movie_ratings_state SET stale = 1 WHERE stale = 0;
+END;
 """
 
 
+# Noms des index / triggers dérivés, lus dans les scripts ci-dessus
+INDEX_NAMES = re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", INDEX_SCRIPT)
+TRIGGER_NAMES = re.findall(r"CREATE TRIGGER (\w+)", FTS_SCRIPT + COUNTS_SCRIPT + GENRE_RATINGS_SCRIPT)
+
+
+def drop_derived(conn: sqlite3.Connection) -> None:
+    """
+    Supprime les index secondaires et les triggers FTS / compteurs avant un
+    chargement en masse : chaque INSERT ne met plus à jour que la table et sa clé
+    primaire. create_derived() remet tout en place après l'import.
+    """
+    for name in INDEX_NAMES:
+        conn.execute(f"DROP INDEX IF EXISTS {name};")
+    for name in TRIGGER_NAMES:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name};")
+
+
+def create_derived(conn: sqlite3.Connection) -> None:
+    """
+    Recrée les index secondaires, les index FTS5 (rebuild), les compteurs et
+    genre_movie_ratings (recalculés) à partir des données déjà chargées.
+    """
+    conn.executescript(INDEX_SCRIPT)
+    conn.executescript(FTS_SCRIPT)
+    conn.executescript(COUNTS_SCRIPT)
+    conn.executescript(GENRE_RATINGS_SCRIPT)
+
+
+def create_counts(db_path: Path = DB_PATH) -> None:
+    """
+    Ajoute (ou recalcule) les compteurs genre_counts / decade_counts et leurs
+    triggers sur une base déjà importée.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(COUNTS_SCRIPT)
+        conn.commit()
+        print(f"Compteurs genre_counts / decade_counts créés dans {db_path}")
+    finally:
+        conn.close()
+
+
+def create_fts(db_path: Path = DB_PATH) -> None:
+    """
+    Ajoute (ou reconstruit, ex. changement de tokenizer) les index FTS5 sur une
+    base déjà importée, sans toucher aux données.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(FTS_SCRIPT)
+        conn.commit()
+        print(f"Index FTS5 créés dans {db_path}")
+    finally:
+        conn.close()
+
+
+def create_genre_ratings(db_path: Path = DB_PATH) -> None:
+    """
+    Ajoute (ou recalcule) la table genre_movie_ratings sur une base déjà importée.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(GENRE_RATINGS_SCRIPT)
+        conn.commit()
+        print(f"Table genre_movie_ratings créée dans {db_path}")
+    finally:
+        conn.close()
+
+
 def create_schema(db_path: Path = DB_PATH) -> None:
     """
     Crée (ou recrée) le schéma SQLite imdb.db pour la Phase 1.
@@ -160,6 +495,7 @@ def create_schema(db_path: Path = DB_PATH) -> None:
     try:
         cur = conn.cursor()
         cur.executescript(DDL_SCRIPT)
+        create_derived(conn)
         conn.commit()
         print(f"Schéma SQLite créé dans {db_path}")
     finally:
@@ -167,4 +503,13 @@ def create_schema(db_path: Path = DB_PATH) -> None:
 
 
 if __name__ == "__main__":
-    create_schema()
+    import sys
+
+    if "--fts" in sys.argv:
+        create_fts()
+    elif "--counts" in sys.argv:
+        create_counts()
+    elif "--genre-ratings" in sys.argv:
+        create_genre_ratings()
+    else:
+        create_schema()
@@ -1,17 +1,66 @@
 # script/phase1_sqlite/import_data.py
 
+import os
+import queue
+import threading
 from pathlib import Path
 import sqlite3
 import pandas as pd
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    # Lecteur CSV multi-thread de PyArrow (optionnel) ; sinon moteur C de pandas
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pacsv = pq = None
+
+try:
+    # Lecteur CSV multi-thread de DuckDB (optionnel), prioritaire sur PyArrow
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from create_schema import create_derived, drop_derived
 
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
-DB_PATH = ROOT_DIR / "data" / "imdb.db"
+DB_PATH = Path(os.environ.get("IMDB_SQLITE_PATH", ROOT_DIR / "data" / "imdb.db"))
 CSV_DIR = ROOT_DIR / "data" / "csv"
+# Lignes lues par bloc : mémoire bornée, un executemany par bloc
+CHUNK_SIZE = 200_000
+# Taille d'un bloc en octets pour le lecteur PyArrow (il découpe par octets, pas par lignes)
+ARROW_BLOCK_SIZE = 1 << 24
+# Blocs déjà parsés en attente d'écriture (borne la mémoire du lecteur en avance)
+PREFETCH_CHUNKS = 2
+# Colonnes à peu de valeurs distinctes : encodage dictionnaire dans les Parquet
+DICTIONARY_COLUMNS = ["titleType", "title_type", "region", "category", "job", "genre"]
+
+
+def normalize(name: str) -> str:
+    # "primaryTitle", "primary_title", "Primary Title" -> "primarytitle"
+    return "".join(ch for ch in name.lower() if ch.isalnum())
+
+
+@lru_cache(maxsize=None)
+def _normalized_header(cols: Tuple[str, ...]) -> Dict[str, str]:
+    # Un dict par en-tête de CSV : {nom normalisé: nom réel}
+    return {normalize(c): c for c in cols}
 
 
 def find_col(cols: List[str], candidates: List[str]) -> Optional[str]:
+    """
+    Colonne du CSV correspondant au premier candidat trouvé : lookup dans le
+    dict normalisé de l'en-tête, puis (en-tête inattendu) recherche par
+    sous-chaîne comme avant.
+    """
+    header = _normalized_header(tuple(cols))
+    for cand in candidates:
+        col = header.get(normalize(cand))
+        if col is not None:
+            return col
     for cand in candidates:
         for c in cols:
             if cand in c:
@@ -19,12 +68,228 @@ def find_col(cols: List[str], candidates: List[str]) -> Optional[str]:
     return None
 
 
+def csv_columns(path: Path) -> List[str]:
+    # En-tête seul (nrows=0) : sert à résoudre les noms de colonnes avant la lecture
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_chunks(path: Path, dtype: Dict[str, str]) -> Iterator[pd.DataFrame]:
+    """
+    Lit le CSV par blocs de CHUNK_SIZE lignes, en ne parsant que les colonnes de
+    `dtype` avec leur type : "str" pour le texte, entiers nullables ("Int16"...)
+    pour les nombres (une valeur non numérique lève une erreur au lieu de
+    devenir NaN). Le type d'une colonne ne dépend pas du contenu de chaque bloc.
+    Si un .parquet à jour existe à côté du CSV (convert_csv_to_parquet), il est
+    lu à la place.
+    """
+    parquet = path.with_suffix(".parquet")
+    if pq is not None and parquet.exists() and parquet.stat().st_mtime >= path.stat().st_mtime:
+        chunks = _read_chunks_parquet(parquet, dtype)
+    elif duckdb is not None:
+        chunks = _read_chunks_duckdb(path, dtype)
+    elif pacsv is not None:
+        chunks = _read_chunks_arrow(path, dtype)
+    else:
+        chunks = pd.read_csv(path, usecols=list(dtype), dtype=dtype, chunksize=CHUNK_SIZE)
+    return _prefetch(chunks)
+
+
+_END = object()
+
+
+def _prefetch(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    Parse les blocs dans un thread lecteur pendant que le thread principal écrit
+    le bloc précédent dans SQLite. Seul le thread principal touche à la connexion ;
+    la file bornée (PREFETCH_CHUNKS) empêche le lecteur de charger tout le CSV.
+    Une erreur de parsing est relancée côté consommateur ; si celui-ci s'arrête
+    (exception pendant l'écriture), le lecteur s'arrête aussi.
+    """
+    q: "queue.Queue" = queue.Queue(maxsize=PREFETCH_CHUNKS)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+        except Exception as exc:
+            put(exc)
+            return
+        put(_END)
+
+    threading.Thread(target=produce, name="csv-reader", daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def _read_chunks_arrow(path: Path, dtype: Dict[str, str]) -> Iterator[pd.DataFrame]:
+    # Parsing multi-thread en flux (open_csv) ; les entiers sont lus en float64
+    # ("1994.0" est accepté, comme par pandas) puis convertis vers le dtype voulu
+    column_types = {
+        col: pa.string() if kind == "str" else pa.float64()
+        for col, kind in dtype.items()
+    }
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=list(dtype),
+            column_types=column_types,
+            # champ vide -> NULL, comme pd.read_csv
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch.to_pandas().astype(_numeric_dtypes(dtype))
+
+
+def _read_chunks_parquet(path: Path, dtype: Dict[str, str]) -> Iterator[pd.DataFrame]:
+    # Seules les colonnes demandées sont lues (format colonne) ; les valeurs sont
+    # stockées en texte, converties par _typed
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=CHUNK_SIZE, columns=list(dtype)):
+        yield _typed(batch.to_pandas(), dtype)
+
+
+def _read_chunks_duckdb(path: Path, dtype: Dict[str, str]) -> Iterator[pd.DataFrame]:
+    # Parsing parallèle par DuckDB, tout en texte (champ vide -> NULL) ; le
+    # typage reste celui de read_chunks. Connexion propre au thread lecteur.
+    cols = ", ".join('"' + c.replace('"', '""') + '"' for c in dtype)
+    source = str(path).replace("'", "''")
+    con = duckdb.connect()
+    try:
+        con.execute(f"SELECT {cols} FROM read_csv('{source}', header = true, all_varchar = true);")
+        while True:
+            # un vecteur DuckDB = 2048 lignes
+            df = con.fetch_df_chunk(max(1, CHUNK_SIZE // 2048))
+            if df.empty:
+                return
+            yield _typed(df, dtype)
+    finally:
+        con.close()
+
+
+def _numeric_dtypes(dtype: Dict[str, str]) -> Dict[str, str]:
+    # Seules les colonnes numériques sont converties : astype("str") sur le texte
+    # change None / NaN en chaînes "None" / "nan" avec pandas 2.x, qui passeraient
+    # ensuite le nettoyage TRIM(...) <> '' de stage()
+    return {col: kind for col, kind in dtype.items() if kind != "str"}
+
+
+def _typed(df: pd.DataFrame, dtype: Dict[str, str]) -> pd.DataFrame:
+    # Colonnes lues en texte -> dtype voulu ; to_numeric d'abord pour accepter
+    # "1994.0" dans une colonne entière (comme pd.read_csv)
+    numeric = _numeric_dtypes(dtype)
+    for col in numeric:
+        df[col] = pd.to_numeric(df[col])
+    return df.astype(numeric)
+
+
+def convert_csv_to_parquet(csv_dir: Path = CSV_DIR) -> None:
+    """
+    Conversion unique des CSV en Parquet (zstd, encodage dictionnaire des colonnes
+    répétitives) : les imports suivants lisent ces fichiers, plus petits et
+    lisibles colonne par colonne. Toutes les colonnes restent en texte, le
+    typage est fait à la lecture par read_chunks. Nécessite pyarrow.
+    """
+    if pq is None:
+        print("pyarrow absent -> conversion Parquet ignorée, import depuis les CSV")
+        return
+    for path in sorted(csv_dir.glob("*.csv")):
+        cols = csv_columns(path)
+        reader = pacsv.open_csv(
+            path,
+            read_options=pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={c: pa.string() for c in cols},
+                strings_can_be_null=True,
+            ),
+        )
+        dictionary = [c for c in cols if find_col([c], DICTIONARY_COLUMNS)]
+        with pq.ParquetWriter(
+            path.with_suffix(".parquet"),
+            reader.schema,
+            compression="zstd",
+            use_dictionary=dictionary,
+        ) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        print(f"[parquet] {path.name} -> {path.with_suffix('.parquet').name}")
+
+
+@lru_cache(maxsize=None)
+def insert_sql(table: str, cols: Tuple[str, ...]) -> str:
+    # Texte de l'INSERT construit une fois par (table, colonnes) : la même chaîne
+    # à chaque bloc, donc la requête compilée du cache d'instructions de sqlite3
+    # est réutilisée au lieu d'être re-préparée
+    return (
+        f"INSERT OR IGNORE INTO {table}({', '.join(cols)}) "
+        f"VALUES ({', '.join('?' * len(cols))})"
+    )
+
+
+def bulk_insert(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> int:
+    """
+    Insère le DataFrame dans `table` avec une seule requête préparée (executemany),
+    les colonnes du DataFrame donnant celles de la table. OR IGNORE : un doublon
+    de clé primaire est sauté au lieu d'annuler tout le lot.
+    Retourne le nombre de lignes réellement insérées.
+    """
+    cols = tuple(df.columns)
+    sql = insert_sql(table, cols)
+    # sqlite3 prend les colonnes texte et float telles quelles (NaN -> NULL) ; il
+    # n'accepte ni pd.NA ni les scalaires numpy : seules les colonnes d'entiers
+    # nullables sont converties en objets Python (pas de copie des colonnes texte).
+    # itertuples() est consommé au fil de l'eau par executemany, sans liste.
+    converted = {
+        col: df[col].astype(object).where(df[col].notna(), None)
+        for col in cols
+        if not (pd.api.types.is_string_dtype(df[col]) or pd.api.types.is_float_dtype(df[col]))
+    }
+    rows = df.assign(**converted) if converted else df
+    return conn.executemany(sql, rows.itertuples(index=False, name=None)).rowcount
+
+
+def stage(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> str:
+    """
+    Charge le bloc brut dans la table temporaire tmp_<table> (mêmes colonnes que
+    `table`, vidée à chaque bloc) et retourne son nom. Nettoyage (TRIM, lignes
+    vides), doublons (OR IGNORE sur la clé primaire) et contrôle des FK (jointure
+    sur movies / persons) se font ensuite dans un seul INSERT ... SELECT,
+    sans passe pandas sur les colonnes texte.
+    """
+    tmp = f"tmp_{table}"
+    conn.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {tmp} AS "
+        f"SELECT {', '.join(df.columns)} FROM {table} WHERE 0;"
+    )
+    conn.execute(f"DELETE FROM {tmp};")
+    bulk_insert(conn, tmp, df)
+    return tmp
+
+
 def import_movies(conn):
-    # lire le csv
-    df = pd.read_csv(CSV_DIR / "movies.csv")
-    # on liste les colonnes de la donnée
-    cols = list(df.columns)
-    
+    path = CSV_DIR / "movies.csv"
+    # on liste les colonnes de la donnée (en-tête seulement)
+    cols = csv_columns(path)
+
     # vu qu'on connait déjà les colonnes de movies grâce
     # à l'explorateur.pydmb on va créer chaque colonne en les cherchant
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
@@ -35,40 +300,58 @@ def import_movies(conn):
     start_col = find_col(cols, ["startYear", "start_year"])
     end_col = find_col(cols, ["endYear", "end_year"])
     runtime_col = find_col(cols, ["runtimeMinutes", "runtime_minutes"])
-    
-    #une fois trouver on définit leur taille
-    movies = pd.DataFrame()
-    movies["movie_id"] = df[mid_col]
-    movies["title_type"] = df[ttype_col]
-    movies["primary_title"] = df[ptitle_col]
-    movies["original_title"] = df[otitle_col]
-    movies["is_adult"] = pd.to_numeric(df[adult_col], errors="coerce").fillna(0).astype(int)
-    movies["start_year"] = pd.to_numeric(df[start_col], errors="coerce")
-    movies["end_year"] = pd.to_numeric(df[end_col], errors="coerce")
-    movies["runtime_minutes"] = pd.to_numeric(df[runtime_col], errors="coerce")
-
-    #on transforme la donnée movie en donnée sql
-    movies.to_sql("movies", conn, if_exists="append", index=False)
-    print(f"[movies] insérés={len(movies)}, erreurs=0")
+
+    dtype = {
+        mid_col: "str",
+        ttype_col: "str",
+        ptitle_col: "str",
+        otitle_col: "str",
+        adult_col: "Int8",
+        start_col: "Int16",
+        end_col: "Int16",
+        runtime_col: "Int32",
+    }
+
+    inserted = 0
+    # lire le csv par blocs (mémoire bornée quelle que soit la taille du fichier)
+    for df in read_chunks(path, dtype):
+        #une fois trouver on définit leur taille
+        movies = pd.DataFrame()
+        movies["movie_id"] = df[mid_col]
+        movies["title_type"] = df[ttype_col]
+        movies["primary_title"] = df[ptitle_col]
+        movies["original_title"] = df[otitle_col]
+        movies["is_adult"] = df[adult_col].fillna(0)
+        movies["start_year"] = df[start_col]
+        movies["end_year"] = df[end_col]
+        movies["runtime_minutes"] = df[runtime_col]
+
+        #on transforme la donnée movie en donnée sql
+        inserted += bulk_insert(conn, "movies", movies)
+    print(f"[movies] insérés={inserted}, erreurs=0")
 
 # pareil ici
 def import_persons(conn):
-    df = pd.read_csv(CSV_DIR / "persons.csv")
-    cols = list(df.columns)
+    path = CSV_DIR / "persons.csv"
+    cols = csv_columns(path)
 
     pid_col = find_col(cols, ["pid", "person_id", "nconst"])
     name_col = find_col(cols, ["primaryName", "name"])
     birth_col = find_col(cols, ["birthYear", "birth_year"])
     death_col = find_col(cols, ["deathYear", "death_year"])
 
-    persons = pd.DataFrame()
-    persons["person_id"] = df[pid_col]
-    persons["name"] = df[name_col]
-    persons["birth_year"] = pd.to_numeric(df[birth_col], errors="coerce")
-    persons["death_year"] = pd.to_numeric(df[death_col], errors="coerce")
+    dtype = {pid_col: "str", name_col: "str", birth_col: "Int16", death_col: "Int16"}
 
-    persons.to_sql("persons", conn, if_exists="append", index=False)
-    print(f"[persons] insérés={len(persons)}")
+    inserted = 0
+    for df in read_chunks(path, dtype):
+        persons = pd.DataFrame()
+        persons["person_id"] = df[pid_col]
+        persons["name"] = df[name_col]
+        persons["birth_year"] = df[birth_col]
+        persons["death_year"] = df[death_col]
+
+        inserted += bulk_insert(conn, "persons", persons)
+    print(f"[persons] insérés={inserted}")
 
 # ici j'ai rencontré des difficulté sur la recherche du csv
 # et les clés etrangères et primaire à la table
@@ -79,23 +362,28 @@ def import_professions(conn):
         print("[professions] fichier absent -> 0 ligne insérée")
         return
 
-    df = pd.read_csv(path)
-    cols = list(df.columns)
+    cols = csv_columns(path)
 
     pid_col = find_col(cols, ["pid", "person_id", "nconst"])
     job_col = find_col(cols, ["jobName", "job_name", "job"])
 
-    prof = pd.DataFrame()
-    prof["person_id"] = df[pid_col]
-
-    # Nettoyage pour éviter les NULL sur job_name
-    prof["job_name"] = df[job_col].astype(str).str.strip()
-    prof = prof[prof["job_name"].notna()]
-    prof = prof[prof["job_name"] != ""]
-    prof = prof.drop_duplicates(subset=["person_id", "job_name"])
-
-    prof.to_sql("professions", conn, if_exists="append", index=False)
-    print(f"[professions] insérés={len(prof)}")
+    inserted = 0
+    for df in read_chunks(path, {pid_col: "str", job_col: "str"}):
+        prof = pd.DataFrame()
+        prof["person_id"] = df[pid_col]
+        prof["job_name"] = df[job_col]
+
+        tmp = stage(conn, "professions", prof)
+        # Nettoyage pour éviter les NULL sur job_name ; doublons ignorés par la PK
+        inserted += conn.execute(
+            f"""
+            INSERT OR IGNORE INTO professions(person_id, job_name)
+            SELECT person_id, TRIM(job_name) FROM {tmp}
+            WHERE TRIM(job_name) <> ''
+            ORDER BY rowid;
+            """
+        ).rowcount
+    print(f"[professions] insérés={inserted}")
 
 # pareil ici
 def import_knownformovies(conn):
@@ -104,94 +392,111 @@ def import_knownformovies(conn):
         print("[knownformovies] fichier absent -> 0 ligne insérée")
         return
 
-    df = pd.read_csv(path)
-    cols = list(df.columns)
+    cols = csv_columns(path)
 
     pid_col = find_col(cols, ["pid", "person_id", "nconst"])
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
 
-    kfm = pd.DataFrame()
-    kfm["person_id"] = df[pid_col]
-    kfm["movie_id"] = df[mid_col]
+    inserted = 0
+    for df in read_chunks(path, {pid_col: "str", mid_col: "str"}):
+        kfm = pd.DataFrame()
+        kfm["person_id"] = df[pid_col]
+        kfm["movie_id"] = df[mid_col]
 
-    kfm.to_sql("knownformovies", conn, if_exists="append", index=False)
-    print(f"[knownformovies] insérés={len(kfm)}")
+        inserted += bulk_insert(conn, "knownformovies", kfm)
+    print(f"[knownformovies] insérés={inserted}")
 
 #pareil ici
 def import_genres(conn):
-    df = pd.read_csv(CSV_DIR / "genres.csv")
-    cols = list(df.columns)
+    path = CSV_DIR / "genres.csv"
+    cols = csv_columns(path)
 
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
     genre_col = find_col(cols, ["genre"])
 
-    g = pd.DataFrame()
-    g["movie_id"] = df[mid_col]
-    g["genre"] = df[genre_col].astype(str).str.rstrip(",")
-
-    g.to_sql("genres", conn, if_exists="append", index=False)
-    print(f"[genres] insérés={len(g)}")
+    inserted = 0
+    for df in read_chunks(path, {mid_col: "str", genre_col: "str"}):
+        g = pd.DataFrame()
+        g["movie_id"] = df[mid_col]
+        g["genre"] = df[genre_col]
+
+        tmp = stage(conn, "genres", g)
+        # virgule finale laissée par l'export ("Comedy,")
+        inserted += conn.execute(
+            f"""
+            INSERT OR IGNORE INTO genres(movie_id, genre)
+            SELECT movie_id, RTRIM(genre, ',') FROM {tmp}
+            ORDER BY rowid;
+            """
+        ).rowcount
+    print(f"[genres] insérés={inserted}")
 
 #pareil ici
 def import_ratings(conn):
-    df = pd.read_csv(CSV_DIR / "ratings.csv")
-    cols = list(df.columns)
+    path = CSV_DIR / "ratings.csv"
+    cols = csv_columns(path)
 
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
     avg_col = find_col(cols, ["averageRating", "average_rating"])
     votes_col = find_col(cols, ["numVotes", "num_votes"])
 
-    r = pd.DataFrame()
-    r["movie_id"] = df[mid_col]
-    r["average_rating"] = pd.to_numeric(df[avg_col], errors="coerce")
-    r["num_votes"] = pd.to_numeric(df[votes_col], errors="coerce").fillna(0).astype(int)
+    dtype = {mid_col: "str", avg_col: "float64", votes_col: "Int32"}
 
-    r.to_sql("ratings", conn, if_exists="append", index=False)
-    print(f"[ratings] insérés={len(r)}")
+    inserted = 0
+    for df in read_chunks(path, dtype):
+        r = pd.DataFrame()
+        r["movie_id"] = df[mid_col]
+        r["average_rating"] = df[avg_col]
+        r["num_votes"] = df[votes_col].fillna(0)
+
+        inserted += bulk_insert(conn, "ratings", r)
+    print(f"[ratings] insérés={inserted}")
 
 #ici des erreurs de doublons de clés primaires sont survenus
 def import_titles(conn):
-    df = pd.read_csv(CSV_DIR / "titles.csv")
-    cols = list(df.columns)
+    path = CSV_DIR / "titles.csv"
+    cols = csv_columns(path)
 
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
     region_col = find_col(cols, ["region", "Region"])
     title_col = find_col(cols, ["title", "Title"])
 
-    t = pd.DataFrame()
-    t["movie_id"] = df[mid_col]
-    t["region"] = df[region_col]
-    t["title"] = df[title_col]
-
-    # nettoyer / filtrer
-    t["movie_id"] = t["movie_id"].astype(str).str.strip()
-    t["region"] = t["region"].astype(str).str.strip()
-    t["title"] = t["title"].astype(str).str.strip()
-
-    t = t[(t["movie_id"] != "") & t["movie_id"].notna()]
-    t = t[(t["region"] != "") & t["region"].notna()]
-    t = t[(t["title"] != "") & t["title"].notna()]
-
-    # éviter les doublons PK (movie_id, region)
-    t = t.drop_duplicates(subset=["movie_id", "region"])
-
-    t.to_sql("titles", conn, if_exists="append", index=False)
-    print(f"[titles] insérés={len(t)}")
+    inserted = 0
+    for df in read_chunks(path, {mid_col: "str", region_col: "str", title_col: "str"}):
+        t = pd.DataFrame()
+        t["movie_id"] = df[mid_col]
+        t["region"] = df[region_col]
+        t["title"] = df[title_col]
+
+        tmp = stage(conn, "titles", t)
+        # nettoyer / filtrer (NULL et chaînes vides) ; doublons PK (movie_id, region) :
+        # OR IGNORE garde la première occurrence, d'où l'ORDER BY rowid
+        inserted += conn.execute(
+            f"""
+            INSERT OR IGNORE INTO titles(movie_id, region, title)
+            SELECT TRIM(movie_id), TRIM(region), TRIM(title) FROM {tmp}
+            WHERE TRIM(movie_id) <> '' AND TRIM(region) <> '' AND TRIM(title) <> ''
+            ORDER BY rowid;
+            """
+        ).rowcount
+    print(f"[titles] insérés={inserted}")
 
 
 def import_directors(conn):
-    df = pd.read_csv(CSV_DIR / "directors.csv")
-    cols = list(df.columns)
+    path = CSV_DIR / "directors.csv"
+    cols = csv_columns(path)
 
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
     pid_col = find_col(cols, ["pid", "person_id", "nconst"])
 
-    d = pd.DataFrame()
-    d["movie_id"] = df[mid_col]
-    d["person_id"] = df[pid_col]
+    inserted = 0
+    for df in read_chunks(path, {mid_col: "str", pid_col: "str"}):
+        d = pd.DataFrame()
+        d["movie_id"] = df[mid_col]
+        d["person_id"] = df[pid_col]
 
-    d.to_sql("directors", conn, if_exists="append", index=False)
-    print(f"[directors] insérés={len(d)}")
+        inserted += bulk_insert(conn, "directors", d)
+    print(f"[directors] insérés={inserted}")
 
 
 def import_writers(conn):
@@ -200,38 +505,39 @@ def import_writers(conn):
         print("[writers] fichier absent -> 0 ligne insérée")
         return
 
-    df = pd.read_csv(path)
-    cols = list(df.columns)
+    cols = csv_columns(path)
 
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
     pid_col = find_col(cols, ["pid", "person_id", "nconst"])
 
-    w = pd.DataFrame()
-    w["movie_id"] = df[mid_col]
-    w["person_id"] = df[pid_col]
-
-    # Nettoyage basique
-    w["movie_id"] = w["movie_id"].astype(str).str.strip()
-    w["person_id"] = w["person_id"].astype(str).str.strip()
-    w = w[(w["movie_id"] != "") & (w["person_id"] != "")]
-    w = w.drop_duplicates(subset=["movie_id", "person_id"])
-
-    # Garder uniquement les lignes dont les FK existent
-    movies_ids = pd.read_sql("SELECT movie_id FROM movies;", conn)["movie_id"]
-    persons_ids = pd.read_sql("SELECT person_id FROM persons;", conn)["person_id"]
-
-    before = len(w)
-    w = w[w["movie_id"].isin(movies_ids) & w["person_id"].isin(persons_ids)]
-    after = len(w)
-
-    w.to_sql("writers", conn, if_exists="append", index=False)
-    print(f"[writers] insérés={after}, ignorés={before - after}")
+    inserted = ignored = 0
+    for df in read_chunks(path, {mid_col: "str", pid_col: "str"}):
+        w = pd.DataFrame()
+        w["movie_id"] = df[mid_col]
+        w["person_id"] = df[pid_col]
+
+        tmp = stage(conn, "writers", w)
+        # Nettoyage basique + garder uniquement les lignes dont les FK existent
+        # (un id vide ou absent ne joint pas)
+        n = conn.execute(
+            f"""
+            INSERT OR IGNORE INTO writers(movie_id, person_id)
+            SELECT m.movie_id, pe.person_id
+            FROM {tmp} t
+            JOIN movies m   ON m.movie_id   = TRIM(t.movie_id)
+            JOIN persons pe ON pe.person_id = TRIM(t.person_id)
+            ORDER BY t.rowid;
+            """
+        ).rowcount
+        inserted += n
+        ignored += len(w) - n
+    print(f"[writers] insérés={inserted}, ignorés={ignored}")
 
 
 
 def import_principals(conn):
-    df = pd.read_csv(CSV_DIR / "principals.csv")
-    cols = list(df.columns)
+    path = CSV_DIR / "principals.csv"
+    cols = csv_columns(path)
 
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
     ord_col = find_col(cols, ["ordering"])
@@ -239,106 +545,180 @@ def import_principals(conn):
     cat_col = find_col(cols, ["category"])
     job_col = find_col(cols, ["job"])
 
-    p = pd.DataFrame()
-    p["movie_id"] = df[mid_col].astype(str).str.strip()
-    p["ordering"] = pd.to_numeric(df[ord_col], errors="coerce").fillna(0).astype(int)
-    p["person_id"] = df[pid_col].astype(str).str.strip()
-    p["category"] = df[cat_col]
-    p["job"] = df[job_col]
-
-    # virer lignes vides
-    p = p[(p["movie_id"] != "") & (p["person_id"] != "")]
-    # enlever doublons PK
-    p = p.drop_duplicates(subset=["movie_id", "person_id", "ordering"])
-
-    cur = conn.cursor()
-
-    # table temporaire
-    cur.execute("DROP TABLE IF EXISTS tmp_principals;")
-    conn.commit()
-    p.to_sql("tmp_principals", conn, if_exists="replace", index=False)
-
-    # compteur avant
-    before = cur.execute("SELECT COUNT(*) FROM principals;").fetchone()[0]
-
-    # insertion en ne gardant que les lignes avec FK valides
-    cur.execute(
-        """
-        INSERT OR IGNORE INTO principals(movie_id, person_id, ordering, category, job)
-        SELECT t.movie_id, t.person_id, t.ordering, t.category, t.job
-        FROM tmp_principals t
-        JOIN movies m   ON m.movie_id   = t.movie_id
-        JOIN persons pe ON pe.person_id = t.person_id;
-        """
-    )
-    conn.commit()
-
-    after = cur.execute("SELECT COUNT(*) FROM principals;").fetchone()[0]
-    inserted = after - before
+    dtype = {mid_col: "str", ord_col: "Int16", pid_col: "str", cat_col: "str", job_col: "str"}
+
+    inserted = 0
+    for df in read_chunks(path, dtype):
+        p = pd.DataFrame()
+        p["movie_id"] = df[mid_col]
+        p["ordering"] = df[ord_col].fillna(0)
+        p["person_id"] = df[pid_col]
+        p["category"] = df[cat_col]
+        p["job"] = df[job_col]
+
+        tmp = stage(conn, "principals", p)
+        # insertion en ne gardant que les lignes avec FK valides (OR IGNORE ne
+        # couvre pas les FK, la jointure écarte aussi les ids vides) ;
+        # doublons PK : première occurrence gardée
+        inserted += conn.execute(
+            f"""
+            INSERT OR IGNORE INTO principals(movie_id, person_id, ordering, category, job)
+            SELECT m.movie_id, pe.person_id, t.ordering, t.category, t.job
+            FROM {tmp} t
+            JOIN movies m   ON m.movie_id   = TRIM(t.movie_id)
+            JOIN persons pe ON pe.person_id = TRIM(t.person_id)
+            ORDER BY t.rowid;
+            """
+        ).rowcount
 
     print(f"[principals] insérés={inserted}")
 
 
 
 def import_characters(conn):
-    df = pd.read_csv(CSV_DIR / "characters.csv")
-    cols = list(df.columns)
+    path = CSV_DIR / "characters.csv"
+    cols = csv_columns(path)
 
     mid_col = find_col(cols, ["mid", "tconst", "movie_id"])
     pid_col = find_col(cols, ["pid", "person_id", "nconst"])
     name_col = find_col(cols, ["name", "character"])
 
-    c = pd.DataFrame()
-    c["movie_id"] = df[mid_col].astype(str).str.strip()
-    c["person_id"] = df[pid_col].astype(str).str.strip()
-    c["name"] = df[name_col].astype(str).str.strip()
-
-    # virer lignes vides
-    c = c[(c["movie_id"] != "") & (c["person_id"] != "") & (c["name"] != "")]
-    # enlever doublons internes
-    c = c.drop_duplicates(subset=["movie_id", "person_id", "name"])
-
-    # garder uniquement FK valides
-    movies_ids = pd.read_sql("SELECT movie_id FROM movies;", conn)["movie_id"]
-    persons_ids = pd.read_sql("SELECT person_id FROM persons;", conn)["person_id"]
-
-    c = c[c["movie_id"].isin(movies_ids) & c["person_id"].isin(persons_ids)]
-
-    # on vide la table pour éviter les conflits avec des données déjà présentes
-    cur = conn.cursor()
-    cur.execute("DELETE FROM characters")
-    conn.commit()
-
-    # insertion avec IGNORE pour éviter les derniers doublons éventuels
-    cur.executemany(
-        "INSERT OR IGNORE INTO characters(movie_id, person_id, name) VALUES (?, ?, ?)",
-        list(c.itertuples(index=False, name=None)),
-    )
-    conn.commit()
-    print(f"[characters] insérés={len(c)}")
-
+    inserted = 0
+    for df in read_chunks(path, {mid_col: "str", pid_col: "str", name_col: "str"}):
+        c = pd.DataFrame()
+        c["movie_id"] = df[mid_col]
+        c["person_id"] = df[pid_col]
+        c["name"] = df[name_col]
+
+        tmp = stage(conn, "characters", c)
+        # virer lignes vides, garder uniquement FK valides ; IGNORE pour les doublons
+        inserted += conn.execute(
+            f"""
+            INSERT OR IGNORE INTO characters(movie_id, person_id, name)
+            SELECT m.movie_id, pe.person_id, TRIM(t.name)
+            FROM {tmp} t
+            JOIN movies m   ON m.movie_id   = TRIM(t.movie_id)
+            JOIN persons pe ON pe.person_id = TRIM(t.person_id)
+            WHERE TRIM(t.name) <> ''
+            ORDER BY t.rowid;
+            """
+        ).rowcount
+    print(f"[characters] insérés={inserted}")
+
+
+# Ordre d'import : tables parentes (movies, persons) avant les tables qui les
+# référencent ; avec le CSV lu par chaque fonction
+IMPORTS = [
+    ("movies.csv", import_movies),
+    ("persons.csv", import_persons),
+    ("professions.csv", import_professions),
+    ("knownformovies.csv", import_knownformovies),
+    ("genres.csv", import_genres),
+    ("ratings.csv", import_ratings),
+    ("titles.csv", import_titles),
+    ("directors.csv", import_directors),
+    ("writers.csv", import_writers),
+    ("principals.csv", import_principals),
+    ("characters.csv", import_characters),
+]
+
+
+# Début du fichier suivant demandé au noyau pendant l'écriture de la table courante
+WARM_UP_BYTES = 64 * 1024 * 1024
+
+
+def _warm_up(path: Path) -> None:
+    # Simple indication (posix_fadvise WILLNEED, lecture anticipée asynchrone par
+    # le noyau) limitée aux premiers Mo : le fichier n'est pas lu deux fois et
+    # _prefetch recouvre déjà le reste de la lecture avec les insertions.
+    # Sans posix_fadvise (Windows), rien à faire.
+    if not hasattr(os, "posix_fadvise") or not path.exists():
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, WARM_UP_BYTES, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+def tune(conn: sqlite3.Connection) -> None:
+    """
+    PRAGMA de chargement en masse. WAL est persistant (mode de l'application) ;
+    les autres ne valent que pour cette connexion : synchronous=OFF (pas de fsync,
+    la base se régénère depuis les CSV en cas de crash), cache de 256 Mo, tables
+    temporaires en mémoire, lecture par mmap et verrou exclusif (pas de lecteur
+    concurrent pendant l'import).
+    """
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = OFF;")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    conn.execute("PRAGMA cache_size = -262144;")
+    conn.execute("PRAGMA mmap_size = 268435456;")
+    conn.execute("PRAGMA journal_size_limit = 67108864;")
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE;")
+
+
+def check_foreign_keys(conn: sqlite3.Connection) -> None:
+    """
+    Contrôle des clés étrangères en fin de chargement (elles sont désactivées
+    pendant l'import) : une seule passe PRAGMA foreign_key_check au lieu d'une
+    recherche dans movies / persons par ligne insérée. Les lignes orphelines
+    (tables sans jointure de contrôle à l'import) sont comptées puis supprimées.
+    """
+    violations: Dict[Tuple[str, str], int] = {}
+    for table, _rowid, parent, _fkid in conn.execute("PRAGMA foreign_key_check;"):
+        violations[(table, parent)] = violations.get((table, parent), 0) + 1
+
+    for (table, parent), n in violations.items():
+        for fk in conn.execute(f"PRAGMA foreign_key_list({table});"):
+            # (id, seq, table parente, colonne, colonne parente, ...)
+            if fk[2] != parent:
+                continue
+            conn.execute(
+                f"DELETE FROM {table} WHERE {fk[3]} IS NOT NULL "
+                f"AND {fk[3]} NOT IN (SELECT {fk[4]} FROM {parent});"
+            )
+        print(f"[{table}] supprimés={n} (absent de {parent})")
 
 
 def main():
     print(f"Import des données depuis {CSV_DIR} vers {DB_PATH}")
     conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
+    tune(conn)
+    # FK désactivées pendant le chargement, vérifiées une fois à la fin
+    conn.execute("PRAGMA foreign_keys = OFF;")
     try:
-        import_movies(conn)
-        import_persons(conn)
-        import_professions(conn)
-        import_knownformovies(conn)
-        import_genres(conn)
-        import_ratings(conn)
-        import_titles(conn)
-        import_directors(conn)
-        import_writers(conn)
-        import_principals(conn)
-        import_characters(conn)
+        # Index secondaires et triggers FTS / compteurs retirés pendant le
+        # chargement, reconstruits en une passe sur les données complètes
+        drop_derived(conn)
+        conn.commit()
+        # Une transaction par table (with conn: COMMIT à la sortie, ROLLBACK en
+        # cas d'erreur) : un seul fsync par table au lieu d'un par instruction
+        for i, (_csv, import_table) in enumerate(IMPORTS):
+            if i + 1 < len(IMPORTS):
+                _warm_up(CSV_DIR / IMPORTS[i + 1][0])
+            with conn:
+                import_table(conn)
+        with conn:
+            check_foreign_keys(conn)
+        conn.execute("PRAGMA foreign_keys = ON;")
+        create_derived(conn)
+        # Statistiques pour le planificateur (sqlite_stat1) : choix des index
+        # des requêtes de l'application et estimation des comptes de la page stats
+        conn.execute("ANALYZE;")
+        conn.execute("PRAGMA optimize;")
+        conn.commit()
+        # Une seule fois, hors transaction : réécrit la base d'un bloc (pages
+        # contiguës, espace des tables / index supprimés rendu au système)
+        conn.execute("VACUUM;")
     finally:
         conn.close()
         print("✅ Import terminé.")
 
 
 if __name__ == "__main__":
+    import sys
+
+    if "--parquet" in sys.argv:
+        convert_csv_to_parquet()
     main()
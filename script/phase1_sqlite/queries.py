@@ -3,12 +3,163 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import List, Tuple, Any
+from typing import Any, Callable, List, Optional, Tuple
+
+
+# Filtre sur le nom de l'acteur (Q1, Q4, Q6). Avec l'index FTS5 persons_fts
+# (tokenizer trigram, create_schema.py), une phrase de 3+ caractères trouve les
+# mêmes noms que LIKE '%nom%' mais via l'index inversé au lieu d'un parcours
+# complet de persons. LIKE reste utilisé pour les noms courts ou sans FTS.
+_NAME_FTS = "pe.rowid IN (SELECT rowid FROM persons_fts WHERE persons_fts MATCH ?)"
+_NAME_LIKE = "pe.name LIKE ?"
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (name,)
+    ).fetchone() is not None
+
+
+def _name_filter(conn: sqlite3.Connection, actor_name: str) -> Tuple[str, str]:
+    """
+    Retourne (condition SQL sur l'alias pe, paramètre) pour chercher actor_name
+    dans persons.name.
+    """
+    if len(actor_name) >= 3 and _has_table(conn, "persons_fts"):
+        # Nom entier entre guillemets : une seule phrase FTS5 (sous-chaîne)
+        return _NAME_FTS, '"' + actor_name.replace('"', '""') + '"'
+    return _NAME_LIKE, f"%{actor_name}%"
+
+
+# Films d'un acteur (Q4, Q6) : sous-requête commune aux deux CTE actor_movies.
+# prepare_actor_movies() la matérialise une fois par acteur dans une table
+# temporaire, relue ensuite par les deux requêtes au lieu de refaire la
+# jointure persons / principals / movies.
+_SQL_ACTOR_MOVIES = """
+    SELECT DISTINCT
+        m.movie_id,
+        m.start_year
+    FROM movies     AS m
+    JOIN principals AS p  ON p.movie_id  = m.movie_id
+    JOIN persons    AS pe ON pe.person_id = p.person_id
+    WHERE {name_filter}
+      AND p.category IN ('actor', 'actress')"""
+
+_SQL_ACTOR_MOVIES_TEMP = """
+    SELECT movie_id, start_year
+    FROM temp.actor_movies
+    WHERE actor_name = ?"""
+
+
+def prepare_actor_movies(conn: sqlite3.Connection, actor_name: str) -> None:
+    """
+    Matérialise les films de actor_name dans temp.actor_movies (propre à la
+    connexion). À appeler avant query_collaborations / query_career_evolution
+    pour le même acteur, et avant PRAGMA query_only qui interdit aussi les
+    tables temporaires. À rappeler si les données changent.
+    """
+    name_filter, param = _name_filter(conn, actor_name)
+    with conn:
+        conn.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS actor_movies (
+                actor_name TEXT NOT NULL,
+                movie_id   TEXT NOT NULL,
+                start_year INTEGER,
+                PRIMARY KEY (actor_name, movie_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        conn.execute("DELETE FROM temp.actor_movies WHERE actor_name = ?;", (actor_name,))
+        conn.execute(
+            "INSERT INTO temp.actor_movies SELECT ?, movie_id, start_year FROM ("
+            + _SQL_ACTOR_MOVIES.format(name_filter=name_filter)
+            + ");",
+            (actor_name, param),
+        )
+
+
+def _actor_movies(conn: sqlite3.Connection, actor_name: str) -> Tuple[str, str]:
+    """
+    Retourne (sous-requête movie_id, start_year, paramètre) : la table
+    temporaire si prepare_actor_movies() l'a remplie pour cet acteur, sinon
+    la jointure complète.
+    """
+    prepared = conn.execute(
+        "SELECT 1 FROM sqlite_temp_master WHERE type = 'table' AND name = 'actor_movies';"
+    ).fetchone() is not None
+    if prepared and conn.execute(
+        "SELECT 1 FROM temp.actor_movies WHERE actor_name = ? LIMIT 1;", (actor_name,)
+    ).fetchone() is not None:
+        return _SQL_ACTOR_MOVIES_TEMP, actor_name
+    name_filter, param = _name_filter(conn, actor_name)
+    return _SQL_ACTOR_MOVIES.format(name_filter=name_filter), param
+
+
+# Genre × film × note (Q2, Q5, Q7) : la table genre_movie_ratings précalculée par
+# create_schema.py si elle est à jour (parcours de son index, sans jointure),
+# sinon la jointure genres / movies / ratings équivalente.
+_GENRE_RATINGS_JOIN = """(
+    SELECT
+        g.genre,
+        m.movie_id,
+        m.primary_title,
+        m.start_year,
+        r.average_rating,
+        r.num_votes
+    FROM genres  AS g
+    JOIN movies  AS m ON m.movie_id = g.movie_id
+    JOIN ratings AS r ON r.movie_id = g.movie_id
+)"""
+
+
+def _genre_ratings(conn: Any, has_table: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    Source genre × film × note. has_table : test d'existence d'une table pour
+    une connexion non SQLite (DuckDB), par défaut via sqlite_master.
+    """
+    if has_table is None:
+        has_table = lambda name: _has_table(conn, name)
+    if has_table("genre_movie_ratings_state"):
+        # stale = 1 : genres / movies / ratings modifiés depuis le dernier recalcul
+        fresh = conn.execute("SELECT stale FROM genre_movie_ratings_state;").fetchone() == (0,)
+    elif has_table("genre_movie_ratings"):
+        # table créée avant genre_movie_ratings_state : au moins non vide
+        fresh = conn.execute("SELECT 1 FROM genre_movie_ratings LIMIT 1;").fetchone() is not None
+    else:
+        fresh = False
+    return "genre_movie_ratings" if fresh else _GENRE_RATINGS_JOIN
+
+
+# Texte SQL des requêtes en constantes de module : le même texte à chaque appel
+# (une variante par filtre de nom), donc sqlite3 reprend l'instruction déjà
+# compilée dans le cache de la connexion (cached_statements, 128 par défaut)
+# au lieu de la ré-analyser et re-planifier.
+_SQL_ACTOR_FILMOGRAPHY = """
+SELECT
+    m.primary_title,
+    m.start_year,
+    c.name AS character,
+    r.average_rating
+FROM movies      AS m
+JOIN principals  AS p  ON p.movie_id  = m.movie_id
+JOIN persons     AS pe ON pe.person_id = p.person_id
+LEFT JOIN characters AS c
+       ON c.movie_id  = m.movie_id
+      AND c.person_id = p.person_id
+LEFT JOIN ratings AS r
+       ON r.movie_id = m.movie_id
+WHERE {name_filter}
+  AND p.category IN ('actor', 'actress')
+ORDER BY m.start_year DESC, m.primary_title ASC
+LIMIT ?;
+"""
 
 
 def query_actor_filmography(
     conn: sqlite3.Connection,
     actor_name: str,
+    limit: int = -1,
 ) -> List[Tuple[Any, ...]]:
     """
     Retourne la filmographie d’un acteur.
@@ -16,6 +167,7 @@ def query_actor_filmography(
     Args:
         conn: Connexion SQLite ouverte sur imdb.db.
         actor_name: Nom (ou partie de nom) de l’acteur, ex. "Tom Hanks".
+        limit: Nombre maximal de lignes retournées (-1 : toutes).
 
     Returns:
         Liste de tuples (titre, année, personnage, note_moyenne) triés par année décroissante.
@@ -33,29 +185,29 @@ def query_actor_filmography(
               AND c.person_id = p.person_id
         LEFT JOIN ratings AS r
                ON r.movie_id = m.movie_id
-        WHERE pe.name LIKE ?
+        WHERE pe.name LIKE ?   -- ou persons_fts MATCH ? (voir _name_filter)
           AND p.category IN ('actor', 'actress')
-        ORDER BY m.start_year DESC, m.primary_title ASC;
-    """
-    sql = """
-    SELECT
-        m.primary_title,
-        m.start_year,
-        c.name AS character,
-        r.average_rating
-    FROM movies      AS m
-    JOIN principals  AS p  ON p.movie_id  = m.movie_id
-    JOIN persons     AS pe ON pe.person_id = p.person_id
-    LEFT JOIN characters AS c
-           ON c.movie_id  = m.movie_id
-          AND c.person_id = p.person_id
-    LEFT JOIN ratings AS r
-           ON r.movie_id = m.movie_id
-    WHERE pe.name LIKE ?
-      AND p.category IN ('actor', 'actress')
-    ORDER BY m.start_year DESC, m.primary_title ASC;
+        ORDER BY m.start_year DESC, m.primary_title ASC
+        LIMIT ?;
     """
-    return conn.execute(sql, (f"%{actor_name}%",)).fetchall()
+    name_filter, param = _name_filter(conn, actor_name)
+    return conn.execute(_SQL_ACTOR_FILMOGRAPHY.format(name_filter=name_filter), (param, limit)).fetchall()
+
+
+_SQL_TOP_N_MOVIES = """
+SELECT
+    gr.primary_title,
+    gr.start_year,
+    gr.average_rating,
+    gr.num_votes
+FROM {genre_ratings} AS gr
+WHERE gr.genre = ?
+  AND gr.start_year BETWEEN ? AND ?
+ORDER BY gr.average_rating DESC,
+         gr.num_votes DESC,
+         gr.primary_title ASC
+LIMIT ?;
+"""
 
 
 def query_top_n_movies(
@@ -78,77 +230,104 @@ def query_top_n_movies(
     Returns:
         Liste de tuples (titre, année, note, nb_votes).
 
+    Avec genre_movie_ratings, l'index (genre, note DESC, votes DESC, titre,
+    année) est parcouru dans l'ordre du classement : pas de tri, arrêt après
+    n films de la période.
+
     SQL utilisé :
-        SELECT m.primary_title,
-               m.start_year,
-               r.average_rating,
-               r.num_votes
-        FROM movies  AS m
-        JOIN genres  AS g ON g.movie_id = m.movie_id
-        JOIN ratings AS r ON r.movie_id = m.movie_id
-        WHERE g.genre = ?
-          AND m.start_year BETWEEN ? AND ?
-        ORDER BY r.average_rating DESC, r.num_votes DESC, m.primary_title ASC
+        SELECT gr.primary_title,
+               gr.start_year,
+               gr.average_rating,
+               gr.num_votes
+        FROM genre_movie_ratings AS gr   -- ou jointure genres / movies / ratings
+        WHERE gr.genre = ?
+          AND gr.start_year BETWEEN ? AND ?
+        ORDER BY gr.average_rating DESC, gr.num_votes DESC, gr.primary_title ASC
         LIMIT ?;
     """
-    sql = """
-    SELECT
-        m.primary_title,
-        m.start_year,
-        r.average_rating,
-        r.num_votes
-    FROM movies  AS m
-    JOIN genres  AS g ON g.movie_id = m.movie_id
-    JOIN ratings AS r ON r.movie_id = m.movie_id
-    WHERE g.genre = ?
-      AND m.start_year BETWEEN ? AND ?
-    ORDER BY r.average_rating DESC,
-             r.num_votes DESC,
-             m.primary_title ASC
-    LIMIT ?;
-    """
+    sql = _SQL_TOP_N_MOVIES.format(genre_ratings=_genre_ratings(conn))
     return conn.execute(sql, (genre, start_year, end_year, n)).fetchall()
 
 
-def query_multi_role_actors(conn: sqlite3.Connection) -> List[Tuple[Any, ...]]:
+_SQL_MULTI_ROLE_ACTORS = """
+WITH roles AS (
+    SELECT movie_id, person_id, COUNT(*) AS nb_roles
+    FROM characters
+    GROUP BY movie_id, person_id
+    HAVING COUNT(*) > 1
+)
+SELECT
+    pe.name,
+    m.primary_title,
+    m.start_year,
+    r.nb_roles
+FROM roles   AS r
+JOIN persons AS pe ON pe.person_id = r.person_id
+JOIN movies  AS m  ON m.movie_id   = r.movie_id
+ORDER BY r.nb_roles DESC, pe.name ASC
+LIMIT ?;
+"""
+
+
+def query_multi_role_actors(
+    conn: sqlite3.Connection,
+    limit: int = -1,
+) -> List[Tuple[Any, ...]]:
     """
     Acteurs ayant joué plusieurs personnages dans un même film.
 
+    Args:
+        conn: Connexion SQLite.
+        limit: Nombre maximal de lignes retournées (-1 : toutes).
+
     Returns:
         Liste de tuples (nom_acteur, titre_film, année, nb_personnages),
         triés par nb_personnages décroissant.
 
+    La clé primaire de characters (movie_id, person_id, name) rend les
+    personnages déjà distincts : un COUNT(*) suffit, calculé dans l'ordre de
+    cette clé, et les noms ne sont joints qu'aux couples retenus.
+
     SQL utilisé :
-        SELECT pe.name,
-               m.primary_title,
-               m.start_year,
-               COUNT(DISTINCT c.name) AS nb_roles
-        FROM characters AS c
-        JOIN persons    AS pe ON pe.person_id = c.person_id
-        JOIN movies     AS m  ON m.movie_id   = c.movie_id
-        GROUP BY c.person_id, c.movie_id
-        HAVING COUNT(DISTINCT c.name) > 1
-        ORDER BY nb_roles DESC, pe.name ASC;
-    """
-    sql = """
-    SELECT
-        pe.name,
-        m.primary_title,
-        m.start_year,
-        COUNT(DISTINCT c.name) AS nb_roles
-    FROM characters AS c
-    JOIN persons    AS pe ON pe.person_id = c.person_id
-    JOIN movies     AS m  ON m.movie_id   = c.movie_id
-    GROUP BY c.person_id, c.movie_id
-    HAVING COUNT(DISTINCT c.name) > 1
-    ORDER BY nb_roles DESC, pe.name ASC;
+        WITH roles AS (
+            SELECT movie_id, person_id, COUNT(*) AS nb_roles
+            FROM characters
+            GROUP BY movie_id, person_id
+            HAVING COUNT(*) > 1
+        )
+        SELECT
+            pe.name,
+            m.primary_title,
+            m.start_year,
+            r.nb_roles
+        FROM roles   AS r
+        JOIN persons AS pe ON pe.person_id = r.person_id
+        JOIN movies  AS m  ON m.movie_id   = r.movie_id
+        ORDER BY r.nb_roles DESC, pe.name ASC
+        LIMIT ?;
     """
-    return conn.execute(sql).fetchall()
+    return conn.execute(_SQL_MULTI_ROLE_ACTORS, (limit,)).fetchall()
+
+
+_SQL_COLLABORATIONS = """
+WITH actor_movies AS ({actor_movies}
+)
+SELECT
+    dpe.name AS director_name,
+    COUNT(*) AS nb_films
+FROM actor_movies AS am
+JOIN directors    AS d   ON d.movie_id   = am.movie_id
+JOIN persons      AS dpe ON dpe.person_id = d.person_id
+GROUP BY dpe.person_id, dpe.name
+ORDER BY nb_films DESC, director_name ASC
+LIMIT ?;
+"""
 
 
 def query_collaborations(
     conn: sqlite3.Connection,
     actor_name: str,
+    limit: int = -1,
 ) -> List[Tuple[Any, ...]]:
     """
     Réalisateurs ayant collaboré avec un acteur donné, avec le nombre de films ensemble.
@@ -156,17 +335,18 @@ def query_collaborations(
     Args:
         conn: Connexion SQLite.
         actor_name: Nom (ou partie de nom) de l’acteur.
+        limit: Nombre maximal de lignes retournées (-1 : toutes).
 
     Returns:
         Liste de tuples (nom_réalisateur, nb_films_ensemble), triés par nb_films_ensemble décroissant.
 
     SQL utilisé (avec sous-requête / CTE) :
-        WITH actor_movies AS (
-            SELECT DISTINCT m.movie_id
+        WITH actor_movies AS (   -- ou temp.actor_movies (voir prepare_actor_movies)
+            SELECT DISTINCT m.movie_id, m.start_year
             FROM movies     AS m
             JOIN principals AS p  ON p.movie_id  = m.movie_id
             JOIN persons    AS pe ON pe.person_id = p.person_id
-            WHERE pe.name LIKE ?
+            WHERE pe.name LIKE ?   -- ou persons_fts MATCH ? (voir _name_filter)
               AND p.category IN ('actor', 'actress')
         )
         SELECT dpe.name AS director_name,
@@ -174,66 +354,84 @@ def query_collaborations(
         FROM actor_movies AS am
         JOIN directors    AS d   ON d.movie_id   = am.movie_id
         JOIN persons      AS dpe ON dpe.person_id = d.person_id
-        GROUP BY dpe.person_id
-        ORDER BY nb_films DESC, director_name ASC;
-    """
-    sql = """
-    WITH actor_movies AS (
-        SELECT DISTINCT m.movie_id
-        FROM movies     AS m
-        JOIN principals AS p  ON p.movie_id  = m.movie_id
-        JOIN persons    AS pe ON pe.person_id = p.person_id
-        WHERE pe.name LIKE ?
-          AND p.category IN ('actor', 'actress')
-    )
-    SELECT
-        dpe.name AS director_name,
-        COUNT(*) AS nb_films
-    FROM actor_movies AS am
-    JOIN directors    AS d   ON d.movie_id   = am.movie_id
-    JOIN persons      AS dpe ON dpe.person_id = d.person_id
-    GROUP BY dpe.person_id
-    ORDER BY nb_films DESC, director_name ASC;
+        GROUP BY dpe.person_id, dpe.name
+        ORDER BY nb_films DESC, director_name ASC
+        LIMIT ?;
     """
-    return conn.execute(sql, (f"%{actor_name}%",)).fetchall()
+    actor_movies, param = _actor_movies(conn, actor_name)
+    return conn.execute(_SQL_COLLABORATIONS.format(actor_movies=actor_movies), (param, limit)).fetchall()
+
 
+_SQL_POPULAR_GENRES = """
+SELECT
+    gr.genre,
+    COUNT(*)               AS nb_films,
+    AVG(gr.average_rating) AS avg_rating
+FROM {genre_ratings} AS gr
+GROUP BY gr.genre
+HAVING AVG(gr.average_rating) > 7.0
+   AND COUNT(*) > 50
+ORDER BY avg_rating DESC
+LIMIT ?;
+"""
 
-def query_popular_genres(conn: sqlite3.Connection) -> List[Tuple[Any, ...]]:
+
+def query_popular_genres(
+    conn: sqlite3.Connection,
+    limit: int = -1,
+) -> List[Tuple[Any, ...]]:
     """
     Genres populaires : genres ayant une note moyenne > 7.0 et plus de 50 films.
 
+    Args:
+        conn: Connexion SQLite.
+        limit: Nombre maximal de lignes retournées (-1 : toutes).
+
     Returns:
         Liste de tuples (genre, nb_films, note_moyenne) triés par note_moyenne décroissante.
 
     SQL utilisé :
-        SELECT g.genre,
-               COUNT(*)              AS nb_films,
-               AVG(r.average_rating) AS avg_rating
-        FROM genres  AS g
-        JOIN ratings AS r ON r.movie_id = g.movie_id
-        GROUP BY g.genre
-        HAVING AVG(r.average_rating) > 7.0
+        SELECT gr.genre,
+               COUNT(*)               AS nb_films,
+               AVG(gr.average_rating) AS avg_rating
+        FROM genre_movie_ratings AS gr   -- ou jointure genres / movies / ratings
+        GROUP BY gr.genre
+        HAVING AVG(gr.average_rating) > 7.0
            AND COUNT(*) > 50
-        ORDER BY avg_rating DESC;
+        ORDER BY avg_rating DESC
+        LIMIT ?;
     """
-    sql = """
+    sql = _SQL_POPULAR_GENRES.format(genre_ratings=_genre_ratings(conn))
+    return conn.execute(sql, (limit,)).fetchall()
+
+
+_SQL_CAREER_EVOLUTION = """
+WITH actor_movies AS ({actor_movies}
+),
+actor_ratings AS (
     SELECT
-        g.genre,
-        COUNT(*)              AS nb_films,
-        AVG(r.average_rating) AS avg_rating
-    FROM genres  AS g
-    JOIN ratings AS r ON r.movie_id = g.movie_id
-    GROUP BY g.genre
-    HAVING AVG(r.average_rating) > 7.0
-       AND COUNT(*) > 50
-    ORDER BY avg_rating DESC;
-    """
-    return conn.execute(sql).fetchall()
+        am.movie_id,
+        am.start_year - am.start_year % 10 AS decade,
+        r.average_rating
+    FROM actor_movies AS am
+    LEFT JOIN ratings AS r ON r.movie_id = am.movie_id
+    WHERE am.start_year IS NOT NULL
+)
+SELECT
+    decade,
+    COUNT(*)            AS nb_films,
+    AVG(average_rating) AS avg_rating
+FROM actor_ratings
+GROUP BY decade
+ORDER BY decade
+LIMIT ?;
+"""
 
 
 def query_career_evolution(
     conn: sqlite3.Connection,
     actor_name: str,
+    limit: int = -1,
 ) -> List[Tuple[Any, ...]]:
     """
     Évolution de carrière : pour un acteur donné, nombre de films par décennie avec note moyenne.
@@ -241,28 +439,29 @@ def query_career_evolution(
     Args:
         conn: Connexion SQLite.
         actor_name: Nom (ou partie de nom) de l’acteur.
+        limit: Nombre maximal de lignes retournées (-1 : toutes).
 
     Returns:
         Liste de tuples (décennie, nb_films, note_moyenne), triés par décennie croissante.
 
     SQL utilisé (WITH / CTE) :
-        WITH actor_movies AS (
+        WITH actor_movies AS (   -- ou temp.actor_movies (voir prepare_actor_movies)
             SELECT DISTINCT m.movie_id,
                             m.start_year
             FROM movies     AS m
             JOIN principals AS p  ON p.movie_id  = m.movie_id
             JOIN persons    AS pe ON pe.person_id = p.person_id
-            WHERE pe.name LIKE ?
+            WHERE pe.name LIKE ?   -- ou persons_fts MATCH ? (voir _name_filter)
               AND p.category IN ('actor', 'actress')
-              AND m.start_year IS NOT NULL
         ),
         actor_ratings AS (
             SELECT
                 am.movie_id,
-                (am.start_year / 10) * 10 AS decade,
+                am.start_year - am.start_year % 10 AS decade,
                 r.average_rating
             FROM actor_movies AS am
             LEFT JOIN ratings AS r ON r.movie_id = am.movie_id
+            WHERE am.start_year IS NOT NULL
         )
         SELECT
             decade,
@@ -270,43 +469,51 @@ def query_career_evolution(
             AVG(average_rating)   AS avg_rating
         FROM actor_ratings
         GROUP BY decade
-        ORDER BY decade;
+        ORDER BY decade
+        LIMIT ?;
     """
-    sql = """
-    WITH actor_movies AS (
-        SELECT DISTINCT
-            m.movie_id,
-            m.start_year
-        FROM movies     AS m
-        JOIN principals AS p  ON p.movie_id  = m.movie_id
-        JOIN persons    AS pe ON pe.person_id = p.person_id
-        WHERE pe.name LIKE ?
-          AND p.category IN ('actor', 'actress')
-          AND m.start_year IS NOT NULL
-    ),
-    actor_ratings AS (
-        SELECT
-            am.movie_id,
-            (am.start_year / 10) * 10 AS decade,
-            r.average_rating
-        FROM actor_movies AS am
-        LEFT JOIN ratings AS r ON r.movie_id = am.movie_id
-    )
+    actor_movies, param = _actor_movies(conn, actor_name)
+    return conn.execute(_SQL_CAREER_EVOLUTION.format(actor_movies=actor_movies), (param, limit)).fetchall()
+
+
+_SQL_TOP3_BY_GENRE = """
+SELECT
+    genre,
+    rank,
+    primary_title,
+    start_year,
+    average_rating
+FROM (
     SELECT
-        decade,
-        COUNT(*)            AS nb_films,
-        AVG(average_rating) AS avg_rating
-    FROM actor_ratings
-    GROUP BY decade
-    ORDER BY decade;
-    """
-    return conn.execute(sql, (f"%{actor_name}%",)).fetchall()
-
-
-def query_top3_by_genre(conn: sqlite3.Connection) -> List[Tuple[Any, ...]]:
+        gr.genre,
+        gr.primary_title,
+        gr.start_year,
+        gr.average_rating,
+        ROW_NUMBER() OVER (
+            PARTITION BY gr.genre
+            ORDER BY gr.average_rating DESC,
+                     gr.num_votes DESC,
+                     gr.primary_title ASC
+        ) AS rank
+    FROM {genre_ratings} AS gr
+) AS sub
+WHERE rank <= 3
+ORDER BY genre, rank
+LIMIT ?;
+"""
+
+
+def query_top3_by_genre(
+    conn: sqlite3.Connection,
+    limit: int = -1,
+) -> List[Tuple[Any, ...]]:
     """
     Classement par genre : pour chaque genre, les 3 meilleurs films avec leur rang.
 
+    Args:
+        conn: Connexion SQLite.
+        limit: Nombre maximal de lignes retournées (-1 : toutes).
+
     Returns:
         Liste de tuples (genre, rang, titre, année, note_moyenne).
 
@@ -314,51 +521,60 @@ def query_top3_by_genre(conn: sqlite3.Connection) -> List[Tuple[Any, ...]]:
         SELECT genre, rank, primary_title, start_year, average_rating
         FROM (
             SELECT
-                g.genre,
-                m.primary_title,
-                m.start_year,
-                r.average_rating,
+                gr.genre,
+                gr.primary_title,
+                gr.start_year,
+                gr.average_rating,
                 ROW_NUMBER() OVER (
-                    PARTITION BY g.genre
-                    ORDER BY r.average_rating DESC, r.num_votes DESC, m.primary_title ASC
+                    PARTITION BY gr.genre
+                    ORDER BY gr.average_rating DESC, gr.num_votes DESC, gr.primary_title ASC
                 ) AS rank
-            FROM genres  AS g
-            JOIN movies  AS m ON m.movie_id = g.movie_id
-            JOIN ratings AS r ON r.movie_id = g.movie_id
+            FROM genre_movie_ratings AS gr   -- ou jointure genres / movies / ratings
         )
         WHERE rank <= 3
-        ORDER BY genre, rank;
-    """
-    sql = """
-    SELECT
-        genre,
-        rank,
-        primary_title,
-        start_year,
-        average_rating
-    FROM (
-        SELECT
-            g.genre,
-            m.primary_title,
-            m.start_year,
-            r.average_rating,
-            ROW_NUMBER() OVER (
-                PARTITION BY g.genre
-                ORDER BY r.average_rating DESC,
-                         r.num_votes DESC,
-                         m.primary_title ASC
-            ) AS rank
-        FROM genres  AS g
-        JOIN movies  AS m ON m.movie_id = g.movie_id
-        JOIN ratings AS r ON r.movie_id = g.movie_id
-    ) AS sub
-    WHERE rank <= 3
-    ORDER BY genre, rank;
+        ORDER BY genre, rank
+        LIMIT ?;
     """
-    return conn.execute(sql).fetchall()
+    sql = _SQL_TOP3_BY_GENRE.format(genre_ratings=_genre_ratings(conn))
+    return conn.execute(sql, (limit,)).fetchall()
 
 
-def query_career_boost(conn: sqlite3.Connection) -> List[Tuple[Any, ...]]:
+_SQL_CAREER_BOOST = """
+WITH movie_cls AS (
+    SELECT
+        m.movie_id,
+        m.start_year,
+        CAST(r.num_votes >= 200000 AS INTEGER) AS is_high
+    FROM movies  AS m
+    JOIN ratings AS r ON r.movie_id = m.movie_id
+),
+person_stats AS (
+    SELECT
+        p.person_id,
+        SUM(1 - mc.is_high)                              AS low_count,
+        SUM(mc.is_high)                                  AS high_count,
+        MIN(CASE WHEN mc.is_high THEN mc.start_year END) AS breakthrough_year
+    FROM principals AS p
+    JOIN movie_cls  AS mc ON mc.movie_id = p.movie_id
+    GROUP BY p.person_id
+    HAVING low_count > 0 AND high_count > 0
+)
+SELECT
+    pe.name,
+    ps.low_count,
+    ps.high_count,
+    ps.breakthrough_year
+FROM person_stats AS ps
+JOIN persons      AS pe ON pe.person_id = ps.person_id
+ORDER BY ps.high_count DESC, ps.breakthrough_year
+LIMIT ?;
+"""
+
+
+def query_career_boost(
+    conn: sqlite3.Connection,
+    limit: int = -1,
+) -> List[Tuple[Any, ...]]:
     """
     Carrière propulsée : personnes ayant « percé » grâce à un film.
 
@@ -367,57 +583,65 @@ def query_career_boost(conn: sqlite3.Connection) -> List[Tuple[Any, ...]]:
         - après : au moins un film avec 200k votes ou plus
       On retient les personnes ayant au moins un film 'low' et un film 'high'.
 
+    Args:
+        conn: Connexion SQLite.
+        limit: Nombre maximal de lignes retournées (-1 : toutes).
+
     Returns:
         Liste de tuples (nom_personne, nb_films_low, nb_films_high, annee_premier_high),
         triés par nb_films_high décroissant puis par année de percée.
 
+    Le seuil de votes est évalué une fois par film (movie_cls) et l'agrégat ne
+    porte que sur principals ; le nom n'est joint qu'aux personnes retenues.
+
     SQL utilisé :
-        WITH person_stats AS (
+        WITH movie_cls AS (
+            SELECT
+                m.movie_id,
+                m.start_year,
+                CAST(r.num_votes >= 200000 AS INTEGER) AS is_high
+            FROM movies  AS m
+            JOIN ratings AS r ON r.movie_id = m.movie_id
+        ),
+        person_stats AS (
             SELECT
                 p.person_id,
-                pe.name,
-                SUM(CASE WHEN r.num_votes < 200000 THEN 1 ELSE 0 END) AS low_count,
-                SUM(CASE WHEN r.num_votes >= 200000 THEN 1 ELSE 0 END) AS high_count,
-                MIN(CASE WHEN r.num_votes >= 200000 THEN m.start_year END) AS breakthrough_year
+                SUM(1 - mc.is_high)                              AS low_count,
+                SUM(mc.is_high)                                  AS high_count,
+                MIN(CASE WHEN mc.is_high THEN mc.start_year END) AS breakthrough_year
             FROM principals AS p
-            JOIN movies    AS m  ON m.movie_id   = p.movie_id
-            JOIN ratings   AS r  ON r.movie_id   = m.movie_id
-            JOIN persons   As pe ON pe.person_id = p.person_id
+            JOIN movie_cls  AS mc ON mc.movie_id = p.movie_id
             GROUP BY p.person_id
+            HAVING low_count > 0 AND high_count > 0
         )
         SELECT
-            name,
-            low_count,
-            high_count,
-            breakthrough_year
-        FROM person_stats
-        WHERE low_count > 0 AND high_count > 0
-        ORDER BY high_count DESC, breakthrough_year;
-    """
-    sql = """
-    WITH person_stats AS (
-        SELECT
-            p.person_id,
             pe.name,
-            SUM(CASE WHEN r.num_votes < 200000 THEN 1 ELSE 0 END)  AS low_count,
-            SUM(CASE WHEN r.num_votes >= 200000 THEN 1 ELSE 0 END) AS high_count,
-            MIN(CASE WHEN r.num_votes >= 200000 THEN m.start_year END) AS breakthrough_year
-        FROM principals AS p
-        JOIN movies    AS m  ON m.movie_id   = p.movie_id
-        JOIN ratings   AS r  ON r.movie_id   = m.movie_id
-        JOIN persons   AS pe ON pe.person_id = p.person_id
-        GROUP BY p.person_id
-    )
-    SELECT
-        name,
-        low_count,
-        high_count,
-        breakthrough_year
-    FROM person_stats
-    WHERE low_count > 0 AND high_count > 0
-    ORDER BY high_count DESC, breakthrough_year;
+            ps.low_count,
+            ps.high_count,
+            ps.breakthrough_year
+        FROM person_stats AS ps
+        JOIN persons      AS pe ON pe.person_id = ps.person_id
+        ORDER BY ps.high_count DESC, ps.breakthrough_year
+        LIMIT ?;
     """
-    return conn.execute(sql).fetchall()
+    return conn.execute(_SQL_CAREER_BOOST, (limit,)).fetchall()
+
+
+_SQL_MOST_VERSATILE_ACTORS = """
+SELECT
+    pe.name,
+    COUNT(DISTINCT g.genre)    AS nb_genres,
+    COUNT(DISTINCT m.movie_id) AS nb_movies
+FROM persons    AS pe
+JOIN principals AS p ON p.person_id = pe.person_id
+JOIN movies     AS m ON m.movie_id  = p.movie_id
+JOIN genres     AS g ON g.movie_id  = m.movie_id
+WHERE p.category IN ('actor', 'actress')
+GROUP BY pe.person_id, pe.name
+HAVING COUNT(DISTINCT g.genre) >= ?
+ORDER BY nb_genres DESC, nb_movies DESC, pe.name ASC
+LIMIT ?;
+"""
 
 
 def query_most_versatile_actors(
@@ -447,24 +671,9 @@ def query_most_versatile_actors(
         JOIN movies     AS m ON m.movie_id  = p.movie_id
         JOIN genres     AS g ON g.movie_id  = m.movie_id
         WHERE p.category IN ('actor', 'actress')
-        GROUP BY pe.person_id
+        GROUP BY pe.person_id, pe.name
         HAVING COUNT(DISTINCT g.genre) >= ?
         ORDER BY nb_genres DESC, nb_movies DESC, pe.name ASC
         LIMIT ?;
     """
-    sql = """
-    SELECT
-        pe.name,
-        COUNT(DISTINCT g.genre)    AS nb_genres,
-        COUNT(DISTINCT m.movie_id) AS nb_movies
-    FROM persons    AS pe
-    JOIN principals AS p ON p.person_id = pe.person_id
-    JOIN movies     AS m ON m.movie_id  = p.movie_id
-    JOIN genres     AS g ON g.movie_id  = m.movie_id
-    WHERE p.category IN ('actor', 'actress')
-    GROUP BY pe.person_id
-    HAVING COUNT(DISTINCT g.genre) >= ?
-    ORDER BY nb_genres DESC, nb_movies DESC, pe.name ASC
-    LIMIT ?;
-    """
-    return conn.execute(sql, (min_genres, limit)).fetchall()
+    return conn.execute(_SQL_MOST_VERSATILE_ACTORS, (min_genres, limit)).fetchall()
@@ -1,5 +1,9 @@
 # script/phase1_sqlite/show_queries.py
 
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 import sqlite3
 
@@ -13,9 +17,10 @@ from queries import (
     query_top3_by_genre,
     query_career_boost,
     query_most_versatile_actors,
+    prepare_actor_movies,
 )
 
-DB_PATH = Path(__file__).resolve().parents[2] / "data" / "imdb.db"
+DB_PATH = Path(os.environ.get("IMDB_SQLITE_PATH", Path(__file__).resolve().parents[2] / "data" / "imdb.db"))
 
 
 def print_section(title: str, headers, rows, limit: int = 10):
@@ -23,109 +28,143 @@ def print_section(title: str, headers, rows, limit: int = 10):
     print(title)
     print("=" * 80)
 
-    rows = list(rows)[:limit]
+    rows = list(islice(rows, limit))
     if not rows:
         print("(aucun résultat)")
         return
 
+    # cellules converties une seule fois, réutilisées pour l'affichage
+    cells = [[str(v) for v in row[:len(headers)]] for row in rows]
+
     # largeur colonnes
-    cols = len(headers)
     widths = [len(str(h)) for h in headers]
-    for row in rows:
-        for i in range(cols):
-            widths[i] = max(widths[i], len(str(row[i])))
+    for row in cells:
+        for i, val in enumerate(row):
+            widths[i] = max(widths[i], len(val))
+
+    fmt = " | ".join("{:<" + str(w) + "}" for w in widths)
 
     # ligne header
-    header_line = " | ".join(str(h).ljust(widths[i]) for i, h in enumerate(headers))
-    sep_line = "-+-".join("-" * widths[i] for i in range(cols))
-    print(header_line)
-    print(sep_line)
+    print(fmt.format(*(str(h) for h in headers)))
+    print("-+-".join("-" * w for w in widths))
 
     # lignes données
-    for row in rows:
-        line = " | ".join(str(row[i]).ljust(widths[i]) for i in range(cols))
-        print(line)
+    for row in cells:
+        print(fmt.format(*row))
 
 
-def main():
+def connect(in_memory: bool = False) -> sqlite3.Connection:
+    """
+    Ouvre imdb.db, ou avec in_memory une copie complète en mémoire (API de
+    sauvegarde : clés, index et tables FTS compris) pour que les requêtes ne
+    fassent plus aucune lecture disque. Demande autant de RAM que la taille
+    du fichier.
+    """
     conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-
-    # 1. Filmographie d’un acteur
-    rows = query_actor_filmography(conn, "Tom Hanks")
-    print_section(
-        "Filmographie de Tom Hanks (exemple T1.3)",
-        ["Titre", "Année", "Personnage", "Note"],
-        rows,
-        limit=15,
+    if not in_memory:
+        return conn
+    mem = sqlite3.connect(":memory:")
+    try:
+        conn.backup(mem)
+    finally:
+        conn.close()
+    return mem
+
+
+def tune(conn: sqlite3.Connection) -> None:
+    """
+    PRAGMA de lecture : cache de 256 Mo et mmap pour garder les pages des index
+    en mémoire d'une requête à l'autre, tables temporaires (tris, GROUP BY) en
+    mémoire. WAL est déjà le mode de la base après l'import.
+    """
+    conn.executescript(
+        """
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA cache_size = -262144;
+        PRAGMA mmap_size = 268435456;
+        PRAGMA foreign_keys = ON;
+        """
     )
 
-    # 2. Top N films d’un genre
-    rows = query_top_n_movies(conn, genre="Drama", start_year=1990, end_year=2020, n=10)
-    print_section(
-        "Top 10 films 'Drama' (1990–2020)",
-        ["Titre", "Année", "Note", "Votes"],
-        rows,
-    )
 
+# Sections affichées, dans l'ordre : (titre, en-têtes, requête, nb lignes).
+# LIMIT passé à chaque requête : seules les lignes affichées sont construites.
+SECTIONS = [
+    # 1. Filmographie d’un acteur
+    ("Filmographie de Tom Hanks (exemple T1.3)",
+     ["Titre", "Année", "Personnage", "Note"],
+     lambda conn: query_actor_filmography(conn, "Tom Hanks", limit=15), 15),
+    # 2. Top N films d’un genre
+    ("Top 10 films 'Drama' (1990–2020)",
+     ["Titre", "Année", "Note", "Votes"],
+     lambda conn: query_top_n_movies(conn, genre="Drama", start_year=1990, end_year=2020, n=10), 10),
     # 3. Acteurs avec plusieurs rôles dans un même film
-    rows = query_multi_role_actors(conn)
-    print_section(
-        "Acteurs avec plusieurs personnages dans un même film",
-        ["Acteur", "Film", "Année", "Nb rôles"],
-        rows,
-    )
-
+    ("Acteurs avec plusieurs personnages dans un même film",
+     ["Acteur", "Film", "Année", "Nb rôles"],
+     lambda conn: query_multi_role_actors(conn, limit=10), 10),
     # 4. Réalisateurs qui collaborent avec un acteur
-    rows = query_collaborations(conn, "Tom Hanks")
-    print_section(
-        "Réalisateurs ayant le plus collaboré avec Tom Hanks",
-        ["Réalisateur", "Nb films ensemble"],
-        rows,
-    )
-
+    ("Réalisateurs ayant le plus collaboré avec Tom Hanks",
+     ["Réalisateur", "Nb films ensemble"],
+     lambda conn: query_collaborations(conn, "Tom Hanks", limit=10), 10),
     # 5. Genres populaires
-    rows = query_popular_genres(conn)
-    print_section(
-        "Genres populaires (note moyenne > 7 et > 50 films)",
-        ["Genre", "Nb films", "Note moyenne"],
-        rows,
-    )
-
+    ("Genres populaires (note moyenne > 7 et > 50 films)",
+     ["Genre", "Nb films", "Note moyenne"],
+     lambda conn: query_popular_genres(conn, limit=10), 10),
     # 6. Évolution de carrière
-    rows = query_career_evolution(conn, "Tom Hanks")
-    print_section(
-        "Évolution de la carrière de Tom Hanks par décennie",
-        ["Décennie", "Nb films", "Note moyenne"],
-        rows,
-    )
-
+    ("Évolution de la carrière de Tom Hanks par décennie",
+     ["Décennie", "Nb films", "Note moyenne"],
+     lambda conn: query_career_evolution(conn, "Tom Hanks", limit=10), 10),
     # 7. Top 3 films par genre
-    rows = query_top3_by_genre(conn)
-    print_section(
-        "Top 3 films par genre",
-        ["Genre", "Rang", "Titre", "Année", "Note"],
-        rows,
-        limit=30,
-    )
-
+    ("Top 3 films par genre",
+     ["Genre", "Rang", "Titre", "Année", "Note"],
+     lambda conn: query_top3_by_genre(conn, limit=30), 30),
     # 8. Carrières « boostées »
-    rows = query_career_boost(conn)
-    print_section(
-        "Carrières boostées par un film à gros succès",
-        ["Personne", "Nb films low", "Nb films high", "Année percée"],
-        rows,
-    )
-
+    ("Carrières boostées par un film à gros succès",
+     ["Personne", "Nb films low", "Nb films high", "Année percée"],
+     lambda conn: query_career_boost(conn, limit=10), 10),
     # 9. Acteurs les plus polyvalents
-    rows = query_most_versatile_actors(conn, min_genres=3, limit=20)
-    print_section(
-        "Acteurs les plus polyvalents (au moins 3 genres)",
-        ["Acteur", "Nb genres", "Nb films"],
-        rows,
-    )
+    ("Acteurs les plus polyvalents (au moins 3 genres)",
+     ["Acteur", "Nb genres", "Nb films"],
+     lambda conn: query_most_versatile_actors(conn, min_genres=3, limit=20), 10),
+]
+
+# Groupes de sections (indices) exécutés chacun sur sa propre connexion, en
+# parallèle (lecteurs concurrents en WAL). Q4 et Q6 ensemble : elles relisent
+# la même table temporaire actor_movies, propre à la connexion.
+GROUPS = [[0], [1], [2], [3, 5], [4], [6], [7], [8]]
+WORKERS = min(4, os.cpu_count() or 1)
+
+
+def run_group(indices, in_memory: bool = False) -> dict:
+    conn = connect(in_memory)
+    try:
+        tune(conn)
+        if len(indices) > 1:
+            # Films de l'acteur calculés une fois pour Q4 et Q6, avant
+            # query_only (qui interdit aussi les tables temporaires)
+            prepare_actor_movies(conn, "Tom Hanks")
+        conn.execute("PRAGMA query_only = 1;")
+        return {i: SECTIONS[i][2](conn) for i in indices}
+    finally:
+        conn.close()
+
 
-    conn.close()
+def main():
+    # --memory : requêtes sur une copie de la base en mémoire, une seule
+    # connexion (une copie par thread coûterait la taille de la base chacune)
+    in_memory = "--memory" in sys.argv
+    groups = [list(range(len(SECTIONS)))] if in_memory else GROUPS
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(WORKERS, len(groups))) as pool:
+        for part in pool.map(lambda g: run_group(g, in_memory), groups):
+            results.update(part)
+
+    # Affichage dans l'ordre des sections, quel que soit l'ordre de fin
+    for i, (title, headers, _, limit) in enumerate(SECTIONS):
+        print_section(title, headers, results[i], limit=limit)
 
 
 if __name__ == "__main__":
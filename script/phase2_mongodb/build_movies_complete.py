@@ -1,3 +1,6 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from pymongo import MongoClient
 
 # ----------------------------
@@ -6,6 +9,10 @@ from pymongo import MongoClient
 MONGO_URI = "mongodb://localhost:27017"
 DB_NAME = "cineexplorer_flat"
 OUT_COL = "movies_complete"
+# Construction par tranches de movie_id, WORKERS pipelines en parallèle vers
+# STAGING_COL, renommée ensuite en OUT_COL
+STAGING_COL = OUT_COL + "_build"
+WORKERS = min(8, os.cpu_count() or 1)
 
 # Pour tester vite sur 1 film (recommandé au début):
 # TEST_MOVIE_ID = "tt0111161"
@@ -34,21 +41,55 @@ db.genres.create_index([("genre", 1)])
 db.directors.create_index([("movie_id", 1)])
 db.directors.create_index([("person_id", 1)])
 
-db.principals.create_index([("movie_id", 1)])
-db.principals.create_index([("person_id", 1)])
+# principals / characters : index composés qui couvrent le $match + $sort
+# (ou le $group) des lookups ; ils remplacent les index à une colonne qui en
+# sont des préfixes
+db.principals.create_index([("movie_id", 1), ("category", 1), ("ordering", 1)])
 db.principals.create_index([("person_id", 1), ("category", 1)])
 
-db.characters.create_index([("movie_id", 1), ("person_id", 1)])
-db.titles.create_index([("movie_id", 1)])
+db.characters.create_index([("movie_id", 1), ("person_id", 1), ("name", 1)])
 
-# ----------------------------
-# Reset output collection
-# ----------------------------
-db[OUT_COL].drop()
+for col, name in [
+    ("principals", "movie_id_1"),
+    ("principals", "person_id_1"),
+    ("characters", "movie_id_1_person_id_1"),
+]:
+    if name in db[col].index_information():
+        db[col].drop_index(name)
+db.titles.create_index([("movie_id", 1)])
 
 # ----------------------------
 # Pipeline
 # ----------------------------
+# Jointures vers persons : localField sur le tableau d'identifiants (égalité,
+# via l'index persons.person_id) plutôt que $expr/$in ; chaque tableau
+# *_ids est calculé une fois par film pour pick().
+def pick(items: str, ids: str, key: str, field: str, default):
+    """
+    Expression : champ `field` de l'élément de `items` dont l'identifiant
+    (tableau parallèle `ids`) vaut `key`, ou `default` s'il n'y en a pas.
+    $indexOfArray parcourt `ids` en natif au lieu d'évaluer un $filter
+    élément par élément (toujours SANS $getField).
+    """
+    return {
+        "$let": {
+            "vars": {"i": {"$indexOfArray": [ids, key]}},
+            "in": {
+                "$cond": [
+                    {"$lt": ["$$i", 0]},
+                    default,
+                    {
+                        "$let": {
+                            "vars": {"x": {"$arrayElemAt": [items, "$$i"]}},
+                            "in": {"$ifNull": ["$$x." + field, default]},
+                        }
+                    },
+                ]
+            },
+        }
+    }
+
+
 pipeline = []
 
 # Base = movies
@@ -110,13 +151,12 @@ pipeline += [
     }},
     {"$lookup": {
         "from": "persons",
-        "let": {"ids": "$dir.person_id"},
-        "pipeline": [
-            {"$match": {"$expr": {"$in": ["$person_id", "$$ids"]}}},
-            {"$project": {"_id": 0, "person_id": 1, "name": 1}}
-        ],
+        "localField": "dir.person_id",
+        "foreignField": "person_id",
+        "pipeline": [{"$project": {"_id": 0, "person_id": 1, "name": 1}}],
         "as": "dir_people"
     }},
+    {"$set": {"dir_people_ids": "$dir_people.person_id"}},
     {"$set": {
         "directors": {
             "$map": {
@@ -124,60 +164,62 @@ pipeline += [
                 "as": "d",
                 "in": {
                     "person_id": "$$d.person_id",
-                    "name": {
-                        "$let": {
-                            "vars": {
-                                "pp": {
-                                    "$first": {
-                                        "$filter": {
-                                            "input": "$dir_people",
-                                            "as": "p",
-                                            "cond": {"$eq": ["$$p.person_id", "$$d.person_id"]}
-                                        }
-                                    }
-                                }
-                            },
-                            "in": {"$ifNull": ["$$pp.name", None]}
-                        }
-                    }
+                    "name": pick("$dir_people", "$dir_people_ids", "$$d.person_id", "name", None)
                 }
             }
         }
     }},
 ]
 
-# cast = principals(actor/actress) + persons + characters (SANS $getField)
+# principals : une seule lecture par film pour le casting et les scénaristes,
+# séparés ensuite en mémoire
 pipeline += [
     {"$lookup": {
         "from": "principals",
         "localField": "movie_id",
         "foreignField": "movie_id",
         "pipeline": [
-            {"$match": {"category": {"$in": ["actor", "actress"]}}},
-            {"$project": {"_id": 0, "person_id": 1, "ordering": 1}},
+            {"$match": {"category": {"$in": ["actor", "actress", "writer"]}}},
+            {"$project": {"_id": 0, "person_id": 1, "ordering": 1, "category": 1, "job": 1}},
             {"$sort": {"ordering": 1}}
         ],
-        "as": "cast_pr"
+        "as": "pr"
     }},
+    {"$set": {
+        "cast_pr": {"$filter": {
+            "input": "$pr",
+            "as": "p",
+            "cond": {"$in": ["$$p.category", ["actor", "actress"]]}
+        }},
+        "w_pr": {"$filter": {
+            "input": "$pr",
+            "as": "p",
+            "cond": {"$eq": ["$$p.category", "writer"]}
+        }},
+    }},
+]
+
+# cast = principals(actor/actress) + persons + characters (SANS $getField)
+pipeline += [
     {"$lookup": {
         "from": "persons",
-        "let": {"ids": "$cast_pr.person_id"},
-        "pipeline": [
-            {"$match": {"$expr": {"$in": ["$person_id", "$$ids"]}}},
-            {"$project": {"_id": 0, "person_id": 1, "name": 1}}
-        ],
+        "localField": "cast_pr.person_id",
+        "foreignField": "person_id",
+        "pipeline": [{"$project": {"_id": 0, "person_id": 1, "name": 1}}],
         "as": "cast_people"
     }},
+    {"$set": {"cast_people_ids": "$cast_people.person_id"}},
     {"$lookup": {
         "from": "characters",
-        "let": {"mid": "$movie_id"},
+        "localField": "movie_id",
+        "foreignField": "movie_id",
         "pipeline": [
-            {"$match": {"$expr": {"$eq": ["$movie_id", "$$mid"]}}},
             {"$group": {"_id": "$person_id", "characters": {"$addToSet": "$name"}}},
             {"$project": {"_id": 0, "person_id": "$_id", "characters": 1}}
         ],
         "as": "cast_chars"
     }},
+    {"$set": {"cast_chars_ids": "$cast_chars.person_id"}},
     {"$set": {
         "cast": {
             "$map": {
@@ -186,38 +228,8 @@ pipeline += [
                 "in": {
                     "person_id": "$$pr.person_id",
                     "ordering": "$$pr.ordering",
-                    "name": {
-                        "$let": {
-                            "vars": {
-                                "pp": {
-                                    "$first": {
-                                        "$filter": {
-                                            "input": "$cast_people",
-                                            "as": "p",
-                                            "cond": {"$eq": ["$$p.person_id", "$$pr.person_id"]}
-                                        }
-                                    }
-                                }
-                            },
-                            "in": {"$ifNull": ["$$pp.name", None]}
-                        }
-                    },
-                    "characters": {
-                        "$let": {
-                            "vars": {
-                                "cc": {
-                                    "$first": {
-                                        "$filter": {
-                                            "input": "$cast_chars",
-                                            "as": "c",
-                                            "cond": {"$eq": ["$$c.person_id", "$$pr.person_id"]}
-                                        }
-                                    }
-                                }
-                            },
-                            "in": {"$ifNull": ["$$cc.characters", []]}
-                        }
-                    }
+                    "name": pick("$cast_people", "$cast_people_ids", "$$pr.person_id", "name", None),
+                    "characters": pick("$cast_chars", "$cast_chars_ids", "$$pr.person_id", "characters", [])
                 }
             }
         }
@@ -226,26 +238,14 @@ pipeline += [
 
 # writers = principals(category == writer) + persons (SANS $getField)
 pipeline += [
-    {"$lookup": {
-        "from": "principals",
-        "localField": "movie_id",
-        "foreignField": "movie_id",
-        "pipeline": [
-            {"$match": {"category": "writer"}},
-            {"$project": {"_id": 0, "person_id": 1, "job": 1, "ordering": 1}},
-            {"$sort": {"ordering": 1}}
-        ],
-        "as": "w_pr"
-    }},
     {"$lookup": {
         "from": "persons",
-        "let": {"ids": "$w_pr.person_id"},
-        "pipeline": [
-            {"$match": {"$expr": {"$in": ["$person_id", "$$ids"]}}},
-            {"$project": {"_id": 0, "person_id": 1, "name": 1}}
-        ],
+        "localField": "w_pr.person_id",
+        "foreignField": "person_id",
+        "pipeline": [{"$project": {"_id": 0, "person_id": 1, "name": 1}}],
         "as": "w_people"
     }},
+    {"$set": {"w_people_ids": "$w_people.person_id"}},
     {"$set": {
         "writers": {
             "$map": {
@@ -253,22 +253,7 @@ pipeline += [
                 "as": "w",
                 "in": {
                     "person_id": "$$w.person_id",
-                    "name": {
-                        "$let": {
-                            "vars": {
-                                "pp": {
-                                    "$first": {
-                                        "$filter": {
-                                            "input": "$w_people",
-                                            "as": "p",
-                                            "cond": {"$eq": ["$$p.person_id", "$$w.person_id"]}
-                                        }
-                                    }
-                                }
-                            },
-                            "in": {"$ifNull": ["$$pp.name", None]}
-                        }
-                    },
+                    "name": pick("$w_people", "$w_people_ids", "$$w.person_id", "name", None),
                     "category": {"$ifNull": ["$$w.job", "writer"]}
                 }
             }
@@ -287,22 +272,62 @@ pipeline += [
     }},
 ]
 
-# cleanup + merge
+# cleanup
 pipeline += [
     {"$project": {
         "movie_id": 0,   # déjà dans _id
         "g": 0, "r": 0,
-        "dir": 0, "dir_people": 0,
-        "cast_pr": 0, "cast_people": 0, "cast_chars": 0,
-        "w_pr": 0, "w_people": 0,
+        "dir": 0, "dir_people": 0, "dir_people_ids": 0,
+        "pr": 0, "cast_pr": 0, "cast_people": 0, "cast_people_ids": 0,
+        "cast_chars": 0, "cast_chars_ids": 0,
+        "w_pr": 0, "w_people": 0, "w_people_ids": 0,
     }},
-    {"$merge": {"into": OUT_COL, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
 ]
 
 # ----------------------------
 # Run
 # ----------------------------
-db.movies.aggregate(pipeline, allowDiskUse=True)
+def movie_id_ranges(k: int):
+    """
+    Découpe movies en k tranches [lo, hi) de movie_id de tailles voisines
+    ($bucketAuto) ; None = pas de borne.
+    """
+    if k <= 1:
+        return [(None, None)]
+    buckets = db.movies.aggregate([
+        {"$project": {"_id": 0, "movie_id": 1}},
+        {"$bucketAuto": {"groupBy": "$movie_id", "buckets": k}},
+    ], allowDiskUse=True)
+    bounds = [b["_id"]["min"] for b in buckets][1:]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def build(lo, hi):
+    # Chaque film ne dépend que de ses propres lignes : les tranches sont
+    # indépendantes. $match en tête pour passer par l'index movie_id.
+    cond = {}
+    if lo is not None:
+        cond["$gte"] = lo
+    if hi is not None:
+        cond["$lt"] = hi
+    stages = [{"$match": {"movie_id": cond}}] if cond else []
+    stages += pipeline
+    stages += [{"$merge": {"into": STAGING_COL, "on": "_id",
+                           "whenMatched": "replace", "whenNotMatched": "insert"}}]
+    db.movies.aggregate(stages, allowDiskUse=True)
+
+
+# Le travail se fait côté serveur : des threads sur le même client suffisent
+# (MongoClient est thread-safe, pas fork-safe). Avec LIMIT_MOVIES, une seule
+# tranche pour garder un $limit global.
+db[STAGING_COL].drop()
+ranges = movie_id_ranges(1 if LIMIT_MOVIES else WORKERS)
+with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+    list(pool.map(lambda r: build(*r), ranges))
+
+# Remplacement de OUT_COL en une opération : les lecteurs gardent l'ancienne
+# version jusqu'au renommage
+db[STAGING_COL].rename(OUT_COL, dropTarget=True)
 
 print("OK. docs movies_complete =", db[OUT_COL].count_documents({}))
 print("Example:", db[OUT_COL].find_one())
@@ -10,14 +10,22 @@ from __future__ import annotations
 
 import argparse
 import csv
+import gc
+import statistics
 import sys
-import time
+import timeit
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Tuple
 
 import sqlite3
 from pymongo import MongoClient
 
+try:
+    # DuckDB (optionnel) : mêmes requêtes SQL, moteur colonne, sur le fichier SQLite
+    import duckdb
+except ImportError:
+    duckdb = None
+
 
 # -----------------------------------------------------------------------------
 # Paths / imports Phase 1 (SQLite)
@@ -28,53 +36,101 @@ sys.path.insert(0, str(PHASE1_DIR))
 
 # réutilise ton bench et tes requêtes Phase 1
 import benchmark_sqlite as sqlite_bench  # type: ignore
+import queries as sqlite_queries  # type: ignore
+
+# même résolution de l'acteur que queries_mongo.py (nom exact avec collation,
+# puis $regex) : les deux benchmarks comparent les mêmes personnes
+from queries_mongo import _resolve_person_ids
 
 
 # -----------------------------------------------------------------------------
 # Timing helper
 # -----------------------------------------------------------------------------
-def time_ms(thunk: Callable[[], Any], repeats: int = 3, warmup: int = 1) -> Tuple[float, Any]:
+def time_ms(thunk: Callable[[], Any], repeats: int = 3, warmup: int = 2) -> Tuple[float, float, Any]:
+    """
+    Médiane et écart-type (ms) de `repeats` exécutions chronométrées par
+    timeit.Timer.repeat, comme queries_mongo._time_ms (GC coupé par timeit pendant
+    la mesure), après `warmup` exécutions de chauffe (caches SQLite / cache
+    WiredTiger). Médiane et écart-type plutôt que le minimum : le tableau compare
+    trois moteurs et affiche la dispersion. Le résultat vient de la chauffe.
+    """
     last = None
-    for _ in range(warmup):
-        last = thunk()
-    t0 = time.perf_counter()
-    for _ in range(repeats):
+    for _ in range(max(warmup, 1)):
         last = thunk()
-        # force matérialisation si list/tuple
-        try:
-            _ = len(last)  # noqa
-        except Exception:
-            pass
-    t1 = time.perf_counter()
-    return ((t1 - t0) * 1000.0) / max(repeats, 1), last
+    gc.collect()
+    samples = timeit.Timer(thunk).repeat(repeat=max(repeats, 1), number=1)
+    return statistics.median(samples) * 1000.0, statistics.pstdev(samples) * 1000.0, last
+
+
+def warmup_connection(conn: sqlite3.Connection, mdb) -> None:
+    # Connexion Mongo du pool ouverte et pages SQLite en cache avant la 1re mesure
+    mdb.command("ping")
+    list(mdb["movies"].find({}, {"_id": 1}).limit(1))
+    conn.execute("SELECT COUNT(*) FROM movies;").fetchone()
 
 
 # -----------------------------------------------------------------------------
 # Mongo queries (équivalents de script/phase1_sqlite/queries.py)
 # Schéma connu via create_schema.py : movie_id, primary_title, start_year, etc. :contentReference[oaicite:1]{index=1}
 # -----------------------------------------------------------------------------
-def _find_person_ids(mdb, name: str, limit: int = 20) -> List[str]:
-    cur = mdb["persons"].find(
-        {"name": {"$regex": name, "$options": "i"}},
-        {"person_id": 1, "_id": 0},
-    ).limit(limit)
-    return [d["person_id"] for d in cur]
+# Documents par lot de curseur : ~1000 petits résultats (quelques centaines de Ko)
+# au lieu de lots jusqu'à 16 Mo, pour borner la mémoire côté driver
+AGG_BATCH_SIZE = 1000
+
+
+def _aggregate(mdb, coll: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return list(mdb[coll].aggregate(pipeline, allowDiskUse=True, batchSize=AGG_BATCH_SIZE))
+
+
+# Acteur de Q1, Q4 et Q6 (celui des libellés de sqlite_bench.make_queries())
+BENCH_ACTOR = "Tom Hanks"
 
 
 def mongo_q1_actor_filmography(mdb, actor_name: str) -> List[Dict[str, Any]]:
+    # équivalent query_actor_filmography, sur principals_denorm (migrate_flat.py) :
+    # film, note et personnages déjà intégrés, aucun $lookup
+    person_ids = _resolve_person_ids(mdb, actor_name)
+    if not person_ids:
+        return []
+
+    pipeline = [
+        {"$match": {"person_id": {"$in": person_ids}, "category": {"$in": ["actor", "actress"]}}},
+        # une ligne par personnage (comme la jointure SQL characters)
+        {"$unwind": {"path": "$characters", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "_id": 0,
+            "primary_title": 1,
+            "start_year": 1,
+            "character": "$characters",
+            "average_rating": 1,
+        }},
+        {"$sort": {"start_year": -1, "primary_title": 1}},
+    ]
+    return _aggregate(mdb, "principals_denorm", pipeline)
+
+
+def mongo_q1_actor_filmography_lookup(mdb, actor_name: str) -> List[Dict[str, Any]]:
     # équivalent query_actor_filmography :contentReference[oaicite:2]{index=2}
-    person_ids = _find_person_ids(mdb, actor_name)
+    # (version avec $lookup, si principals_denorm n'a pas été construite)
+    person_ids = _resolve_person_ids(mdb, actor_name)
     if not person_ids:
         return []
 
     pipeline = [
         {"$match": {"person_id": {"$in": person_ids}, "category": {"$in": ["actor", "actress"]}}},
-        {"$lookup": {"from": "movies", "localField": "movie_id", "foreignField": "movie_id", "as": "m"}},
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "primary_title": 1, "start_year": 1}}],
+            "as": "m"
+        }},
         {"$unwind": "$m"},
         {"$lookup": {
             "from": "ratings",
             "localField": "movie_id",
             "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "average_rating": 1}}],
             "as": "r"
         }},
         {"$unwind": {"path": "$r", "preserveNullAndEmptyArrays": True}},
@@ -101,17 +157,33 @@ def mongo_q1_actor_filmography(mdb, actor_name: str) -> List[Dict[str, Any]]:
         }},
         {"$sort": {"start_year": -1, "primary_title": 1}},
     ]
-    return list(mdb["principals"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "principals", pipeline)
 
 
 def mongo_q2_top_n_movies(mdb, genre: str, start_year: int, end_year: int, n: int) -> List[Dict[str, Any]]:
     # équivalent query_top_n_movies :contentReference[oaicite:3]{index=3}
     pipeline = [
         {"$match": {"genre": genre}},
-        {"$lookup": {"from": "movies", "localField": "movie_id", "foreignField": "movie_id", "as": "m"}},
+        # filtre sur l'année poussé dans le lookup (index movies(movie_id, start_year)) :
+        # les films hors période ne remontent pas et $unwind élimine la ligne genre
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [
+                {"$match": {"start_year": {"$gte": start_year, "$lte": end_year}}},
+                {"$project": {"_id": 0, "primary_title": 1, "start_year": 1}},
+            ],
+            "as": "m"
+        }},
         {"$unwind": "$m"},
-        {"$match": {"m.start_year": {"$gte": start_year, "$lte": end_year}}},
-        {"$lookup": {"from": "ratings", "localField": "movie_id", "foreignField": "movie_id", "as": "r"}},
+        {"$lookup": {
+            "from": "ratings",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "average_rating": 1, "num_votes": 1}}],
+            "as": "r"
+        }},
         {"$unwind": "$r"},
         {"$project": {
             "_id": 0,
@@ -123,10 +195,41 @@ def mongo_q2_top_n_movies(mdb, genre: str, start_year: int, end_year: int, n: in
         {"$sort": {"average_rating": -1, "num_votes": -1, "primary_title": 1}},
         {"$limit": n},
     ]
-    return list(mdb["genres"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "genres", pipeline)
 
 
 def mongo_q3_multi_role_actors_fast(mdb, limit: int = 200):
+    # multi_roles (migrate_flat.py) : couples (film, personne) à plusieurs rôles déjà
+    # comptés, le tri par nb_roles se lit dans l'index
+    pipeline = [
+        {"$sort": {"nb_roles": -1}},
+        {"$limit": limit},
+
+        {"$lookup": {
+            "from": "persons",
+            "localField": "_id.person_id",
+            "foreignField": "person_id",
+            "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+            "as": "p"
+        }},
+        {"$unwind": "$p"},
+        {"$lookup": {
+            "from": "movies",
+            "localField": "_id.movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "primary_title": 1, "start_year": 1}}],
+            "as": "m"
+        }},
+        {"$unwind": "$m"},
+
+        {"$project": {"_id": 0, "name": "$p.name", "primary_title": "$m.primary_title",
+                      "start_year": "$m.start_year", "nb_roles": 1}},
+        {"$sort": {"nb_roles": -1, "name": 1}},
+    ]
+    return _aggregate(mdb, "multi_roles", pipeline)
+
+
+def mongo_q3_multi_role_actors_group(mdb, limit: int = 200):
     pipeline = [
         {"$group": {
             "_id": {"movie_id": "$movie_id", "person_id": "$person_id"},
@@ -136,43 +239,73 @@ def mongo_q3_multi_role_actors_fast(mdb, limit: int = 200):
         {"$sort": {"nb_roles": -1}},
         {"$limit": limit},  # IMPORTANT: on limite AVANT les lookups
 
-        {"$lookup": {"from": "persons", "localField": "_id.person_id", "foreignField": "person_id", "as": "p"}},
+        {"$lookup": {
+            "from": "persons",
+            "localField": "_id.person_id",
+            "foreignField": "person_id",
+            "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+            "as": "p"
+        }},
         {"$unwind": "$p"},
-        {"$lookup": {"from": "movies", "localField": "_id.movie_id", "foreignField": "movie_id", "as": "m"}},
+        {"$lookup": {
+            "from": "movies",
+            "localField": "_id.movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "primary_title": 1, "start_year": 1}}],
+            "as": "m"
+        }},
         {"$unwind": "$m"},
 
         {"$project": {"_id": 0, "name": "$p.name", "primary_title": "$m.primary_title",
                       "start_year": "$m.start_year", "nb_roles": 1}},
         {"$sort": {"nb_roles": -1, "name": 1}},
     ]
-    return list(mdb["characters"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "characters", pipeline)
 
 
 
 def mongo_q4_collaborations(mdb, actor_name: str) -> List[Dict[str, Any]]:
     # équivalent query_collaborations :contentReference[oaicite:5]{index=5}
-    person_ids = _find_person_ids(mdb, actor_name)
+    person_ids = _resolve_person_ids(mdb, actor_name)
     if not person_ids:
         return []
 
     pipeline = [
         {"$match": {"person_id": {"$in": person_ids}, "category": {"$in": ["actor", "actress"]}}},
         {"$group": {"_id": "$movie_id"}},  # DISTINCT movie_id
-        {"$lookup": {"from": "directors", "localField": "_id", "foreignField": "movie_id", "as": "d"}},
+        {"$lookup": {
+            "from": "directors",
+            "localField": "_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "person_id": 1}}],
+            "as": "d"
+        }},
         {"$unwind": "$d"},
         {"$group": {"_id": "$d.person_id", "nb_films": {"$sum": 1}}},
-        {"$lookup": {"from": "persons", "localField": "_id", "foreignField": "person_id", "as": "p"}},
+        {"$lookup": {
+            "from": "persons",
+            "localField": "_id",
+            "foreignField": "person_id",
+            "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+            "as": "p"
+        }},
         {"$unwind": "$p"},
         {"$project": {"_id": 0, "director_name": "$p.name", "nb_films": 1}},
         {"$sort": {"nb_films": -1, "director_name": 1}},
     ]
-    return list(mdb["principals"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "principals", pipeline)
 
 
 def mongo_q5_popular_genres(mdb) -> List[Dict[str, Any]]:
     # équivalent query_popular_genres :contentReference[oaicite:6]{index=6}
     pipeline = [
-        {"$lookup": {"from": "ratings", "localField": "movie_id", "foreignField": "movie_id", "as": "r"}},
+        {"$lookup": {
+            "from": "ratings",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "average_rating": 1}}],
+            "as": "r"
+        }},
         {"$unwind": "$r"},
         {"$group": {
             "_id": "$genre",
@@ -183,23 +316,70 @@ def mongo_q5_popular_genres(mdb) -> List[Dict[str, Any]]:
         {"$project": {"_id": 0, "genre": "$_id", "nb_films": 1, "avg_rating": 1}},
         {"$sort": {"avg_rating": -1}},
     ]
-    return list(mdb["genres"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "genres", pipeline)
 
 
 def mongo_q6_career_evolution(mdb, actor_name: str) -> List[Dict[str, Any]]:
     # équivalent query_career_evolution :contentReference[oaicite:7]{index=7}
-    person_ids = _find_person_ids(mdb, actor_name)
+    person_ids = _resolve_person_ids(mdb, actor_name)
+    if not person_ids:
+        return []
+
+    pipeline = [
+        {"$match": {"person_id": {"$in": person_ids}, "category": {"$in": ["actor", "actress"]}}},
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "start_year": 1, "average_rating": 1}}],
+            "as": "m"
+        }},
+        {"$unwind": "$m"},
+        {"$match": {"m.start_year": {"$ne": None}}},
+        # DISTINCT movie_id pour éviter doublons (équivalent du DISTINCT SQL)
+        # la note est déjà dans movies (migrate_flat.py) : plus de lookup ratings
+        {"$group": {
+            "_id": "$movie_id",
+            "start_year": {"$first": "$m.start_year"},
+            "average_rating": {"$first": "$m.average_rating"},
+        }},
+        {"$addFields": {"decade": {"$multiply": [{"$floor": {"$divide": ["$start_year", 10]}}, 10]}}},
+        {"$group": {
+            "_id": "$decade",
+            "nb_films": {"$sum": 1},
+            "avg_rating": {"$avg": "$average_rating"},
+        }},
+        {"$project": {"_id": 0, "decade": "$_id", "nb_films": 1, "avg_rating": 1}},
+        {"$sort": {"decade": 1}},
+    ]
+    return _aggregate(mdb, "principals", pipeline)
+
+
+def mongo_q6_career_evolution_lookup(mdb, actor_name: str) -> List[Dict[str, Any]]:
+    person_ids = _resolve_person_ids(mdb, actor_name)
     if not person_ids:
         return []
 
     pipeline = [
         {"$match": {"person_id": {"$in": person_ids}, "category": {"$in": ["actor", "actress"]}}},
-        {"$lookup": {"from": "movies", "localField": "movie_id", "foreignField": "movie_id", "as": "m"}},
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "start_year": 1}}],
+            "as": "m"
+        }},
         {"$unwind": "$m"},
         {"$match": {"m.start_year": {"$ne": None}}},
         # DISTINCT movie_id pour éviter doublons (équivalent du DISTINCT SQL)
         {"$group": {"_id": "$movie_id", "start_year": {"$first": "$m.start_year"}}},
-        {"$lookup": {"from": "ratings", "localField": "_id", "foreignField": "movie_id", "as": "r"}},
+        {"$lookup": {
+            "from": "ratings",
+            "localField": "_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "average_rating": 1}}],
+            "as": "r"
+        }},
         {"$unwind": {"path": "$r", "preserveNullAndEmptyArrays": True}},
         {"$addFields": {"decade": {"$multiply": [{"$floor": {"$divide": ["$start_year", 10]}}, 10]}}},
         {"$group": {
@@ -210,15 +390,72 @@ def mongo_q6_career_evolution(mdb, actor_name: str) -> List[Dict[str, Any]]:
         {"$project": {"_id": 0, "decade": "$_id", "nb_films": 1, "avg_rating": 1}},
         {"$sort": {"decade": 1}},
     ]
-    return list(mdb["principals"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "principals", pipeline)
 
 
 def mongo_q7_top3_by_genre(mdb) -> List[Dict[str, Any]]:
     # équivalent query_top3_by_genre :contentReference[oaicite:8]{index=8}
     pipeline = [
-        {"$lookup": {"from": "movies", "localField": "movie_id", "foreignField": "movie_id", "as": "m"}},
+        # note et votes déjà dans movies (migrate_flat.py) : un seul lookup ; le
+        # $match garde la jointure interne avec ratings (films notés seulement)
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [
+                {"$match": {"average_rating": {"$exists": True}}},
+                {"$project": {"_id": 0, "primary_title": 1, "start_year": 1,
+                              "average_rating": 1, "num_votes": 1}},
+            ],
+            "as": "m"
+        }},
+        {"$unwind": "$m"},
+        {"$project": {
+            "_id": 0,
+            "genre": "$genre",
+            "primary_title": "$m.primary_title",
+            "start_year": "$m.start_year",
+            "average_rating": "$m.average_rating",
+            "num_votes": "$m.num_votes",
+        }},
+        # ROW_NUMBER() OVER (PARTITION BY genre ...) : numérotation en flux, sans
+        # tableau de tous les films d'un genre ($push limité à 100 Mo)
+        {"$setWindowFields": {
+            "partitionBy": "$genre",
+            "sortBy": {"average_rating": -1, "num_votes": -1, "primary_title": 1},
+            "output": {"rank": {"$documentNumber": {}}},
+        }},
+        {"$match": {"rank": {"$lte": 3}}},
+        {"$project": {
+            "genre": 1,
+            "rank": 1,
+            "primary_title": 1,
+            "start_year": 1,
+            "average_rating": 1,
+        }},
+        {"$sort": {"genre": 1, "rank": 1}},
+    ]
+    return _aggregate(mdb, "genres", pipeline)
+
+
+def mongo_q7_top3_by_genre_lookup(mdb) -> List[Dict[str, Any]]:
+    pipeline = [
+        # pas de filtre à pousser ici : seuls les champs utiles remontent des lookups
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "primary_title": 1, "start_year": 1}}],
+            "as": "m"
+        }},
         {"$unwind": "$m"},
-        {"$lookup": {"from": "ratings", "localField": "movie_id", "foreignField": "movie_id", "as": "r"}},
+        {"$lookup": {
+            "from": "ratings",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "average_rating": 1, "num_votes": 1}}],
+            "as": "r"
+        }},
         {"$unwind": "$r"},
         {"$project": {
             "_id": 0,
@@ -228,22 +465,24 @@ def mongo_q7_top3_by_genre(mdb) -> List[Dict[str, Any]]:
             "average_rating": "$r.average_rating",
             "num_votes": "$r.num_votes",
         }},
-        {"$sort": {"genre": 1, "average_rating": -1, "num_votes": -1, "primary_title": 1}},
-        {"$group": {"_id": "$genre", "items": {"$push": "$$ROOT"}}},
-        {"$project": {"genre": "$_id", "top3": {"$slice": ["$items", 3]}, "_id": 0}},
-        {"$unwind": {"path": "$top3", "includeArrayIndex": "rank0"}},
-        {"$addFields": {"rank": {"$add": ["$rank0", 1]}}},
+        # ROW_NUMBER() OVER (PARTITION BY genre ...) : numérotation en flux, sans
+        # tableau de tous les films d'un genre ($push limité à 100 Mo)
+        {"$setWindowFields": {
+            "partitionBy": "$genre",
+            "sortBy": {"average_rating": -1, "num_votes": -1, "primary_title": 1},
+            "output": {"rank": {"$documentNumber": {}}},
+        }},
+        {"$match": {"rank": {"$lte": 3}}},
         {"$project": {
-            "_id": 0,
             "genre": 1,
             "rank": 1,
-            "primary_title": "$top3.primary_title",
-            "start_year": "$top3.start_year",
-            "average_rating": "$top3.average_rating",
+            "primary_title": 1,
+            "start_year": 1,
+            "average_rating": 1,
         }},
         {"$sort": {"genre": 1, "rank": 1}},
     ]
-    return list(mdb["genres"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "genres", pipeline)
 
 
 def mongo_q8_career_boost_fast2(mdb, threshold: int = 200_000):
@@ -261,7 +500,17 @@ def mongo_q8_career_boost_fast2(mdb, threshold: int = 200_000):
         }},
         {"$unwind": "$m"},
 
-        # join principals pour obtenir les personnes liées au film
+        # seuil évalué une fois par film (comme movie_cls en SQL) : après l'$unwind
+        # des principals, le $group ne fait plus que des sommes de champs
+        {"$project": {
+            "movie_id": 1,
+            "hi": {"$cond": [{"$gte": ["$num_votes", threshold]}, 1, 0]},
+            "lo": {"$cond": [{"$lt": ["$num_votes", threshold]}, 1, 0]},
+            "hi_year": {"$cond": [{"$gte": ["$num_votes", threshold]}, "$m.start_year", None]},
+        }},
+
+        # join principals pour obtenir les personnes liées au film (index
+        # principals(movie_id, person_id) couvrant, cf. migrate_flat.py)
         {"$lookup": {
             "from": "principals",
             "localField": "movie_id",
@@ -274,19 +523,25 @@ def mongo_q8_career_boost_fast2(mdb, threshold: int = 200_000):
         # group par person_id (exactement comme le SQL) :contentReference[oaicite:1]{index=1}
         {"$group": {
             "_id": "$p.person_id",
-            "low_count": {"$sum": {"$cond": [{"$lt": ["$num_votes", threshold]}, 1, 0]}},
-            "high_count": {"$sum": {"$cond": [{"$gte": ["$num_votes", threshold]}, 1, 0]}},
-            "breakthrough_year": {"$min": {"$cond": [{"$gte": ["$num_votes", threshold]}, "$m.start_year", None]}},
+            "low_count": {"$sum": "$lo"},
+            "high_count": {"$sum": "$hi"},
+            "breakthrough_year": {"$min": "$hi_year"},
         }},
         {"$match": {"low_count": {"$gt": 0}, "high_count": {"$gt": 0}}},
 
         # join persons à la fin (après réduction)
-        {"$lookup": {"from": "persons", "localField": "_id", "foreignField": "person_id", "as": "pe"}},
+        {"$lookup": {
+            "from": "persons",
+            "localField": "_id",
+            "foreignField": "person_id",
+            "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+            "as": "pe"
+        }},
         {"$unwind": "$pe"},
         {"$project": {"_id": 0, "name": "$pe.name", "low_count": 1, "high_count": 1, "breakthrough_year": 1}},
         {"$sort": {"high_count": -1, "breakthrough_year": 1}},
     ]
-    return list(mdb["ratings"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "ratings", pipeline)
 
 
 
@@ -296,22 +551,100 @@ def mongo_q9_most_versatile_actors(mdb, min_genres: int = 3, limit: int = 50) ->
         {"$match": {"category": {"$in": ["actor", "actress"]}}},
         # DISTINCT (person_id, movie_id)
         {"$group": {"_id": {"person_id": "$person_id", "movie_id": "$movie_id"}}},
-        {"$lookup": {"from": "genres", "localField": "_id.movie_id", "foreignField": "movie_id", "as": "g"}},
-        {"$unwind": "$g"},
+        {"$lookup": {
+            "from": "genres",
+            "localField": "_id.movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "genre": 1}}],
+            "as": "g"
+        }},
+        # gi = 0 : premier genre du film, pour compter chaque film une seule fois
+        {"$unwind": {"path": "$g", "includeArrayIndex": "gi"}},
+        # DISTINCT (person_id, genre) puis comptage par personne : deux $group
+        # d'entiers au lieu d'ensembles $addToSet de genres et de films
+        {"$group": {
+            "_id": {"person_id": "$_id.person_id", "genre": "$g.genre"},
+            "nb_movies": {"$sum": {"$cond": [{"$eq": ["$gi", 0]}, 1, 0]}},
+        }},
         {"$group": {
             "_id": "$_id.person_id",
-            "genres": {"$addToSet": "$g.genre"},
-            "movies": {"$addToSet": "$g.movie_id"},
+            "nb_genres": {"$sum": 1},
+            "nb_movies": {"$sum": "$nb_movies"},
         }},
-        {"$addFields": {"nb_genres": {"$size": "$genres"}, "nb_movies": {"$size": "$movies"}}},
         {"$match": {"nb_genres": {"$gte": min_genres}}},
-        {"$lookup": {"from": "persons", "localField": "_id", "foreignField": "person_id", "as": "p"}},
+        {"$lookup": {
+            "from": "persons",
+            "localField": "_id",
+            "foreignField": "person_id",
+            "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+            "as": "p"
+        }},
         {"$unwind": "$p"},
         {"$project": {"_id": 0, "name": "$p.name", "nb_genres": 1, "nb_movies": 1}},
         {"$sort": {"nb_genres": -1, "nb_movies": -1, "name": 1}},
         {"$limit": limit},
     ]
-    return list(mdb["principals"].aggregate(pipeline, allowDiskUse=True))
+    return _aggregate(mdb, "principals", pipeline)
+
+
+# -----------------------------------------------------------------------------
+# Indexes Mongo utilisés par les lookups (create_index ne refait rien s'ils existent)
+# -----------------------------------------------------------------------------
+def ensure_mongo_indexes(mdb):
+    # Q2 : lookup movies par movie_id + filtre sur start_year, tout dans l'index
+    mdb["movies"].create_index([("movie_id", 1), ("start_year", 1)])
+    mdb["ratings"].create_index([("movie_id", 1)])
+
+
+# -----------------------------------------------------------------------------
+# DuckDB sur le fichier SQLite (optionnel, --duckdb)
+# -----------------------------------------------------------------------------
+def open_duckdb(sqlite_path: str):
+    # Extension sqlite de DuckDB : lecture directe du fichier, sans ré-import
+    con = duckdb.connect()
+    con.execute("INSTALL sqlite; LOAD sqlite;")
+    path = sqlite_path.replace("'", "''")
+    con.execute(f"ATTACH '{path}' AS imdb (TYPE sqlite, READ_ONLY); USE imdb;")
+    return con
+
+
+def make_duckdb_queries(con) -> Dict[str, Callable[[], List[Tuple[Any, ...]]]]:
+    """
+    Le texte SQL de queries.py avec les paramètres de sqlite_bench.make_queries().
+    Variantes sans extension SQLite : ILIKE au lieu de FTS5 (le LIKE de DuckDB
+    distingue la casse, pas celui de SQLite), jointure au lieu de
+    temp.actor_movies ; LIMIT NULL pour « toutes les lignes » (DuckDB refuse -1).
+    """
+    q = sqlite_queries
+    # même choix que queries.py (instantané à jour, sinon jointure), tables
+    # listées par information_schema
+    genre_ratings = q._genre_ratings(con, has_table=lambda name: con.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_name = ?;", [name]
+    ).fetchone() is not None)
+    name_filter = "pe.name ILIKE ?"
+    actor_movies = q._SQL_ACTOR_MOVIES.format(name_filter=name_filter)
+    actor = f"%{BENCH_ACTOR}%"
+
+    def run(sql: str, *params: Any) -> Callable[[], List[Tuple[Any, ...]]]:
+        return lambda: con.execute(sql, list(params)).fetchall()
+
+    return {
+        "Q1 - Filmographie (Tom Hanks)": run(
+            q._SQL_ACTOR_FILMOGRAPHY.format(name_filter=name_filter), actor, None),
+        "Q2 - Top 50 Drama 1990-2020": run(
+            q._SQL_TOP_N_MOVIES.format(genre_ratings=genre_ratings), "Drama", 1990, 2020, 50),
+        "Q3 - Acteurs multi-rôles": run(q._SQL_MULTI_ROLE_ACTORS, None),
+        "Q4 - Collaborations (Tom Hanks)": run(
+            q._SQL_COLLABORATIONS.format(actor_movies=actor_movies), actor, None),
+        "Q5 - Genres populaires": run(
+            q._SQL_POPULAR_GENRES.format(genre_ratings=genre_ratings), None),
+        "Q6 - Carrière (Tom Hanks)": run(
+            q._SQL_CAREER_EVOLUTION.format(actor_movies=actor_movies), actor, None),
+        "Q7 - Top 3 par genre": run(
+            q._SQL_TOP3_BY_GENRE.format(genre_ratings=genre_ratings), None),
+        "Q8 - Carrières boostées": run(q._SQL_CAREER_BOOST, None),
+        "Q9 - Acteurs polyvalents": run(q._SQL_MOST_VERSATILE_ACTORS, 3, 50),
+    }
 
 
 # -----------------------------------------------------------------------------
@@ -329,71 +662,107 @@ def apply_sqlite_indexes(conn: sqlite3.Connection):
 # -----------------------------------------------------------------------------
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--sqlite", default=str(ROOT_DIR / "data" / "imdb.db"))
+    ap.add_argument("--sqlite", default=str(sqlite_bench.DB_PATH))
     ap.add_argument("--mongo-uri", default="mongodb://localhost:27017")
     ap.add_argument("--mongo-db", default="cineexplorer_flat")
     ap.add_argument("--repeats", type=int, default=3)
-    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument("--warmup", type=int, default=2)
     ap.add_argument("--with-indexes", action="store_true", help="Applique les index SQLite avant bench (comme phase 1).")
+    ap.add_argument("--duckdb", action="store_true", help="Ajoute une colonne DuckDB (mêmes requêtes SQL sur le fichier SQLite).")
     ap.add_argument("--out", default="bench_compare.csv")
     args = ap.parse_args()
+    if args.duckdb and duckdb is None:
+        ap.error("--duckdb : module duckdb non installé (pip install duckdb)")
 
     # SQLite
     conn = sqlite3.connect(args.sqlite)
     conn.execute("PRAGMA foreign_keys = ON;")
+    # Cache de pages ~200 Mo, sans déversement : les répétitions relisent les
+    # mêmes pages sans qu'elles soient évincées entre deux mesures
+    conn.execute("PRAGMA cache_size = -200000;")
+    conn.execute("PRAGMA cache_spill = 0;")
 
     if args.with_indexes:
         apply_sqlite_indexes(conn)
 
     sqlite_specs = sqlite_bench.make_queries()  # labels identiques à ton bench :contentReference[oaicite:12]{index=12}
 
+    # DuckDB : connexion ouverte après les index SQLite éventuels
+    ddb = open_duckdb(args.sqlite) if args.duckdb else None
+    duck_specs = make_duckdb_queries(ddb) if ddb is not None else {}
+
     # Mongo
     client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
     client.admin.command("ping")
     mdb = client[args.mongo_db]
+    ensure_mongo_indexes(mdb)
+    collections = mdb.list_collection_names()
+    q1 = (mongo_q1_actor_filmography if "principals_denorm" in collections
+          else mongo_q1_actor_filmography_lookup)
+    q3 = (mongo_q3_multi_role_actors_fast if "multi_roles" in collections
+          else mongo_q3_multi_role_actors_group)
+    rated_movies = mdb["movies"].find_one({"average_rating": {"$exists": True}}) is not None
+    q6 = mongo_q6_career_evolution if rated_movies else mongo_q6_career_evolution_lookup
+    q7 = mongo_q7_top3_by_genre if rated_movies else mongo_q7_top3_by_genre_lookup
 
     mongo_specs: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
-        "Q1 - Filmographie (Tom Hanks)": lambda: mongo_q1_actor_filmography(mdb, "Tom Hanks"),
+        "Q1 - Filmographie (Tom Hanks)": lambda: q1(mdb, BENCH_ACTOR),
         "Q2 - Top 50 Drama 1990-2020": lambda: mongo_q2_top_n_movies(mdb, "Drama", 1990, 2020, 50),
-        "Q3 - Acteurs multi-rôles": lambda: mongo_q3_multi_role_actors_fast(mdb, limit=200),
-        "Q4 - Collaborations (Tom Hanks)": lambda: mongo_q4_collaborations(mdb, "Tom Hanks"),
+        "Q3 - Acteurs multi-rôles": lambda: q3(mdb, limit=200),
+        "Q4 - Collaborations (Tom Hanks)": lambda: mongo_q4_collaborations(mdb, BENCH_ACTOR),
         "Q5 - Genres populaires": lambda: mongo_q5_popular_genres(mdb),
-        "Q6 - Carrière (Tom Hanks)": lambda: mongo_q6_career_evolution(mdb, "Tom Hanks"),
-        "Q7 - Top 3 par genre": lambda: mongo_q7_top3_by_genre(mdb),
+        "Q6 - Carrière (Tom Hanks)": lambda: q6(mdb, BENCH_ACTOR),
+        "Q7 - Top 3 par genre": lambda: q7(mdb),
         "Q8 - Carrières boostées": lambda: mongo_q8_career_boost_fast2(mdb),
         "Q9 - Acteurs polyvalents": lambda: mongo_q9_most_versatile_actors(mdb, min_genres=3, limit=50),
     }
 
+    warmup_connection(conn, mdb)
+
     rows_out = []
-    print("\n=== Benchmark compare SQLite vs MongoDB (avg ms) ===")
+    print("\n=== Benchmark compare SQLite vs MongoDB (médiane ms ± écart-type) ===")
     print(f"SQLite DB: {args.sqlite}")
     print(f"Mongo DB : {args.mongo_db}")
     print(f"Indexes  : {'ON' if args.with_indexes else 'OFF'}")
-    print("-" * 78)
-    print(f"{'Requête':38s} {'SQLite(ms)':>12s} {'Mongo(ms)':>12s} {'RowsSQL':>8s} {'RowsMongo':>9s}")
-    print("-" * 78)
+    print("-" * 98)
+    print(f"{'Requête':38s} {'SQLite(ms)':>20s} {'Mongo(ms)':>20s} {'RowsSQL':>8s} {'RowsMongo':>9s}")
+    print("-" * 98)
 
     for label, sql_fn in sqlite_specs.items():
         if label not in mongo_specs:
             print(f"[SKIP] pas d'équivalent Mongo défini pour: {label}")
             continue
 
-        s_ms, s_res = time_ms(lambda: sql_fn(conn), repeats=args.repeats, warmup=args.warmup)
-        m_ms, m_res = time_ms(lambda: mongo_specs[label](), repeats=args.repeats, warmup=args.warmup)
+        s_ms, s_sd, s_res = time_ms(lambda: sql_fn(conn), repeats=args.repeats, warmup=args.warmup)
+        m_ms, m_sd, m_res = time_ms(lambda: mongo_specs[label](), repeats=args.repeats, warmup=args.warmup)
 
         n_sql = len(s_res) if isinstance(s_res, list) else None
         n_m = len(m_res) if isinstance(m_res, list) else None
 
-        print(f"{label[:38]:38s} {s_ms:12.2f} {m_ms:12.2f} {str(n_sql):>8s} {str(n_m):>9s}")
+        s_txt = f"{s_ms:.2f} ± {s_sd:.2f}"
+        m_txt = f"{m_ms:.2f} ± {m_sd:.2f}"
+        print(f"{label[:38]:38s} {s_txt:>20s} {m_txt:>20s} {str(n_sql):>8s} {str(n_m):>9s}")
 
-        rows_out.append({
+        row = {
             "query": label,
-            "sqlite_ms_avg": round(s_ms, 3),
-            "mongo_ms_avg": round(m_ms, 3),
+            "sqlite_ms_median": round(s_ms, 3),
+            "sqlite_ms_stdev": round(s_sd, 3),
+            "mongo_ms_median": round(m_ms, 3),
+            "mongo_ms_stdev": round(m_sd, 3),
             "rows_sqlite": n_sql,
             "rows_mongo": n_m,
             "sqlite_indexes": int(args.with_indexes),
-        })
+        }
+        if ddb is not None:
+            d_ms, d_sd, d_res = time_ms(duck_specs[label], repeats=args.repeats, warmup=args.warmup)
+            d_txt = f"{d_ms:.2f} ± {d_sd:.2f}"
+            print(f"{'  DuckDB':38s} {d_txt:>20s} {'':>20s} {len(d_res):>8d}")
+            row.update({
+                "duckdb_ms_median": round(d_ms, 3),
+                "duckdb_ms_stdev": round(d_sd, 3),
+                "rows_duckdb": len(d_res),
+            })
+        rows_out.append(row)
 
     with open(args.out, "w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=list(rows_out[0].keys()))
@@ -404,6 +773,8 @@ def main():
 
     conn.close()
     client.close()
+    if ddb is not None:
+        ddb.close()
 
 
 if __name__ == "__main__":
@@ -7,19 +7,60 @@ Created on Fri Dec 26 14:24:21 2025
 
 #!/usr/bin/env python3
 import argparse
+import os
 import sqlite3
-from pymongo import MongoClient
-from pymongo.errors import BulkWriteError
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Optional
+from pymongo import IndexModel, MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
+
+# Index sur les champs de jointure des $lookup (foreignField) : sans eux chaque
+# document amont provoque un parcours complet de la collection jointe.
+# movies : même index que ensure_mongo_indexes() de compare_performance.py ;
+# principals / characters : mêmes index composés que build_movies_complete.py
+# (qui supprime les index dont ils sont le préfixe), pour que les deux scripts
+# laissent la même base
+LOOKUP_INDEXES = [
+    ("movies", [("movie_id", 1), ("start_year", 1)]),
+    ("ratings", [("movie_id", 1)]),
+    ("persons", [("person_id", 1)]),
+    ("principals", [("movie_id", 1), ("category", 1), ("ordering", 1)]),
+    ("principals", [("person_id", 1), ("category", 1)]),
+    ("genres", [("movie_id", 1), ("genre", 1)]),
+    ("characters", [("movie_id", 1), ("person_id", 1), ("name", 1)]),
+    ("directors", [("movie_id", 1), ("person_id", 1)]),
+]
+
+# Tables dérivées de create_schema.py / de l'application (compteurs, instantané
+# genre × note, listes précalculées) : recalculables, pas des données à migrer
+DERIVED_TABLES = {
+    "genre_counts",
+    "decade_counts",
+    "genre_movie_ratings",
+    "genre_movie_ratings_state",
+    "top_movies_cache",
+    "recent_movies_cache",
+}
 
 def list_tables(conn: sqlite3.Connection):
     cur = conn.cursor()
     cur.execute("""
-        SELECT name
+        SELECT name, sql
         FROM sqlite_master
         WHERE type='table' AND name NOT LIKE 'sqlite_%'
         ORDER BY name;
     """)
-    return [r[0] for r in cur.fetchall()]
+    rows = cur.fetchall()
+    # Tables virtuelles FTS5 et leurs tables internes (movies_fts, movies_fts_data, ...),
+    # comme sqlite_service._list_tables
+    virtual = [name for name, sql in rows if str(sql or "").upper().startswith("CREATE VIRTUAL")]
+    return [
+        name for name, _ in rows
+        if name not in virtual
+        and not any(name.startswith(v + "_") for v in virtual)
+        and name not in DERIVED_TABLES
+    ]
 
 def sqlite_count(conn: sqlite3.Connection, table: str) -> int:
     cur = conn.cursor()
@@ -29,39 +70,201 @@ def sqlite_count(conn: sqlite3.Connection, table: str) -> int:
 def migrate_table(conn: sqlite3.Connection, mongo_db, table: str, batch_size: int, use_pk_as_id: bool):
     cur = conn.cursor()
     cur.execute(f'SELECT * FROM "{table}"')
-    colnames = [d[0] for d in cur.description]
+    colnames = tuple(d[0] for d in cur.description)
+    # Optionnel: si la table a une colonne "id", on la met en _id pour garder une clé stable
+    use_id = use_pk_as_id and "id" in colnames
 
-    collection = mongo_db[table]
+    def docs():
+        # Documents produits à la demande depuis le curseur SQLite
+        for row in cur:
+            doc = dict(zip(colnames, row))
+            if use_id and doc["id"] is not None:
+                doc["_id"] = doc["id"]
+            yield doc
 
+    collection = mongo_db[table]
+    stream = docs()
     inserted = 0
-    batch = []
 
     while True:
-        rows = cur.fetchmany(batch_size)
-        if not rows:
+        # insert_many matérialise ce qu'on lui passe : on lui donne batch_size
+        # documents à la fois, sans liste intermédiaire de notre côté
+        first = next(stream, None)
+        if first is None:
             break
-
-        for row in rows:
-            doc = dict(zip(colnames, row))
-
-            # Optionnel: si la table a une colonne "id", on la met en _id pour garder une clé stable
-            if use_pk_as_id and "id" in doc and doc["id"] is not None:
-                doc["_id"] = doc["id"]
-
-            batch.append(doc)
-
         try:
-            if batch:
-                collection.insert_many(batch, ordered=False)
-                inserted += len(batch)
+            result = collection.insert_many(
+                chain((first,), islice(stream, batch_size - 1)),
+                ordered=False,
+                bypass_document_validation=True,
+            )
+            inserted += len(result.inserted_ids)
         except BulkWriteError as e:
             # Si doublons sur _id (ou autre), on compte quand même les inserts validés
             inserted += e.details.get("nInserted", 0)
-        finally:
-            batch = []
 
     return inserted
 
+def migrate_table_worker(sqlite_path: str, mongo_uri: str, mongo_db_name: str, table: str,
+                         batch_size: int, use_pk_as_id: bool) -> int:
+    # Un processus par table : connexions SQLite et MongoDB propres au processus
+    conn = sqlite3.connect(sqlite_path)
+    client = MongoClient(mongo_uri)
+    try:
+        return migrate_table(conn, client[mongo_db_name], table, batch_size, use_pk_as_id)
+    finally:
+        conn.close()
+        client.close()
+
+def create_indexes(mongo_db, tables) -> None:
+    """
+    Index construits une fois les données chargées (un tri par index au lieu
+    d'une mise à jour à chaque insertion), un seul createIndexes par collection.
+    """
+    models = {}
+    for coll, keys in LOOKUP_INDEXES:
+        models.setdefault(coll, []).append(IndexModel(keys))
+    # Index texte sur les noms : recherche d'un acteur par nom sans parcours complet
+    models.setdefault("persons", []).append(IndexModel([("name", "text")]))
+    # Nom exact sans tenir compte de la casse (queries_mongo.NAME_COLLATION)
+    models["persons"].append(IndexModel([("name", 1)], collation={"locale": "en", "strength": 2}))
+
+    for coll, coll_models in models.items():
+        if coll in tables:
+            names = mongo_db[coll].create_indexes(coll_models)
+            print(f"{coll:30s} indexed={', '.join(names)}")
+
+def build_principals_denorm(mongo_db, out: str = "principals_denorm") -> int:
+    """
+    Copie de principals (acteurs/actrices) avec le film, la note et les
+    personnages intégrés : la filmographie se lit alors sans $lookup.
+    """
+    pipeline = [
+        {"$match": {"category": {"$in": ["actor", "actress"]}}},
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "primary_title": 1, "start_year": 1}}],
+            "as": "m",
+        }},
+        {"$unwind": "$m"},
+        {"$lookup": {
+            "from": "ratings",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "average_rating": 1, "num_votes": 1}}],
+            "as": "r",
+        }},
+        {"$lookup": {
+            "from": "characters",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "let": {"pid": "$person_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$person_id", "$$pid"]}}},
+                {"$project": {"_id": 0, "name": 1}},
+            ],
+            "as": "c",
+        }},
+        {"$project": {
+            "_id": 0,
+            "person_id": 1,
+            "movie_id": 1,
+            "category": 1,
+            "primary_title": "$m.primary_title",
+            "start_year": "$m.start_year",
+            "average_rating": {"$first": "$r.average_rating"},
+            "num_votes": {"$first": "$r.num_votes"},
+            "characters": "$c.name",
+        }},
+        {"$out": out},
+    ]
+    mongo_db["principals"].aggregate(pipeline, allowDiskUse=True)
+    mongo_db[out].create_index([("person_id", 1), ("category", 1)])
+    return mongo_db[out].count_documents({})
+
+def build_multi_roles(mongo_db, out: str = "multi_roles") -> int:
+    """
+    Couples (film, personne) ayant plusieurs personnages, avec leur nombre de
+    rôles : Q3 lit cette petite collection au lieu de regrouper tout characters.
+    """
+    pipeline = [
+        {"$group": {
+            "_id": {"movie_id": "$movie_id", "person_id": "$person_id"},
+            "nb_roles": {"$sum": 1},
+        }},
+        {"$match": {"nb_roles": {"$gt": 1}}},
+        {"$out": out},
+    ]
+    mongo_db["characters"].aggregate(pipeline, allowDiskUse=True)
+    mongo_db[out].create_index([("nb_roles", -1)])
+    return mongo_db[out].count_documents({})
+
+def build_movies_flat(mongo_db, out: str = "movies_flat") -> int:
+    """
+    Une ligne par (genre, film) avec titre, année, note et votes : Q2, Q5 et Q7
+    de queries_mongo.py lisent cette collection sans $lookup (équivalent de
+    genre_movie_ratings côté SQLite). Films sans note gardés, note à null.
+    """
+    pipeline = [
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "primary_title": 1, "start_year": 1}}],
+            "as": "m",
+        }},
+        {"$unwind": "$m"},
+        {"$lookup": {
+            "from": "ratings",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "average_rating": 1, "num_votes": 1}}],
+            "as": "r",
+        }},
+        {"$project": {
+            "_id": 0,
+            "genre": 1,
+            "movie_id": 1,
+            "title": "$m.primary_title",
+            "year": "$m.start_year",
+            "average_rating": {"$first": "$r.average_rating"},
+            "num_votes": {"$first": "$r.num_votes"},
+        }},
+        {"$out": out},
+    ]
+    mongo_db["genres"].aggregate(pipeline, allowDiskUse=True)
+    mongo_db[out].create_indexes([
+        # classement par genre (Q7) et top N d'un genre (Q2)
+        IndexModel([("genre", 1), ("average_rating", -1), ("num_votes", -1), ("title", 1)]),
+        IndexModel([("genre", 1), ("year", 1)]),
+    ])
+    return mongo_db[out].count_documents({})
+
+def embed_ratings_in_movies(mongo_db) -> Optional[int]:
+    """
+    Recopie average_rating et num_votes de ratings dans les documents movies
+    (relation 1-1) : plus besoin de $lookup ratings après un $lookup movies.
+    Retourne None (rien de modifié) si movies contient des doublons de movie_id.
+    """
+    # $merge "on" exige un index unique sur exactement ce champ ; sa création
+    # échoue si movies a des doublons (relance sans --drop sur une collection
+    # déjà remplie avant que cet index existe)
+    try:
+        mongo_db["movies"].create_index([("movie_id", 1)], unique=True)
+    except OperationFailure as e:
+        print(f"movies: index unique sur movie_id impossible ({e.code}), notes non intégrées ; "
+              f"relancer avec --drop")
+        return None
+    pipeline = [
+        {"$project": {"_id": 0, "movie_id": 1, "average_rating": 1, "num_votes": 1}},
+        {"$merge": {"into": "movies", "on": "movie_id",
+                    "whenMatched": "merge", "whenNotMatched": "discard"}},
+    ]
+    mongo_db["ratings"].aggregate(pipeline, allowDiskUse=True)
+    return mongo_db["movies"].count_documents({"average_rating": {"$exists": True}})
+
 def main():
     ap = argparse.ArgumentParser(description="Migrate SQLite tables to MongoDB (flat collections).")
     ap.add_argument("--sqlite", required=True, help="Path to SQLite database file (NOT CSV).")
@@ -70,6 +273,7 @@ def main():
     ap.add_argument("--batch-size", type=int, default=2000, help="Insert batch size")
     ap.add_argument("--drop", action="store_true", help="Drop collections before inserting")
     ap.add_argument("--pk-as-id", action="store_true", help='Use column "id" as MongoDB _id when possible')
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Tables migrated in parallel")
     args = ap.parse_args()
 
     # SQLite
@@ -92,16 +296,49 @@ def main():
     print(f"Tables   : {len(tables)}")
     print("-" * 60)
 
-    for t in tables:
-        if args.drop:
+    if args.drop:
+        for t in tables:
             mdb[t].drop()
 
-        expected = sqlite_count(conn, t)
-        inserted = migrate_table(conn, mdb, t, args.batch_size, args.pk_as_id)
-        got = mdb[t].count_documents({})
+    # Tables copiées en parallèle (une par processus), les plus grosses d'abord
+    expected = {t: sqlite_count(conn, t) for t in tables}
+    workers = max(1, min(args.workers, len(tables)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            t: pool.submit(migrate_table_worker, args.sqlite, args.mongo_uri, args.mongo_db,
+                           t, args.batch_size, args.pk_as_id)
+            for t in sorted(tables, key=expected.get, reverse=True)
+        }
+        for t in tables:
+            inserted = futures[t].result()
+            got = mdb[t].count_documents({})
+
+            status = "OK" if expected[t] == got else "MISMATCH"
+            print(f"{t:30s} sqlite={expected[t]:8d} mongo={got:8d} inserted={inserted:8d} => {status}")
+
+    # Index après le chargement, avant la collection dénormalisée qui s'en sert
+    create_indexes(mdb, tables)
+
+    # Notes intégrées aux films (Q6, Q7)
+    if {"movies", "ratings"} <= set(tables):
+        n = embed_ratings_in_movies(mdb)
+        if n is not None:
+            print(f"{'movies (+ratings)':30s} mongo={n:8d} (films avec note intégrée)")
+
+    # Collection dénormalisée pour la filmographie (Q1), une fois les tables copiées
+    if {"principals", "movies", "ratings", "characters"} <= set(tables):
+        n = build_principals_denorm(mdb)
+        print(f"{'principals_denorm':30s} mongo={n:8d} (principals acteurs + film, note, personnages)")
+
+    # Genre × film × note (Q2, Q5, Q7) sans jointure à l'exécution
+    if {"genres", "movies", "ratings"} <= set(tables):
+        n = build_movies_flat(mdb)
+        print(f"{'movies_flat':30s} mongo={n:8d} (genre × film avec titre, année, note)")
 
-        status = "OK" if expected == got else "MISMATCH"
-        print(f"{t:30s} sqlite={expected:8d} mongo={got:8d} inserted={inserted:8d} => {status}")
+    # Acteurs multi-rôles (Q3) comptés une fois pour toutes
+    if "characters" in tables:
+        n = build_multi_roles(mdb)
+        print(f"{'multi_roles':30s} mongo={n:8d} (couples film/personne à plusieurs rôles)")
 
     conn.close()
     client.close()
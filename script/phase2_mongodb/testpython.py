@@ -9,10 +9,14 @@ print("OK ping")
 db = client["cineexplorer"]
 col = db["movies_test"]
 
-col.insert_one({"title": "Inception", "year": 2010})
-print("Inserted 1 doc")
+# Index non unique : les doublons laissés par les anciennes versions du script
+# feraient échouer un index unique ; l'upsert n'en crée plus de nouveaux
+col.create_index("title")
+res = col.update_one({"title": "Inception"}, {"$setOnInsert": {"year": 2010}}, upsert=True)
+print("Inserted 1 doc" if res.upserted_id is not None else "Doc already present")
 
-for doc in col.find().limit(5):
+# Les 5 plus récents, dans l'ordre de l'index _id
+for doc in col.find({}, {"_id": 0}).sort("_id", -1).limit(5):
     print(doc)
 
 client.close()